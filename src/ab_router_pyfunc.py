@@ -1,30 +1,198 @@
 # src/ab_router_pyfunc.py
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import mlflow
 import mlflow.pyfunc
+import numpy as np
 import pandas as pd
-import hashlib
 import joblib
+from pathlib import Path
 from mlflow.models.signature import infer_signature
+from features import (DATA_DIR, TRAIN_STATE_PATH, IndexEncoder, load_split, has_split, load_encoder, build_movie_genres,
+                      check_train_encoders, model_proba)
+from bucketing import SplitConfig, build_assignment_table, save_assignment_table, load_assignment_table, lookup_arms
+from lgbm_compiled import CompiledForest, export_booster
+from linear_scorer import LinearScorer
+from recommend import ItemCandidates, RatedIndex
 
-ART = "data/artifacts"
+SRC_DIR = Path(__file__).resolve().parent
+ART = SRC_DIR.parent / "data" / "artifacts"
+
+# pyfunc 아티팩트: A/B 모델, 학습 시 fit한 인코더 (+ movieId→장르 lookup 포함), userId→arm 사전 배정 테이블
+# modelA_linear: 로지스틱 회귀 계수(user/movie/장르 분할) → LinearScorer (ROUTER_COMPILED_A=0이면 pkl 사용)
+# modelB_txt: LightGBM 네이티브 텍스트 모델 → CompiledForest로 인덱스 표현에서 직접 평가 (ROUTER_COMPILED_B=0이면 pkl 사용)
+ARTIFACTS = {
+    "modelA": str(ART / "logreg_model.pkl"),
+    "modelA_linear": str(ART / "logreg_weights.npz"),
+    "modelB": str(ART / "lgbm_model.pkl"),
+    "modelB_txt": str(ART / "lgbm_model.txt"),
+    "encoder": str(ART / "router_enc.npz"),
+    "assignment": str(ART / "router_assignment.npy"),
+    # /recommend: 후보 영화 목록, userId → 이미 평가한 movieId (추천 제외용)
+    "items": str(DATA_DIR / "movies.parquet"),
+    "rated": str(ART / "router_rated.npz"),
+}
+
+
+def refresh_router_data(enc: IndexEncoder = None) -> IndexEncoder:
+    """
+    데이터에서 만드는 라우터 아티팩트 갱신 (로그 시, 증분 학습 후)
+      - router_enc.npz  : 학습 인코더 + 서빙 시 장르 조인용 lookup (처리된 split 전체에서 영화당 1행)
+      - router_rated.npz: userId → 이미 평가한 movieId (/recommend 제외용)
+    """
+    enc = load_encoder() if enc is None else enc
+    splits = [load_split(s) for s in ("train", "valid", "test") if has_split(s)]
+    enc.set_genres(build_movie_genres(splits)).save(ARTIFACTS["encoder"])
+    RatedIndex.build(pd.concat([s[["userId", "movieId"]] for s in splits], ignore_index=True)).save(ARTIFACTS["rated"])
+    return enc
 
-# 미리 학습된 A, B 모델 로드
-modelA = joblib.load(f"{ART}/logreg_model.pkl")
-modelB = joblib.load(f"{ART}/lgbm_model.pkl")
 
 class ABRouter(mlflow.pyfunc.PythonModel):
+    def __init__(self, modelA=None, modelB=None, batch: bool = True, split: SplitConfig = None,
+                 preload: bool = False):
+        # 직접 주입한 모델(벤치/테스트용). 없으면 load_context의 아티팩트에서 arm별 첫 사용 시 로드
+        self.models = {"A": modelA, "B": modelB}
+        self.batch = batch  # False면 기존 행 단위 루프 사용 (비교/디버깅용)
+        self.preload = preload  # True면 load_context에서 A/B를 병렬로 미리 로드 (ROUTER_PRELOAD=1/0로 덮어쓰기)
+        # 트래픽 분할 (기본: 기존 MD5 짝/홀 50:50 배정 유지)
+        self.split = split if split is not None else SplitConfig()
+        if len(self.split.arms) != 2:
+            raise ValueError("ABRouter routes between two policies; split must define exactly two arms")
+
+    def __getstate__(self):
+        # 지연 로드된 모델/락은 직렬화하지 않음 (아티팩트에서 다시 로드)
+        state = self.__dict__.copy()
+        state.pop("_lock", None)
+        state.pop("_loaded", None)
+        state.pop("_items", None)
+        return state
+
+    def load_context(self, context):
+        path = context.artifacts.get("train_state")
+        if path:  # A/B 모델이 서로 다른 인코더로 학습됐으면 로드 거부
+            check_train_encoders(state=json.loads(Path(path).read_text()))
+        self.enc = IndexEncoder.load(context.artifacts["encoder"])
+        path = context.artifacts.get("assignment")
+        self.arm_table = load_assignment_table(path) if path else None
+        self._model_paths = {"A": context.artifacts.get("modelA"), "B": context.artifacts.get("modelB")}
+        self._compiled_paths = {}
+        for arm, key in (("A", "modelA_linear"), ("B", "modelB_txt")):
+            path = context.artifacts.get(key)
+            if path and Path(path).exists() and os.getenv(f"ROUTER_COMPILED_{arm}", "1") == "1":
+                self._compiled_paths[arm] = path
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._items_path = context.artifacts.get("items")
+        self._items = None
+        # 생성 아티팩트(gitignore)라 없을 수 있음: refresh_router_data 전에 로그한 모델, 벤치 등 → 제외 없이 추천
+        path = context.artifacts.get("rated")
+        self.rated = RatedIndex.load(path) if path and Path(path).exists() else None
+        if os.getenv("ROUTER_PRELOAD", "1" if self.preload else "0") == "1":
+            with ThreadPoolExecutor(max_workers=2) as ex:
+                list(ex.map(self._model, ["A", "B"]))
+
+    def _model(self, arm: str):
+        """arm별 모델: 주입된 모델 → 이미 로드된 모델 → 아티팩트에서 최초 1회 로드"""
+        model = self.models.get(arm)
+        if model is None:
+            model = self._loaded.get(arm)
+        if model is None:
+            with self._lock:
+                model = self._loaded.get(arm)
+                if model is None:
+                    compiled = getattr(self, "_compiled_paths", {}).get(arm)
+                    if compiled is None:
+                        model = joblib.load(self._model_paths[arm])
+                    elif arm == "A":
+                        model = LinearScorer.load(compiled)
+                    else:
+                        try:
+                            model = CompiledForest.from_model_file(compiled)
+                        except ValueError as e:  # 컴파일 미지원 트리 → 피클 모델로 predict_proba
+                            print(f"[ab_router] CompiledForest unavailable ({e}); using {self._model_paths[arm]}")
+                            model = joblib.load(self._model_paths[arm])
+                    self._loaded[arm] = model
+        return model
+
+    def _score(self, arm: str, rows: pd.DataFrame) -> np.ndarray:
+        """arm 모델로 양성 확률 계산: 선형/컴파일 트리 스코어러는 인덱스 표현, 그 외는 OHE CSR 입력"""
+        model = self._model(arm)
+        if isinstance(model, (LinearScorer, CompiledForest)):
+            u, m = self.enc.index(rows)
+            G = self.enc.genre_matrix(rows) if self.enc.genre_cols else None
+            return model.predict_proba_index(u, m, G, self.enc.genre_offset)
+        return model_proba(model, self._features(rows))
+
+    def _arm_index(self, user_ids) -> np.ndarray:
+        """arm 인덱스: 사전 배정 테이블 조회 (없거나 미등록 userId는 해시 fallback)"""
+        table = getattr(self, "arm_table", None)
+        if table is None:
+            return self.split.assign(user_ids)
+        return lookup_arms(table, user_ids, self.split)
+
+    def _features(self, model_input: pd.DataFrame):
+        """요청 배치 전체를 학습과 동일한 OHE+장르 CSR 행렬로 한 번에 변환"""
+        return self.enc.transform(model_input[["userId", "movieId"]])
+
+    def _candidates(self) -> ItemCandidates:
+        """후보 영화 + item-side 표현 (최초 /recommend 시 1회 구성)"""
+        if self._items is None:
+            with self._lock:
+                if self._items is None:
+                    self._items = ItemCandidates(pd.read_parquet(self._items_path)["movieId"].to_numpy(), self.enc)
+        return self._items
+
+    def recommend(self, user_id: int, k: int = 10, exclude_rated: bool = True, exclude=None) -> pd.DataFrame:
+        """배정된 정책으로 전체 후보 영화를 한 번에 스코어링 → Top-K (assigned, movieId, score)"""
+        if getattr(self, "_items_path", None) is None:
+            raise RuntimeError("router was logged without an 'items' artifact; /recommend is unavailable")
+        arm = "A" if self._arm_index(np.array([user_id]))[0] == 0 else "B"
+        skip = [np.asarray(exclude if exclude is not None else [], dtype=np.int64)]
+        if exclude_rated and self.rated is not None:
+            skip.append(self.rated.get(int(user_id)))
+        top = self._candidates().recommend(self._model(arm), int(user_id), k, np.concatenate(skip))
+        top.insert(0, "assigned", arm)
+        return top
+
+    def recommend_batch(self, user_ids, arm: str, k: int, exclude_rated: bool = True):
+        """사용자 배치 × 전체 후보를 지정 arm으로 스코어링 → (items, scores) (n, k) (오프라인 사전 계산용)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        exclude = [self.rated.get(int(u)) for u in user_ids] if exclude_rated and self.rated is not None else None
+        return self._candidates().top_k_grid(self._model(arm), user_ids, k, exclude)
+
+    def assign(self, user_ids) -> np.ndarray:
+        """userId 배열 → 배정 정책 라벨("A"/"B") 배열 (서빙 캐시 키 등에 사용)"""
+        return np.where(self._arm_index(user_ids) == 0, "A", "B")
+
     def predict(self, context, model_input: pd.DataFrame):
-        """userId 해시로 짝/홀 구분 → A 또는 B 선택"""
+        """userId 해시 버킷으로 A 또는 B 선택"""
+        if not self.batch:
+            return self._predict_rowwise(model_input)
+        return self._predict_batch(model_input)
+
+    def _predict_batch(self, model_input: pd.DataFrame) -> pd.DataFrame:
+        """배정을 한 번에 계산 → A/B 서브배치별 스코어링 1회 → 원래 순서로 복원"""
+        n = len(model_input)
+        scores = np.empty(n, dtype=np.float64)
+        if n == 0:
+            return pd.DataFrame({"assigned": pd.Series(dtype=object), "score": scores})
+
+        is_a = self._arm_index(model_input["userId"].to_numpy()) == 0
+        rows = model_input[["userId", "movieId"]]
+        for arm, mask in (("A", is_a), ("B", ~is_a)):
+            if mask.any():
+                scores[mask] = self._score(arm, rows.iloc[np.flatnonzero(mask)])
+        return pd.DataFrame({"assigned": np.where(is_a, "A", "B"), "score": scores})
+
+    def _predict_rowwise(self, model_input: pd.DataFrame) -> pd.DataFrame:
         outputs = []
-        for _, row in model_input.iterrows():
-            uid = int(row["userId"])
-            hashed = int(hashlib.md5(str(uid).encode()).hexdigest(), 16)
-            if hashed % 2 == 0:
-                score = modelA.predict_proba([[row["movieId"]]])[0, 1]
-                outputs.append({"assigned": "A", "score": score})
-            else:
-                score = modelB.predict_proba([[row["movieId"]]])[0, 1]
-                outputs.append({"assigned": "B", "score": score})
+        # 배정은 배치 경로와 같은 _arm_index (사전 배정 테이블/SplitConfig) 사용
+        arms = np.where(self._arm_index(model_input["userId"].to_numpy()) == 0, "A", "B")
+        for i, arm in enumerate(arms):
+            score = self._score(arm, model_input.iloc[[i]][["userId", "movieId"]])[0]
+            outputs.append({"assigned": arm, "score": score})
         return pd.DataFrame(outputs)
 
 if __name__ == "__main__":
@@ -33,11 +201,39 @@ if __name__ == "__main__":
     output_example = pd.DataFrame({"assigned": ["A"], "score": [0.8]})
     signature = infer_signature(input_example, output_example)
 
+    # A/B가 같은 인코더(= 현재 logreg_enc.npz)로 학습됐는지 확인 후 서빙용 인코더/rated 구성
+    enc = load_encoder()
+    check_train_encoders(enc.fingerprint())
+    refresh_router_data(enc)
+    artifacts = {**ARTIFACTS, **({"train_state": str(TRAIN_STATE_PATH)} if TRAIN_STATE_PATH.exists() else {})}
+
+    # 트래픽 분할: ROUTER_SPLIT_MODE=md5(기존 배정 유지)|hash, ROUTER_SPLIT_WEIGHTS="0.5,0.5", ROUTER_SPLIT_SALT
+    split = SplitConfig(
+        weights=tuple(float(w) for w in os.getenv("ROUTER_SPLIT_WEIGHTS", "0.5,0.5").split(",")),
+        salt=os.getenv("ROUTER_SPLIT_SALT", ""),
+        mode=os.getenv("ROUTER_SPLIT_MODE", "md5"),
+    )
+
+    # 알려진 사용자(users.parquet)는 미리 배정 → 서빙 시 배열 조회 1회
+    users = pd.read_parquet(DATA_DIR / "users.parquet")["userId"].to_numpy()
+    save_assignment_table(ARTIFACTS["assignment"], build_assignment_table(users, split))
+
+    # Policy A 계수 / Policy B 네이티브 텍스트 모델 (train_*.py가 저장, 이전 학습 결과면 pkl에서 변환)
+    if not Path(ARTIFACTS["modelA_linear"]).exists():
+        LinearScorer.from_classifier(joblib.load(ARTIFACTS["modelA"]), enc).save(ARTIFACTS["modelA_linear"])
+    if not Path(ARTIFACTS["modelB_txt"]).exists():
+        export_booster(joblib.load(ARTIFACTS["modelB"]), ARTIFACTS["modelB_txt"])
+
     mlflow.set_experiment("abtest_movielens")
     with mlflow.start_run(run_name="AB_Router_Demo"):
+        mlflow.log_params({"split_mode": split.mode, "split_weights": ",".join(map(str, split.weights)),
+                           "split_salt": split.salt})
         mlflow.pyfunc.log_model(
             artifact_path="ab_router",
-            python_model=ABRouter(),
+            python_model=ABRouter(split=split),
+            artifacts=artifacts,
+            code_paths=[str(SRC_DIR / f) for f in ("features.py", "bucketing.py", "lgbm_compiled.py",
+                                                        "lgbm_dataset.py", "linear_scorer.py", "recommend.py")],
             input_example=input_example,
             signature=signature
         )
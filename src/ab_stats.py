@@ -0,0 +1,247 @@
+# src/ab_stats.py
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+from mlflow.entities import Metric, RunTag
+from mlflow.tracking import MlflowClient
+
+# arm별 누적 합 (O(1) 메모리): 노출 수, 점수 합/제곱합, 라벨(결과)이 있는 노출 수, 라벨 합/제곱합
+FIELDS = ("exposures", "score_sum", "score_sumsq", "labeled", "label_sum", "label_sumsq")
+# 검정 대상 지표 → (표본 수, 합, 제곱합) 필드
+TESTS = {"label": ("labeled", "label_sum", "label_sumsq"), "score": ("exposures", "score_sum", "score_sumsq")}
+
+
+def _moments(acc: np.ndarray, n_f: str, s_f: str, ss_f: str):
+    """(n, 평균, 표본분산). n < 2면 분산 nan"""
+    n, s, ss = acc[FIELDS.index(n_f)], acc[FIELDS.index(s_f)], acc[FIELDS.index(ss_f)]
+    if n == 0:
+        return 0, math.nan, math.nan
+    mean = s / n
+    var = max(ss - s * s / n, 0.0) / (n - 1) if n > 1 else math.nan
+    return int(n), mean, var
+
+
+def msprt(mean_a, var_a, n_a, mean_b, var_b, n_b, tau: float, alpha: float):
+    """
+    평균 차이(B - A)의 mSPRT (정규 혼합 prior N(0, tau²))
+      Λ = sqrt(v / (v + τ²)) · exp(Δ² τ² / (2 v (v + τ²))),  v = var_a/n_a + var_b/n_b
+    → (Δ, 1/Λ: always-valid p-value 후보, 1-alpha always-valid CI 반폭). 표본 부족이면 None
+    """
+    if n_a < 2 or n_b < 2:
+        return None
+    v = var_a / n_a + var_b / n_b
+    if not v > 0:
+        return None
+    diff, t2 = mean_b - mean_a, tau * tau
+    log_lr = 0.5 * math.log(v / (v + t2)) + diff * diff * t2 / (2 * v * (v + t2))
+    p = math.exp(-log_lr) if log_lr > 0 else 1.0  # Λ ≤ 1이면 1
+    half = math.sqrt(v * (v + t2) / t2 * (2 * math.log(1 / alpha) + math.log((v + t2) / v)))
+    return diff, p, half
+
+
+class ABStats:
+    """
+    서빙 프로세스 내 온라인 A/B 집계 + 순차 검정
+      - observe(): 라우팅 결과(arm, score, label)를 arm별 count/sum/sumsq에 누적 (배치 단위 bincount)
+        version(요청이 사용한 router 버전)이 현재 집계 버전과 다르면 버림 (교체 중 이전 router로 스코어링된 배치)
+      - report(): 요청 시 arm별 평균/분산 + B vs A mSPRT (always-valid p-value, CI)
+        p-value는 이전 값과의 최소, CI는 이전 CI와의 교집합으로 유지 (어느 시점에 봐도 유효)
+      - flush 스레드: flush_seconds마다 스냅샷을 MLflow run에 log_batch 1회로 기록
+      - bind_version(v): router 버전이 바뀌면 집계를 스냅샷과 동시에 초기화 (_lock 안에서 원자적)
+        이전 버전의 마지막 스냅샷 기록/run 종료는 flush 스레드가 수행 → 교체 경로에 MLflow I/O 없음
+    """
+
+    def __init__(self, control: str = "PolicyA", treatment: str = "PolicyB", alpha: float = 0.05,
+                 tau: float = 0.05, flush_seconds: float = 60.0,
+                 experiment: str = "abtest_movielens", run_name: str = "AB_Online_Stats"):
+        self.control, self.treatment = control, treatment
+        self.alpha, self.tau = float(alpha), float(tau)
+        self.flush_seconds = float(flush_seconds)
+        self.experiment, self.run_name = experiment, run_name
+        self.version = None
+        self.flushes = self.flush_failures = self.stale_rows = 0
+        self.last_error: Optional[str] = None
+        self._acc = {}                  # arm → np.ndarray(len(FIELDS))
+        self._seq = {}                  # 지표 → {"p": 누적 최소 p, "lo", "hi": 누적 교집합 CI}
+        self._run = {"run_id": None, "step": 0}  # 현재 버전의 MLflow run
+        self._pending = deque()         # 종료된 버전의 (acc, seq, version, started, run) — flush 스레드가 기록
+        self._started = time.time()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._kick = threading.Event()  # 버전 교체 시 flush 스레드 즉시 깨우기
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def run_id(self) -> Optional[str]:
+        return self._run["run_id"]
+
+    # -------------------------------------------------- 집계
+    def observe(self, arms, scores, labels=None, version=None) -> None:
+        arms = np.asarray(arms).astype(str)
+        if len(arms) == 0:
+            return
+        scores = np.asarray(scores, dtype=np.float64)
+        names, inv = np.unique(arms, return_inverse=True)
+        k = len(names)
+        cols = [np.bincount(inv, minlength=k), np.bincount(inv, scores, k), np.bincount(inv, scores * scores, k)]
+        if labels is not None:
+            labels = np.asarray(labels, dtype=np.float64)
+            has = ~np.isnan(labels)
+            lab = np.where(has, labels, 0.0)
+            cols += [np.bincount(inv, has, k), np.bincount(inv, lab, k), np.bincount(inv, lab * lab, k)]
+        else:
+            cols += [np.zeros(k)] * 3
+        delta = np.column_stack(cols).astype(np.float64)
+        with self._lock:
+            if version is not None and version != self.version:
+                self.stale_rows += len(arms)
+                return
+            for name, row in zip(names.tolist(), delta):
+                acc = self._acc.get(name)
+                if acc is None:
+                    acc = self._acc[name] = np.zeros(len(FIELDS))
+                acc += row
+
+    def bind_version(self, version) -> None:
+        """router 버전 교체 → 이전 버전 집계를 넘겨받고 초기화 (기록은 flush 스레드에서)"""
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is not None and self._acc and self.flush_seconds > 0:
+                self._pending.append((self._acc, self._seq, self.version, self._started, self._run))
+            self._acc, self._seq = {}, {}
+            self._run = {"run_id": None, "step": 0}
+            self._started = time.time()
+            self.version = version
+        self._kick.set()
+
+    # -------------------------------------------------- 검정/리포트
+    def _snapshot(self):
+        with self._lock:
+            return ({arm: a.copy() for arm, a in self._acc.items()}, self._seq, self.version, self._started,
+                    self._run)
+
+    def report(self) -> dict:
+        acc, seq, version, started, _ = self._snapshot()
+        return self._report(acc, seq, version, started)
+
+    def _report(self, acc: dict, seq: dict, version, started: float) -> dict:
+        arms = {}
+        for arm, a in acc.items():
+            stats = {"exposures": int(a[0])}
+            for metric, fields in TESTS.items():
+                n, mean, var = _moments(a, *fields)
+                if metric == "label":
+                    stats["labeled"] = n
+                stats[f"{metric}_mean"] = None if math.isnan(mean) else mean
+                stats[f"{metric}_var"] = None if math.isnan(var) else var
+            arms[arm] = stats
+
+        tests = {}
+        if self.control in acc and self.treatment in acc:
+            for metric, fields in TESTS.items():
+                n_a, m_a, v_a = _moments(acc[self.control], *fields)
+                n_b, m_b, v_b = _moments(acc[self.treatment], *fields)
+                res = msprt(m_a, v_a, n_a, m_b, v_b, n_b, self.tau, self.alpha)
+                if res is None:
+                    continue
+                diff, p, half = res
+                with self._lock:  # 누적 최소 p / CI 교집합 (동시 report 간 일관)
+                    cur = seq.setdefault(metric, {"p": 1.0, "lo": -math.inf, "hi": math.inf})
+                    cur["p"] = min(cur["p"], p)
+                    cur["lo"], cur["hi"] = max(cur["lo"], diff - half), min(cur["hi"], diff + half)
+                    cur = dict(cur)
+                tests[metric] = {"diff": diff, "p_value": cur["p"], "ci_low": cur["lo"], "ci_high": cur["hi"],
+                                 "significant": cur["p"] <= self.alpha, "n_control": n_a, "n_treatment": n_b}
+        return {"version": version, "since": started, "control": self.control,
+                "treatment": self.treatment, "alpha": self.alpha, "tau": self.tau, "arms": arms, "tests": tests}
+
+    # -------------------------------------------------- MLflow 기록
+    def _metrics(self, rep: dict) -> dict:
+        out = {}
+        for arm, stats in rep["arms"].items():
+            out.update({f"online_{arm}_{k}": v for k, v in stats.items() if v is not None})
+        for metric, t in rep["tests"].items():
+            out.update({f"online_{metric}_{k}": float(t[k]) for k in ("diff", "p_value", "ci_low", "ci_high")})
+        return out
+
+    def flush(self, final: bool = False) -> bool:
+        """대기 중인 이전 버전 스냅샷 + 현재 스냅샷 → MLflow log_batch (데이터 없으면 생략). final이면 현재 run 종료"""
+        self._drain()
+        acc, seq, version, started, run = self._snapshot()
+        return self._log(self._report(acc, seq, version, started), run, final)
+
+    def _drain(self) -> None:
+        """교체된 버전들의 마지막 스냅샷을 각자의 run에 기록하고 종료 (실패 시 다음 주기에 재시도)"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                item = self._pending.popleft()
+            acc, seq, version, started, run = item
+            if not self._log(self._report(acc, seq, version, started), run, final=True):
+                with self._lock:
+                    self._pending.appendleft(item)
+                return
+
+    def _log(self, rep: dict, run: dict, final: bool) -> bool:
+        if not rep["arms"]:
+            return False
+        with self._flush_lock:
+            try:
+                client = MlflowClient()
+                if run["run_id"] is None:
+                    exp = client.get_experiment_by_name(self.experiment)
+                    exp_id = exp.experiment_id if exp else client.create_experiment(self.experiment)
+                    run["run_id"] = client.create_run(exp_id, run_name=self.run_name,
+                                                      tags={"router_version": str(rep["version"])}).info.run_id
+                now = int(time.time() * 1000)
+                metrics = [Metric(k, float(v), now, run["step"]) for k, v in self._metrics(rep).items()]
+                client.log_batch(run["run_id"], metrics=metrics,
+                                 tags=[RunTag(f"significant_{m}", str(t["significant"]).lower())
+                                       for m, t in rep["tests"].items()])
+                if final:
+                    client.set_terminated(run["run_id"], "FINISHED")
+                run["step"] += 1
+                self.flushes += 1
+                self.last_error = None
+                return True
+            except Exception as e:
+                self.flush_failures += 1
+                self.last_error = str(e)
+                print(f"[ab_stats] flush failed: {e}")
+                return False
+
+    def start(self) -> "ABStats":
+        if self.flush_seconds > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run_loop, name="ab-stats-flush", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._kick.set()
+        if self.flush_seconds > 0:
+            self.flush(final=True)
+
+    def _run_loop(self):
+        while not self._stop.is_set():
+            self._kick.wait(self.flush_seconds)
+            self._kick.clear()
+            if self._stop.is_set():
+                break
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            exposures = {arm: int(a[0]) for arm, a in self._acc.items()}
+            pending = len(self._pending)
+        return {"version": self.version, "run_id": self.run_id, "exposures": exposures,
+                "stale_rows": self.stale_rows, "pending_final": pending,
+                "flush_seconds": self.flush_seconds, "flushes": self.flushes,
+                "flush_failures": self.flush_failures, "last_error": self.last_error}
@@ -0,0 +1,87 @@
+# src/bench_eval_engine.py
+"""
+단일 패스 평가 엔진 vs 기존 스크립트 계산 (eval_offline_ab + eval_curves + eval_segments)
+  - parity : 지표/곡선/세그먼트의 최대 절대 오차 (sklearn 함수 기준)
+             lift/gain은 동점 점수의 순서에 따라 달라짐 (기존 _lift_curve는 불안정 정렬) → 따로 표시
+  - latency: 정책 전체 평가 시간 (예측 저장소 입력, MLflow/그림 제외, best-of-repeat)
+
+    python src/bench_eval_engine.py
+"""
+import argparse, time
+import numpy as np
+from sklearn.metrics import roc_curve, precision_recall_curve, brier_score_loss
+from sklearn.calibration import calibration_curve
+
+from eval_engine import build_segments, evaluate_policy
+from features import has_split, load_split
+from predictions import load_predictions
+from utils import binary_metrics
+
+
+def _lift_curve(y_true, y_prob, bins=10):
+    """기존 eval_curves의 누적 gain/lift 계산 (분위마다 앞부분 합)"""
+    order = np.argsort(-y_prob)
+    y = np.asarray(y_true)[order]
+    pos = y.sum()
+    pct = np.linspace(0, 1, bins + 1)[1:]
+    gains = [y[:int(len(y) * p)].sum() / pos if pos > 0 else 0.0 for p in pct]
+    return pct, gains, np.asarray(gains) / pct
+
+
+def _baseline(y, p, segments):
+    """기존 스크립트들이 하던 계산 (각 함수가 점수를 따로 정렬)"""
+    out = {"metrics": {**binary_metrics(y, p), "brier": brier_score_loss(y, p)}}
+    fpr, tpr, _ = roc_curve(y, p)
+    precision, recall, _ = precision_recall_curve(y, p)
+    prob_true, prob_pred = calibration_curve(y, p, n_bins=10, strategy="quantile")
+    pct, gains, lift = _lift_curve(y, p)
+    out["curves"] = {"roc": (fpr, tpr), "pr": (recall, precision), "calibration": (prob_pred, prob_true),
+                     "gain": (pct, np.asarray(gains)), "lift": (pct, lift)}
+    out["segments"] = {k: binary_metrics(y[m], p[m]) for k, m in segments.items() if m.sum()}
+    return out
+
+
+def _max_diff(a: dict, b: dict, curves=("roc", "pr", "calibration")) -> float:
+    d = max(abs(a["metrics"][k] - b["metrics"][k]) for k in b["metrics"])
+    for k in curves:
+        x, y = b["curves"][k]
+        ex, ey = a["curves"][k]
+        if len(ex) != len(x):
+            return float("inf")
+        d = max(d, np.abs(ex - x).max(), np.abs(ey - y).max())
+    for seg, m in b["segments"].items():
+        d = max(d, max(abs(a["segments"][seg][k] - v) for k, v in m.items()))
+    return float(d)
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(split="test", repeat=3):
+    preds, versions = load_predictions(split)
+    df = load_split(split)
+    segments = build_segments(df, load_split("train", genres=False) if has_split("train") else None)
+    y = preds["label"].to_numpy()
+    print(f"{len(y):,} rows, {len(segments)} segments")
+    for name in versions:
+        p = preds[name].to_numpy()
+        engine, base = evaluate_policy(y, p, segments), _baseline(y, p, segments)
+        t_base = _best(lambda: _baseline(y, p, segments), repeat)
+        t_eng = _best(lambda: evaluate_policy(y, p, segments), repeat)
+        tie = max(np.abs(engine["curves"][k][1] - base["curves"][k][1]).max() for k in ("gain", "lift"))
+        print(f"policy {name}: max |Δ| = {_max_diff(engine, base):.3e} (lift/gain tie order {tie:.1e})  "
+              f"baseline {t_base * 1e3:.0f} ms → engine {t_eng * 1e3:.0f} ms ({t_base / t_eng:.1f}x)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--split", default="test")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    main(args.split, args.repeat)
@@ -0,0 +1,72 @@
+# src/bench_lgbm_compiled.py
+"""
+Policy B 추론 경로 비교: LGBMClassifier.predict_proba(OHE CSR) vs CompiledForest(인덱스 표현)
+  - parity : 두 경로 확률의 최대 절대 오차
+  - latency: 배치 크기별 1회 호출 지연 (userId/movieId 입력 → CSR 조립/인덱스 조회 포함, best-of-repeat)
+
+    python src/bench_lgbm_compiled.py
+    python src/bench_lgbm_compiled.py --sizes 1 10 100 1000 --repeat 50
+"""
+import argparse, tempfile, time
+from pathlib import Path
+import joblib
+import numpy as np
+
+from features import ART_DIR, load_split, load_encoder, build_movie_genres
+from lgbm_compiled import CompiledForest, export_booster
+
+SIZES = [1, 10, 100, 1_000]
+
+
+def _best_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main(sizes=SIZES, repeat=20, parity_rows=20_000, seed=42):
+    clf = joblib.load(ART_DIR / "lgbm_model.pkl")
+    txt = ART_DIR / "lgbm_model.txt"
+    if not txt.exists():
+        txt = export_booster(clf, Path(tempfile.mkdtemp()) / "lgbm_model.txt")
+    t0 = time.perf_counter()
+    forest = CompiledForest.from_model_file(txt)
+    print(f"compile: {forest.n_trees} trees, {len(forest.feature):,} splits in {time.perf_counter() - t0:.2f}s")
+
+    enc = load_encoder()
+    offset = enc.genre_offset
+    # 서빙과 같은 입력: userId/movieId만 받고 장르는 인코더의 영화별 lookup으로 조인
+    test = load_split("test")
+    enc.set_genres(build_movie_genres([test]))
+    df = test[["userId", "movieId"]]
+
+    def native(rows):
+        return clf.predict_proba(enc.transform(rows))[:, 1]
+
+    def compiled(rows):
+        G = enc.genre_matrix(rows) if enc.genre_cols else None
+        u, m = enc.index(rows)
+        return forest.predict_proba_index(u, m, G, offset)
+
+    rows = df.sample(n=min(parity_rows, len(df)), random_state=seed)
+    print(f"parity: max |Δp| = {np.abs(native(rows) - compiled(rows)).max():.3e} over {len(rows):,} rows")
+
+    print(f"{'rows':>6} | {'native ms':>10} | {'compiled ms':>11} | {'speedup':>8}")
+    for n in sizes:
+        batch = df.sample(n=n, replace=n > len(df), random_state=seed)
+        t_native = _best_ms(lambda: native(batch), repeat)
+        t_comp = _best_ms(lambda: compiled(batch), repeat)
+        print(f"{n:>6} | {t_native:>10.3f} | {t_comp:>11.3f} | {t_native / t_comp:>7.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--parity-rows", type=int, default=20_000)
+    args = ap.parse_args()
+    main(args.sizes, args.repeat, args.parity_rows)
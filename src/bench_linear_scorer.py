@@ -0,0 +1,62 @@
+# src/bench_linear_scorer.py
+"""
+Policy A 추론 경로 비교: LogisticRegression.predict_proba(OHE CSR) vs LinearScorer(gather 3번 + sigmoid)
+  - parity    : test split 전체에서 두 경로 확률의 최대 절대 오차
+  - throughput: 배치 크기별 rows/sec (userId/movieId 입력 → CSR 조립/인덱스 조회 포함, best-of-repeat)
+
+    python src/bench_linear_scorer.py
+    python src/bench_linear_scorer.py --sizes 1 100 10000 --repeat 10
+"""
+import argparse, time
+import joblib
+import numpy as np
+
+from features import ART_DIR, load_split, load_encoder, build_movie_genres
+from linear_scorer import LinearScorer
+
+SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+
+def _rows_per_sec(fn, n: int, repeat: int) -> float:
+    fn()  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return n / best
+
+
+def main(sizes=SIZES, repeat=5, seed=42):
+    clf = joblib.load(ART_DIR / "logreg_model.pkl")
+    enc = load_encoder()
+    path = ART_DIR / "logreg_weights.npz"
+    scorer = LinearScorer.load(path) if path.exists() else LinearScorer.from_classifier(clf, enc)
+    # 서빙과 같은 입력: userId/movieId만 받고 장르는 인코더의 영화별 lookup으로 조인
+    test = load_split("test")
+    enc.set_genres(build_movie_genres([test]))
+    df = test[["userId", "movieId"]]
+
+    def native(rows):
+        return clf.predict_proba(enc.transform(rows))[:, 1]
+
+    def linear(rows):
+        u, m = enc.index(rows)
+        return scorer.predict_proba_index(u, m, enc.genre_matrix(rows) if enc.genre_cols else None)
+
+    print(f"parity: max |Δp| = {np.abs(native(df) - linear(df)).max():.3e} over {len(df):,} rows")
+
+    print(f"{'rows':>8} | {'native rows/s':>14} | {'linear rows/s':>14} | {'speedup':>8}")
+    for n in sizes:
+        batch = df.sample(n=n, replace=n > len(df), random_state=seed)
+        rps_native = _rows_per_sec(lambda: native(batch), n, repeat)
+        rps_linear = _rows_per_sec(lambda: linear(batch), n, repeat)
+        print(f"{n:>8} | {rps_native:>14,.0f} | {rps_linear:>14,.0f} | {rps_linear / rps_native:>7.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,75 @@
+# src/bench_router.py
+"""
+ABRouter 처리량 벤치마크: 배치 경로 vs 기존 행 단위 루프 (rows/sec)
+
+    python src/bench_router.py
+    python src/bench_router.py --sizes 1 10 100 1000 --max-loop-rows 1000
+"""
+import argparse, tempfile, time
+from types import SimpleNamespace
+from pathlib import Path
+import joblib
+import pandas as pd
+
+from features import DATA_DIR, load_split, load_encoder, build_movie_genres
+from bucketing import SplitConfig, build_assignment_table, save_assignment_table
+from lgbm_compiled import export_booster
+from linear_scorer import LinearScorer
+from ab_router_pyfunc import ABRouter, ARTIFACTS
+
+SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+
+def _router(df: pd.DataFrame, tmp: Path, batch: bool) -> ABRouter:
+    """학습 아티팩트(A/B 모델, 인코더)로 라우터 구성. 장르 lookup/배정 테이블/A 계수/B 텍스트 모델은 임시 생성"""
+    enc_path, table_path = tmp / "router_enc.npz", tmp / "router_assignment.npy"
+    lin_path, txt_path = tmp / "logreg_weights.npz", tmp / "lgbm_model.txt"
+    if not enc_path.exists():
+        enc = load_encoder()
+        enc.set_genres(build_movie_genres([df])).save(enc_path)
+        LinearScorer.from_classifier(joblib.load(ARTIFACTS["modelA"]), enc).save(lin_path)
+        users = pd.read_parquet(DATA_DIR / "users.parquet")["userId"].to_numpy()
+        save_assignment_table(table_path, build_assignment_table(users, SplitConfig()))
+        export_booster(joblib.load(ARTIFACTS["modelB"]), txt_path)
+    router = ABRouter(batch=batch)
+    router.load_context(SimpleNamespace(artifacts={**ARTIFACTS, "encoder": str(enc_path),
+                                                   "assignment": str(table_path), "modelA_linear": str(lin_path),
+                                                   "modelB_txt": str(txt_path)}))
+    return router
+
+
+def _rows_per_sec(router: ABRouter, batch: pd.DataFrame, repeat: int) -> float:
+    router.predict(None, batch.iloc[:1])  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        router.predict(None, batch)
+        best = min(best, time.perf_counter() - t0)
+    return len(batch) / best
+
+
+def main(sizes=SIZES, max_loop_rows=10_000, repeat=3, seed=42):
+    df = load_split("test")
+    tmp = Path(tempfile.mkdtemp())
+    batched = _router(df, tmp, batch=True)
+    rowwise = _router(df, tmp, batch=False)
+
+    pool = df[["userId", "movieId"]]
+    print(f"{'rows':>8} | {'batch rows/s':>14} | {'loop rows/s':>14} | {'speedup':>8}")
+    for n in sizes:
+        batch = pool.sample(n=n, replace=n > len(pool), random_state=seed).reset_index(drop=True)
+        rps_batch = _rows_per_sec(batched, batch, repeat)
+        if n <= max_loop_rows:
+            rps_loop = _rows_per_sec(rowwise, batch, 1 if n >= 1_000 else repeat)
+            print(f"{n:>8} | {rps_batch:>14,.0f} | {rps_loop:>14,.0f} | {rps_batch / rps_loop:>7.1f}x")
+        else:
+            print(f"{n:>8} | {rps_batch:>14,.0f} | {'-':>14} | {'-':>8}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--max-loop-rows", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    main(args.sizes, args.max_loop_rows, args.repeat)
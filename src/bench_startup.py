@@ -0,0 +1,62 @@
+# src/bench_startup.py
+"""
+Router 기동 시간 벤치마크 (매 측정마다 새 프로세스 → cold start)
+  - import      : ab_router_pyfunc 모듈 import
+  - load_model  : mlflow.pyfunc.load_model(MODEL_URI)
+  - first A / B : arm별 첫 예측 (지연 로드 시 모델 역직렬화 포함)
+
+    python src/bench_startup.py --model-uri runs:/<run_id>/ab_router
+"""
+import argparse, json, os, subprocess, sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import ab_router_pyfunc
+t_import = time.perf_counter() - t0
+
+import mlflow, pandas as pd
+t0 = time.perf_counter()
+model = mlflow.pyfunc.load_model(sys.argv[1])
+t_load = time.perf_counter() - t0
+
+router = model.unwrap_python_model()
+uids = pd.Series(range(1, 200))
+arms = router.assign(uids.to_numpy())
+out = {"import_s": t_import, "load_model_s": t_load}
+for arm in ("A", "B"):
+    uid = int(uids[arms == arm].iloc[0])
+    t0 = time.perf_counter()
+    model.predict(pd.DataFrame({"userId": [uid], "movieId": [1]}))
+    out[f"first_predict_{arm}_s"] = time.perf_counter() - t0
+print(json.dumps(out))
+"""
+
+
+def _measure(model_uri: str, preload: bool) -> dict:
+    env = {**os.environ, "ROUTER_PRELOAD": "1" if preload else "0",
+           "PYTHONPATH": os.pathsep.join([str(SRC_DIR), os.environ.get("PYTHONPATH", "")])}
+    res = subprocess.run([sys.executable, "-c", _CHILD, model_uri], env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def main(model_uri="models:/movielens_ctr_router@router", repeat=3):
+    print(f"{'mode':>9} | {'import':>8} | {'load_model':>10} | {'first A':>8} | {'first B':>8} | {'total':>8}")
+    for preload in (False, True):
+        runs = [_measure(model_uri, preload) for _ in range(repeat)]
+        best = {k: min(r[k] for r in runs) for k in runs[0]}
+        total = sum(best.values())
+        print(f"{'parallel' if preload else 'lazy':>9} | {best['import_s']:>7.3f}s | {best['load_model_s']:>9.3f}s | "
+              f"{best['first_predict_A_s']:>7.3f}s | {best['first_predict_B_s']:>7.3f}s | {total:>7.3f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model-uri", default="models:/movielens_ctr_router@router")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    main(args.model_uri, args.repeat)
@@ -0,0 +1,118 @@
+# src/bucketing.py
+"""
+userId → 실험 arm 배정 (벡터화)
+  - mode="hash": salt를 섞은 64-bit 비암호화 해시(splitmix64) → 10,000 버킷 → 가중치 구간으로 arm 결정
+  - mode="md5" : 기존 라우터 호환 (int(md5(str(uid)).hexdigest(), 16) % 2 == 0 → 첫 번째 arm)
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+N_BUCKETS = 10_000
+
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _salt64(salt: str) -> np.uint64:
+    """실험별 salt 문자열 → 64-bit 정수 (실험당 1회 계산)"""
+    return np.uint64(int.from_bytes(hashlib.blake2b(salt.encode(), digest_size=8).digest(), "little"))
+
+
+def splitmix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (uint64 배열, overflow는 mod 2^64)"""
+    with np.errstate(over="ignore"):
+        z = x + _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * _M1
+        z = (z ^ (z >> np.uint64(27))) * _M2
+        return z ^ (z >> np.uint64(31))
+
+
+def hash_buckets(user_ids, salt: str = "", n_buckets: int = N_BUCKETS) -> np.ndarray:
+    """userId 배열 → [0, n_buckets) 버킷 (int32)"""
+    x = np.asarray(user_ids, dtype=np.int64).astype(np.uint64) ^ _salt64(salt)
+    return (splitmix64(x) % np.uint64(n_buckets)).astype(np.int32)
+
+
+def md5_parity(user_ids) -> np.ndarray:
+    """기존 라우터와 동일한 MD5 짝/홀 (0=짝수 → A). 고유 userId 단위로 1회만 해시"""
+    uniq, inv = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    # int(hexdigest, 16) % 2 == 마지막 바이트의 최하위 비트
+    odd = np.fromiter((hashlib.md5(b"%d" % u).digest()[-1] & 1 for u in uniq.tolist()),
+                      dtype=np.int8, count=len(uniq))
+    return odd[inv]
+
+
+def bucket_bounds(weights: Sequence[float], n_buckets: int = N_BUCKETS) -> np.ndarray:
+    """arm 가중치 → 누적 버킷 경계 (마지막 값 = n_buckets)"""
+    w = np.asarray(weights, dtype=np.float64)
+    if w.ndim != 1 or len(w) == 0 or (w < 0).any() or w.sum() <= 0:
+        raise ValueError(f"invalid arm weights: {weights}")
+    bounds = np.round(np.cumsum(w) / w.sum() * n_buckets).astype(np.int64)
+    bounds[-1] = n_buckets
+    return bounds
+
+
+@dataclass(frozen=True)
+class SplitConfig:
+    """실험 트래픽 분할 설정: arm 이름/가중치/salt/해시 모드"""
+    arms: tuple = ("A", "B")
+    weights: tuple = (0.5, 0.5)
+    salt: str = ""
+    mode: str = "md5"             # "md5" (기존 배정 유지) | "hash"
+    n_buckets: int = N_BUCKETS
+
+    def __post_init__(self):
+        if len(self.arms) != len(self.weights):
+            raise ValueError("arms and weights must have the same length")
+        if self.mode == "md5" and (len(self.arms) != 2 or self.weights[0] != self.weights[1]):
+            raise ValueError("md5 compatibility mode only supports a 50/50 split over two arms")
+        if self.mode not in ("md5", "hash"):
+            raise ValueError(f"unknown split mode: {self.mode}")
+
+    def assign(self, user_ids) -> np.ndarray:
+        """userId 배열 → arm 인덱스 (int8)"""
+        if self.mode == "md5":
+            return md5_parity(user_ids)
+        buckets = hash_buckets(user_ids, self.salt, self.n_buckets)
+        return np.searchsorted(bucket_bounds(self.weights, self.n_buckets), buckets, side="right").astype(np.int8)
+
+    def labels(self, user_ids) -> np.ndarray:
+        """userId 배열 → arm 이름 배열"""
+        return np.asarray(self.arms, dtype=object)[self.assign(user_ids)]
+
+
+# ---------------------------------------------------------------
+# userId → arm 사전 계산 테이블 (int8, userId 인덱스, 미등록 -1)
+# ---------------------------------------------------------------
+def build_assignment_table(user_ids, split: SplitConfig) -> np.ndarray:
+    """알려진 userId 전체를 미리 배정 → table[userId] = arm 인덱스"""
+    user_ids = np.unique(np.asarray(user_ids, dtype=np.int64))
+    user_ids = user_ids[user_ids >= 0]
+    table = np.full(int(user_ids.max()) + 1 if len(user_ids) else 0, -1, dtype=np.int8)
+    table[user_ids] = split.assign(user_ids)
+    return table
+
+
+def save_assignment_table(path, table: np.ndarray) -> None:
+    np.save(path, np.ascontiguousarray(table, dtype=np.int8), allow_pickle=False)
+
+
+def load_assignment_table(path) -> np.ndarray:
+    """메모리 매핑(read-only)으로 로드 → 복사 없이 페이지 단위 접근"""
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+def lookup_arms(table: np.ndarray, user_ids, split: SplitConfig) -> np.ndarray:
+    """테이블 fancy-index 1회로 arm 조회, 테이블에 없는 userId만 해시로 fallback"""
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    ok = (user_ids >= 0) & (user_ids < len(table))
+    arms = np.full(len(user_ids), -1, dtype=np.int8)
+    arms[ok] = table[user_ids[ok]]
+    unseen = arms < 0
+    if unseen.any():
+        arms[unseen] = split.assign(user_ids[unseen])
+    return arms
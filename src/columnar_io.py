@@ -0,0 +1,104 @@
+# src/columnar_io.py
+"""
+bulk_predict 컬럼형 페이로드 인코딩/디코딩 (행 단위 pydantic 검증/records 직렬화 없이)
+  - JSON   : {"userId": [...], "movieId": [...], "label": [...]}   (label 선택)
+  - Arrow  : Arrow IPC stream/file, 컬럼 userId, movieId (label 선택)
+  - NumPy  : .npy int32 (n, 2) 배열 = [userId, movieId]
+"""
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+JSON = "application/json"
+ARROW = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+NPY = "application/x-npy"
+
+FORMATS = {"json": JSON, "arrow": ARROW, "npy": NPY}
+ARMS = ["PolicyA", "PolicyB"]  # npy 응답의 arm 코드 순서
+
+
+def media_type(content_type: str) -> str:
+    ct = (content_type or JSON).split(";")[0].strip().lower()
+    if ct in (ARROW, ARROW_FILE, "application/vnd.apache.arrow"):
+        return ARROW
+    if ct in (NPY, "application/octet-stream"):
+        return NPY
+    return JSON
+
+
+def _frame(user_ids, movie_ids, labels=None) -> pd.DataFrame:
+    user_ids, movie_ids = np.asarray(user_ids), np.asarray(movie_ids)
+    if user_ids.ndim != 1 or user_ids.shape != movie_ids.shape:
+        raise ValueError("userId/movieId must be 1-D columns of equal length")
+    if len(user_ids) == 0:
+        raise ValueError("empty payload: no rows")
+    if not (np.issubdtype(user_ids.dtype, np.integer) and np.issubdtype(movie_ids.dtype, np.integer)):
+        raise ValueError("userId/movieId must be integer columns")
+    df = pd.DataFrame({"userId": user_ids.astype(np.int64, copy=False),
+                       "movieId": movie_ids.astype(np.int64, copy=False)})
+    if labels is not None:
+        labels = pd.array(labels, dtype="Int64")
+        if len(labels) != len(df):
+            raise ValueError("label column length mismatch")
+        df["label"] = labels
+    return df
+
+
+def decode_request(body: bytes, content_type: str) -> pd.DataFrame:
+    """요청 바디 → DataFrame(userId, movieId[, label])"""
+    if not body:
+        raise ValueError("empty request body")
+    mt = media_type(content_type)
+    if mt == ARROW:
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        cols = table.column_names
+        if "userId" not in cols or "movieId" not in cols:
+            raise ValueError(f"Arrow payload needs userId/movieId columns, got {cols}")
+        return _frame(table.column("userId").to_numpy(), table.column("movieId").to_numpy(),
+                      table.column("label").to_pylist() if "label" in cols else None)
+    if mt == NPY:
+        arr = np.load(io.BytesIO(body), allow_pickle=False)
+        if arr.ndim != 2 or arr.shape[1] != 2:
+            raise ValueError(f".npy payload must be shaped (n, 2) [userId, movieId], got {arr.shape}")
+        return _frame(arr[:, 0], arr[:, 1])
+    payload = json.loads(body)
+    if "userId" not in payload or "movieId" not in payload:
+        raise ValueError("JSON payload needs userId/movieId arrays")
+    return _frame(np.asarray(payload["userId"]), np.asarray(payload["movieId"]), payload.get("label"))
+
+
+def encode_response(out_df: pd.DataFrame, summary: dict, mt: str):
+    """예측 결과 → (바디 bytes, media type, 헤더). summary는 JSON 본문 또는 X-AB-Summary 헤더/메타데이터"""
+    headers = {"X-AB-Summary": json.dumps(summary)}
+    if mt == ARROW:
+        table = pa.table({
+            "userId": pa.array(out_df["userId"].to_numpy()),
+            "movieId": pa.array(out_df["movieId"].to_numpy()),
+            "assigned": pa.array(out_df["assigned"].to_numpy()).dictionary_encode(),
+            "score": pa.array(out_df["score"].to_numpy(dtype=np.float64)),
+        }).replace_schema_metadata({"summary": headers["X-AB-Summary"]})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW, headers
+    if mt == NPY:
+        out = np.empty(len(out_df), dtype=[("arm", "i1"), ("score", "<f8")])
+        out["arm"] = np.where(out_df["assigned"].to_numpy() == ARMS[0], 0, 1)
+        out["score"] = out_df["score"].to_numpy(dtype=np.float64)
+        buf = io.BytesIO()
+        np.save(buf, out, allow_pickle=False)
+        return buf.getvalue(), NPY, {**headers, "X-AB-Arms": ",".join(ARMS)}
+    columns = {
+        "userId": out_df["userId"].to_numpy().tolist(),
+        "movieId": out_df["movieId"].to_numpy().tolist(),
+        "assigned": out_df["assigned"].to_numpy().tolist(),
+        "score": out_df["score"].to_numpy(dtype=np.float64).tolist(),
+    }
+    return json.dumps({"summary": summary, "columns": columns}).encode(), JSON, {}
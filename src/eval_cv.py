@@ -1,42 +1,124 @@
 # src/eval_cv.py
-import numpy as np, mlflow, joblib
+"""
+k-fold CV (fold 내부 in-sample 학습/평가 — 기존 정의 유지)
+  - fold 희소 행렬은 1회 생성해 A/B가 공유 (SharedCSR: 공유 메모리, 워커에 피클 없이 전달)
+  - (fold, policy) 학습을 프로세스 풀에 분배, 다음 fold 행렬 생성과 학습이 겹치도록 즉시 제출
+  - fold/정책별 wall time, peak RSS를 AUC와 함께 기록
+  - B의 fold별 LightGBM Dataset은 binary로 저장 (lgbm_dataset) → 같은 데이터·피처 버전·fold 인코더의 재실행은 binning 생략
+
+    python src/eval_cv.py
+    python src/eval_cv.py --k 5 --workers 4
+"""
+import argparse, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np, mlflow
 from pathlib import Path
 from sklearn.model_selection import StratifiedKFold
 from sklearn.linear_model import LogisticRegression
 import lightgbm as lgb
-from features import load_split, build_logreg_features
+from features import FEATURE_CACHE_VERSION, load_split, build_logreg_features, data_fingerprint
+from lgbm_dataset import CV_DATASET_DIR, cached_dataset, dataset_key, lease
+from shared_csr import SharedCSR, peak_rss_mb, reset_peak_rss
 from utils import binary_metrics, plot_bar
 
 ART = Path(__file__).resolve().parent.parent / "data" / "artifacts"
 ART.mkdir(parents=True, exist_ok=True)
 
-def main(k=5):
+POLICIES = ("A", "B")
+SEED = 42
+# B (간이: LGBM을 same split으로) — LGBMClassifier(objective="binary", n_estimators=200)과 같은 설정
+B_PARAMS = {"objective": "binary", "verbose": -1}
+B_ROUNDS = 200
+
+
+def _fit_fold(fold: int, policy: str, spec: dict, n_threads: int, dataset_path: str = None):
+    """워커: 공유 fold 행렬에 attach → 정책 학습 + in-sample 지표 (B는 fold Dataset binary로 학습)"""
+    reset_peak_rss()
+    t0 = time.perf_counter()
+    shared = SharedCSR.attach(spec)
+    X, y = shared.X, shared.y
+    if policy == "A":
+        clf = LogisticRegression(penalty="elasticnet", l1_ratio=0.1, C=1.0, solver="saga", max_iter=200, n_jobs=-1)
+        clf.fit(X, y)
+        p = clf.predict_proba(X)[:, 1]
+    else:
+        # 동시 학습 수만큼 스레드 분할
+        clf = lgb.train({**B_PARAMS, "num_threads": n_threads}, lgb.Dataset(dataset_path), num_boost_round=B_ROUNDS)
+        p = clf.predict(X)
+    m = binary_metrics(y, p)
+    del X, y, clf
+    shared.close()
+    return fold, policy, m, time.perf_counter() - t0, peak_rss_mb()
+
+
+def main(k=5, workers=None):
     df = load_split("train")
-    enc_path = ART / "logreg_ohe.pkl"
-    # fold 마다 enc을 다시 fit하여 편향 방지
-    aucA, aucB = [], []
+    cpus = os.cpu_count() or 1
+    workers = workers or min(k * len(POLICIES), cpus)
+    n_threads = max(1, cpus // workers)
+    res = {}       # (fold, policy) → (metrics, wall_s, peak_rss_mb)
+    build_s = {}   # fold → 행렬 생성 시간
+    dataset_s = {} # fold → B Dataset binary 구성 시간 (재사용이면 None)
 
     mlflow.set_experiment("abtest_movielens")
     with mlflow.start_run(run_name=f"CV_{k}fold"):
-        skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=42)
-        for i, (_, idx) in enumerate(skf.split(df[["userId","movieId"]], df["label"])):
-            valid = df.iloc[idx]
-            # A
-            XA, yA, encA = build_logreg_features(valid, enc=None, fit=True)
-            clfA = LogisticRegression(penalty="elasticnet", l1_ratio=0.1, C=1.0, solver="saga", max_iter=200, n_jobs=-1).fit(XA, yA)
-            pA = clfA.predict_proba(XA)[:,1]
-            mA = binary_metrics(yA, pA); aucA.append(mA["auc"])
-            # B (간이: LGBM을 same split으로)
-            import lightgbm as lgb
-            XB, yB, encB = build_logreg_features(valid, enc=None, fit=True)
-            clfB = lgb.LGBMClassifier(objective="binary", n_estimators=200).fit(XB, yB)
-            pB = clfB.predict_proba(XB)[:,1]
-            mB = binary_metrics(yB, pB); aucB.append(mB["auc"])
-
-        mlflow.log_metric("A_LogReg_auc_mean", float(np.mean(aucA)))
-        mlflow.log_metric("A_LogReg_auc_std",  float(np.std(aucA)))
-        mlflow.log_metric("B_LGBM_auc_mean",   float(np.mean(aucB)))
-        mlflow.log_metric("B_LGBM_auc_std",    float(np.std(aucB)))
+        mlflow.log_params({"cv_workers": workers, "cv_lgbm_threads": n_threads})
+        skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=SEED)
+        # 데이터 버전 + 피처 레이아웃 버전 + 분할. fold 인코더 해시는 fold 파일 이름에 (인코더 변경 시 재구성)
+        fold_key = dataset_key(data_fingerprint("train"), FEATURE_CACHE_VERSION, "cv", k, SEED)
+        shared, pending = {}, {}
+        t_start = time.perf_counter()
+        try:
+            # lease: fold 학습이 binary를 로드하는 동안 다른 CV 실행의 정리에서 제외
+            with lease(CV_DATASET_DIR / fold_key), ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = []
+                for i, (_, idx) in enumerate(skf.split(df[["userId","movieId"]], df["label"])):
+                    t0 = time.perf_counter()
+                    # fold 마다 enc을 다시 fit하여 편향 방지 (A/B 동일 행렬)
+                    X, y, enc = build_logreg_features(df.iloc[idx], enc=None, fit=True)
+                    shared[i] = SharedCSR(X, y)
+                    build_s[i] = time.perf_counter() - t0
+                    path, dataset_s[i] = cached_dataset(fold_key, f"fold{i}-{enc.fingerprint()[:16]}", X, y)
+                    del X, y
+                    pending[i] = len(POLICIES)
+                    futures += [ex.submit(_fit_fold, i, pol, shared[i].spec, n_threads, str(path)) for pol in POLICIES]
+                for fut in as_completed(futures):
+                    i, pol, m, wall, rss = fut.result()
+                    res[(i, pol)] = (m, wall, rss)
+                    print(f"[cv] fold {i} {pol}: auc={m['auc']:.4f} wall={wall:.1f}s peak_rss={rss:.0f}MB")
+                    pending[i] -= 1
+                    if pending[i] == 0:
+                        shared.pop(i).close()  # fold 학습이 모두 끝나면 공유 블록 해제
+        finally:
+            for s in shared.values():
+                s.close()
+        total_s = time.perf_counter() - t_start
+
+        aucA = [res[(i, "A")][0]["auc"] for i in range(k)]
+        aucB = [res[(i, "B")][0]["auc"] for i in range(k)]
+        metrics = {
+            "A_LogReg_auc_mean": float(np.mean(aucA)), "A_LogReg_auc_std": float(np.std(aucA)),
+            "B_LGBM_auc_mean": float(np.mean(aucB)), "B_LGBM_auc_std": float(np.std(aucB)),
+            "cv_wall_s": total_s,
+        }
+        for (i, pol), (m, wall, rss) in res.items():
+            metrics[f"fold{i}_{pol}_auc"] = m["auc"]
+            metrics[f"fold{i}_{pol}_wall_s"] = wall
+            metrics[f"fold{i}_{pol}_peak_rss_mb"] = rss
+        for i, t in build_s.items():
+            metrics[f"fold{i}_build_s"] = t
+        constructed = [t for t in dataset_s.values() if t is not None]
+        if constructed:
+            metrics["cv_dataset_construct_s"] = float(np.sum(constructed))
+        mlflow.log_metrics(metrics)
+
+        print(f"{'fold':>4} | {'build s':>7} | {'A auc':>6} {'A s':>6} {'A MB':>6} | {'B auc':>6} {'B s':>6} {'B MB':>6}")
+        for i in range(k):
+            (mA, wA, rA), (mB, wB, rB) = res[(i, "A")], res[(i, "B")]
+            print(f"{i:>4} | {build_s[i]:>7.2f} | {mA['auc']:>6.4f} {wA:>6.1f} {rA:>6.0f} | {mB['auc']:>6.4f} {wB:>6.1f} {rB:>6.0f}")
+        print(f"[cv] {k} folds × {len(POLICIES)} policies on {workers} workers in {total_s:.1f}s; "
+              f"LightGBM datasets: {len(constructed)} constructed, {k - len(constructed)} reused")
 
         # 박스플롯 저장
         import matplotlib.pyplot as plt
@@ -47,4 +129,8 @@ def main(k=5):
         mlflow.log_artifact(out)
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+    main(args.k, args.workers)
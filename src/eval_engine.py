@@ -0,0 +1,226 @@
+# src/eval_engine.py
+"""
+단일 패스 오프라인 평가: 정책별 점수를 1회 정렬 → 모든 지표/곡선/세그먼트를 같은 정렬에서 유도
+  - 지표  : AUC, PR-AUC, logloss (utils.binary_metrics와 같은 정의: 확률 clip 1e-7), Brier
+  - 곡선  : ROC/PR (sklearn roc_curve / precision_recall_curve와 같은 점), 보정 10분위, lift/gain
+  - 세그먼트: cold user/item, 인기 상위 10%/롱테일, 장르 — 전체 정렬의 부분열이라 재정렬 없음
+  - MLflow run 1개 + log_metrics 1회 (지표 이름은 기존 eval_offline_ab/eval_curves/eval_segments와 동일,
+    세 스크립트는 이 main을 실행하는 호환용 진입점)
+
+    python src/eval_engine.py
+"""
+import json
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import mlflow
+import numpy as np
+import pandas as pd
+from sklearn.metrics import auc
+
+from features import GENRE_COLS, has_split, load_split
+from predictions import load_predictions
+from utils import plot_bar
+
+ART = Path(__file__).resolve().parent.parent / "data" / "artifacts"
+ART.mkdir(parents=True, exist_ok=True)
+
+EXPERIMENT = "abtest_movielens"
+EPS = 1e-7  # utils.binary_metrics clip
+# 정책 → 기존 eval_offline_ab 지표 접두어 (그 외 정책은 이름 그대로)
+POLICY_PREFIX = {"A": "A_logreg", "B": "B_lgbm"}
+POLICY_LABEL = {"A": "A(LogReg)", "B": "B(LightGBM)"}
+
+
+# ---------------------------------------------------------------
+# 정렬된 점수 → 곡선/지표 (sklearn _binary_clf_curve와 같은 누적)
+# ---------------------------------------------------------------
+def _clf_curve(y_sorted: np.ndarray, s_sorted: np.ndarray):
+    """내림차순 정렬된 (y, score) → 고유 threshold별 (fps, tps, thresholds)"""
+    threshold_idxs = np.r_[np.flatnonzero(np.diff(s_sorted)), len(s_sorted) - 1]
+    tps = np.cumsum(y_sorted, dtype=np.float64)[threshold_idxs]
+    fps = 1 + threshold_idxs - tps
+    return fps, tps, s_sorted[threshold_idxs]
+
+
+def _roc(fps, tps, thresholds):
+    """roc_curve(drop_intermediate=True)와 같은 (fpr, tpr, thresholds)"""
+    if len(fps) > 2:
+        keep = np.flatnonzero(np.r_[True, np.logical_or(np.diff(fps, 2), np.diff(tps, 2)), True])
+        fps, tps, thresholds = fps[keep], tps[keep], thresholds[keep]
+    fps, tps = np.r_[0, fps], np.r_[0, tps]
+    fpr = fps / fps[-1] if fps[-1] > 0 else np.full(fps.shape, np.nan)
+    tpr = tps / tps[-1] if tps[-1] > 0 else np.full(tps.shape, np.nan)
+    return fpr, tpr, np.r_[np.inf, thresholds]
+
+
+def _pr(fps, tps, thresholds):
+    """precision_recall_curve와 같은 (precision, recall, thresholds) — recall 내림차순"""
+    ps = tps + fps
+    precision = np.zeros_like(tps)
+    np.divide(tps, ps, out=precision, where=ps != 0)
+    recall = tps / tps[-1] if tps[-1] != 0 else np.ones_like(tps)
+    return np.r_[precision[::-1], 1], np.r_[recall[::-1], 0], thresholds[::-1]
+
+
+def _ranking_metrics(y_sorted, s_sorted) -> dict:
+    """AUC(roc_auc_score) / PR-AUC(average_precision_score). 한 클래스뿐이면 정의되지 않아 생략"""
+    if len(y_sorted) == 0 or y_sorted.all() or not y_sorted.any():
+        return {}
+    curve = _clf_curve(y_sorted, s_sorted)
+    fpr, tpr, _ = _roc(*curve)
+    precision, recall, _ = _pr(*curve)
+    return {"auc": float(auc(fpr, tpr)), "pr_auc": float(-np.sum(np.diff(recall) * precision[:-1]))}
+
+
+def _logloss(y, p_clipped) -> float:
+    return float(-np.mean(np.where(y, np.log(p_clipped), np.log(1 - p_clipped))))
+
+
+def _calibration(p_asc, y_asc, n_bins: int = 10):
+    """calibration_curve(strategy="quantile")와 같은 (prob_true, prob_pred) — 오름차순 정렬 입력"""
+    bins = np.percentile(p_asc, np.linspace(0, 1, n_bins + 1) * 100)
+    binids = np.searchsorted(bins[1:-1], p_asc)
+    total = np.bincount(binids, minlength=len(bins))
+    nonzero = total != 0
+    prob_true = np.bincount(binids, weights=y_asc, minlength=len(bins))[nonzero] / total[nonzero]
+    prob_pred = np.bincount(binids, weights=p_asc, minlength=len(bins))[nonzero] / total[nonzero]
+    return prob_true, prob_pred
+
+
+def _lift(y_sorted, bins: int = 10):
+    """누적 gain/lift (상위 int(n·pct)개 양성 비율)"""
+    n, pos = len(y_sorted), y_sorted.sum()
+    pct = np.linspace(0, 1, bins + 1)[1:]
+    cum = np.r_[0, np.cumsum(y_sorted)]
+    gains = cum[(n * pct).astype(int)] / pos if pos > 0 else np.zeros(len(pct))
+    return pct, gains, gains / pct
+
+
+def evaluate_policy(y, p, segments=None, n_bins: int = 10) -> dict:
+    """
+    한 정책 점수 p에 대한 전체 평가 (argsort 1회)
+      → {"metrics": {auc, pr_auc, logloss, brier}, "curves": {...}, "segments": {이름: {auc, pr_auc, logloss}}}
+    segments: 이름 → bool mask (y/p와 같은 행 순서)
+    """
+    y = np.asarray(y).astype(bool)
+    p = np.asarray(p, dtype=np.float64)
+    order = np.argsort(p, kind="mergesort")[::-1]  # roc_curve와 같은 내림차순 (동점은 역순 안정)
+    y_s, p_s = y[order], p[order]
+    pc_s = np.clip(p_s, EPS, 1 - EPS)              # clip은 단조 → 같은 정렬 유지
+
+    metrics = {**_ranking_metrics(y_s, pc_s), "logloss": _logloss(y_s, pc_s),
+               "brier": float(np.mean((y_s - p_s) ** 2))}
+    curve = _clf_curve(y_s, p_s)                    # 곡선은 clip 전 점수
+    fpr, tpr, _ = _roc(*curve)
+    precision, recall, _ = _pr(*curve)
+    prob_true, prob_pred = _calibration(p_s[::-1], y_s[::-1], n_bins)
+    pct, gains, lift = _lift(y_s)
+    curves = {"roc": (fpr, tpr), "pr": (recall, precision), "calibration": (prob_pred, prob_true),
+              "gain": (pct, gains), "lift": (pct, lift)}
+
+    seg_metrics = {}
+    for name, mask in (segments or {}).items():
+        m = np.asarray(mask, dtype=bool)[order]     # 부분열도 내림차순
+        if m.any():
+            seg_metrics[name] = {**_ranking_metrics(y_s[m], pc_s[m]), "logloss": _logloss(y_s[m], pc_s[m])}
+    return {"metrics": metrics, "curves": curves, "segments": seg_metrics}
+
+
+# ---------------------------------------------------------------
+# 세그먼트 (cold user/item, 인기/롱테일, 장르 상위 max_genres개)
+# ---------------------------------------------------------------
+def build_segments(df: pd.DataFrame, df_train=None, max_genres: int = 8) -> dict:
+    segments = {}
+    if df_train is not None:
+        segments["cold_user"] = ~df["userId"].isin(df_train["userId"].unique()).to_numpy()
+        segments["cold_item"] = ~df["movieId"].isin(df_train["movieId"].unique()).to_numpy()
+    counts = df["movieId"].value_counts()
+    if len(counts) > 0:
+        top_k = int(max(1, 0.1 * len(counts)))
+        popular = df["movieId"].isin(counts.index[:top_k]).to_numpy()
+        segments["popular_top10pct"] = popular
+        segments["long_tail"] = ~popular
+    for g in [c for c in GENRE_COLS if c in df.columns][:max_genres]:
+        segments[f"genre_{g}"] = (df[g] == 1).to_numpy()
+    return segments
+
+
+def _plot(x, y, title, xlabel, ylabel, fname, diagonal: bool = False, marker=None) -> Path:
+    plt.figure(figsize=(5, 4))
+    if diagonal:
+        plt.plot([0, 1], [0, 1], "--")
+    plt.plot(x, y, marker=marker)
+    plt.title(title); plt.xlabel(xlabel); plt.ylabel(ylabel)
+    plt.tight_layout()
+    out = ART / fname
+    plt.savefig(out, dpi=160); plt.close()
+    return out
+
+
+def log_results(results: dict, split: str = "test") -> dict:
+    """정책별 결과 → 기존 이름의 지표 dict (log_metrics 1회) + 곡선 그림/JSON 아티팩트"""
+    metrics, artifacts, points = {}, [], {}
+    for name, res in results.items():
+        prefix = POLICY_PREFIX.get(name, name)
+        for k in ("auc", "pr_auc", "logloss"):
+            if k in res["metrics"]:
+                metrics[f"{prefix}_{split}_{k}"] = res["metrics"][k]
+        metrics[f"{name}_brier"] = res["metrics"]["brier"]
+        for seg, m in res["segments"].items():
+            for k, v in m.items():
+                metrics[f"{split}_{seg}_{name}_{k}"] = v
+
+        label = POLICY_LABEL.get(name, name)
+        c = res["curves"]
+        artifacts += [
+            _plot(*c["roc"], f"ROC - {label}", "FPR", "TPR", f"roc_{name}.png"),
+            _plot(*c["pr"], f"PR - {label}", "Recall", "Precision", f"pr_{name}.png"),
+            _plot(*c["calibration"], f"Calibration - {label}", "Predicted prob.", "Observed freq.",
+                  f"calib_{name}.png", diagonal=True, marker="o"),
+            _plot(*c["lift"], f"Lift - {name}", "Population %", "Lift", f"lift_{name}.png"),
+            _plot(*c["gain"], f"Cumulative Gain - {name}", "Population %", "Gain", f"gain_{name}.png"),
+        ]
+        # 보정/lift/gain 점은 JSON으로도 보관 (ROC/PR은 점 수가 많아 그림만)
+        points[name] = {k: [np.asarray(v).tolist() for v in c[k]] for k in ("calibration", "gain", "lift")}
+
+    if set(results) >= {"A", "B"}:
+        a, b = results["A"]["metrics"], results["B"]["metrics"]
+        if "auc" in a and "auc" in b:
+            artifacts.append(Path(plot_bar({"A_LogReg": a["auc"], "B_LightGBM": b["auc"]}, f"AUC ({split.title()})", "auc_bar.png")))
+        artifacts.append(Path(plot_bar({"A_LogReg": a["logloss"], "B_LightGBM": b["logloss"]},
+                                       "LogLoss (lower is better)", "logloss_bar.png")))
+    curves_path = ART / "eval_curves.json"
+    curves_path.write_text(json.dumps(points))
+    artifacts.append(curves_path)
+
+    mlflow.log_metrics(metrics)  # 단일 배치 기록
+    for path in artifacts:
+        mlflow.log_artifact(str(path))
+    return metrics
+
+
+def main(split: str = "test", policies=None):
+    preds, versions = load_predictions(split, policies)
+    df = load_split(split)
+    assert len(preds) == len(df), "prediction store rows do not match the split"
+    df_train = load_split("train", genres=False) if split != "train" and has_split("train") else None
+    segments = build_segments(df, df_train)
+
+    y = preds["label"].to_numpy()
+    results = {name: evaluate_policy(y, preds[name].to_numpy(), segments) for name in versions}
+
+    mlflow.set_experiment(EXPERIMENT)
+    with mlflow.start_run(run_name="Eval_Offline_Unified"):
+        mlflow.log_params({f"{k}_model_version": v for k, v in versions.items()})
+        metrics = log_results(results, split)
+
+    print(f"\n=== {split.title()} Metrics ({len(metrics)} logged) ===")
+    for name, res in results.items():
+        m = res["metrics"]
+        print(f"{POLICY_LABEL.get(name, name):<13}: AUC={m.get('auc', float('nan')):.4f}  "
+              f"PR-AUC={m.get('pr_auc', float('nan')):.4f}  LogLoss={m['logloss']:.4f}  Brier={m['brier']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 # src/features.py  (완전 교체본)
+import hashlib
+import json
+import os
+import time
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -6,11 +10,101 @@ from sklearn.preprocessing import OneHotEncoder
 import scipy.sparse as sp
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "processed"
-GENRE_COLS = [f"g{i}" for i in range(19)]  # prepare_movielens가 만드는 19개 장르
+ART_DIR = Path(__file__).resolve().parent.parent / "data" / "artifacts"
+# movies.parquet genre_mask의 bit 순서 (bit j = GENRE_VOCAB[j] → GENRE_COLS[j])
+# prepare_movielens.GENRES_19와 같아야 함 — movies.parquet 메타데이터/인코더 상태에 기록해 로드 시 검증
+GENRE_VOCAB = [
+    "Action","Adventure","Animation","Children's","Comedy","Crime","Documentary","Drama",
+    "Fantasy","Film-Noir","Horror","Musical","Mystery","Romance","Sci-Fi","Thriller",
+    "War","Western","(no genres listed)"
+]
+GENRE_VOCAB_KEY = b"genre_vocab"  # movies.parquet 스키마 메타데이터 키 (JSON 장르 이름 목록)
+GENRE_COLS = [f"g{i}" for i in range(len(GENRE_VOCAB))]  # prepare_movielens가 만드는 19개 장르
 
-def load_split(split: str) -> pd.DataFrame:
-    """Load split parquet file: 'train' | 'valid' | 'test'"""
-    df = pd.read_parquet(DATA_DIR / f"{split}.parquet")
+ENC_PATH = ART_DIR / "logreg_enc.npz"          # IndexEncoder (기본)
+LEGACY_ENC_PATH = ART_DIR / "logreg_ohe.pkl"   # 구버전 OneHotEncoder pickle
+TRAIN_STATE_PATH = ART_DIR / "train_state.json" # 정책별 학습에 반영된 평점 범위 (증분 학습 워터마크)
+
+RATINGS_DIR = DATA_DIR / "ratings"            # prepare_movielens 스트리밍 출력 (split=*/time_bucket=* 파티션)
+MOVIES_PATH = DATA_DIR / "movies.parquet"      # 영화 차원 테이블 (movieId, title, genre_mask)
+
+def split_path(split: str) -> Path:
+    """split 위치: 단일 parquet 파일, 없으면 스트리밍 전처리의 split 파티션 디렉터리"""
+    path = DATA_DIR / f"{split}.parquet"
+    part = RATINGS_DIR / f"split={split}"
+    return part if not path.exists() and part.exists() else path
+
+def has_split(split: str) -> bool:
+    return split_path(split).exists()
+
+def decode_genre_mask(mask) -> np.ndarray:
+    """uint32 장르 bitmask → (n, 19) int8 (bit j = GENRE_COLS[j])"""
+    mask = np.asarray(mask, dtype=np.uint32)
+    return ((mask[:, None] >> np.arange(len(GENRE_COLS), dtype=np.uint32)) & 1).astype(np.int8)
+
+_movies_cache = {}
+
+def movies_genre_vocab(path: Path = None):
+    """movies.parquet에 기록된 장르 어휘 (bit 순서). 기록 이전 파일이면 None"""
+    import pyarrow.parquet as pq
+    meta = pq.read_schema(path or MOVIES_PATH).metadata or {}
+    return json.loads(meta[GENRE_VOCAB_KEY]) if GENRE_VOCAB_KEY in meta else None
+
+def load_movies():
+    """
+    영화 차원 테이블 (movieId 정렬). genre_mask가 없는 구버전 movies.parquet(movieId만)이면 None
+    파일의 장르 어휘가 GENRE_VOCAB(decode_genre_mask의 bit 해석)와 다르면 ValueError
+    """
+    path = MOVIES_PATH
+    if not path.exists():
+        return None
+    key = (str(path), path.stat().st_mtime_ns)
+    if key not in _movies_cache:
+        movies = pd.read_parquet(path)
+        if "genre_mask" not in movies.columns:
+            return None
+        vocab = movies_genre_vocab(path)
+        if vocab is not None and vocab != GENRE_VOCAB:
+            raise ValueError(f"{path} genre vocabulary {vocab} does not match features.GENRE_VOCAB; "
+                             "re-run prepare_movielens.py with the current code")
+        _movies_cache.clear()
+        _movies_cache[key] = movies.sort_values("movieId").reset_index(drop=True)
+    return _movies_cache[key]
+
+def _join_movies(df: pd.DataFrame, movies: pd.DataFrame, titles: bool = False) -> pd.DataFrame:
+    """평점 fact 테이블 + 영화 차원 조인: movieId → 행 번호 gather 후 bitmask를 g0..g18로 전개"""
+    row = _lookup(_dense_index(movies["movieId"].to_numpy(dtype=np.int64)), df["movieId"].to_numpy())
+    known = row >= 0
+    mask = np.where(known, movies["genre_mask"].to_numpy()[np.where(known, row, 0)], 0)
+    extra = pd.DataFrame(decode_genre_mask(mask), columns=GENRE_COLS, index=df.index)
+    if titles:
+        extra.insert(0, "title", np.where(known, movies["title"].to_numpy(dtype=object)[np.where(known, row, 0)], None))
+    return pd.concat([df, extra], axis=1)
+
+def load_split(split: str, genres: bool = True, titles: bool = False, since=None) -> pd.DataFrame:
+    """
+    Load split parquet file: 'train' | 'valid' | 'test'
+      - 압축 포맷(평점 fact + movies.parquet genre_mask)이면 로드 시 장르 g0..g18(int8)을 조인
+      - genres=False면 fact 컬럼만, titles=True면 title도 조인 (구버전 포맷은 저장된 그대로)
+      - since: timestamp > since 인 행만 (증분 학습의 새 평점 구간, row group 통계로 건너뜀)
+      - 조인한 장르의 어휘는 df.attrs["genre_vocab"]에 기록 (IndexEncoder.fit이 상태에 저장)
+    """
+    path = split_path(split)
+    filters = None if since is None else [("timestamp", ">", int(since))]
+    if path.is_dir():
+        # 파티션 컬럼(time_bucket) 제외, 단일 파일 모드와 같은 시간순 정렬
+        df = pd.read_parquet(path, filters=filters).drop(columns=["time_bucket"], errors="ignore")
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    else:
+        df = pd.read_parquet(path, filters=filters)
+    if (genres or titles) and not _genre_cols(df):
+        movies = load_movies()
+        if movies is not None:
+            df = _join_movies(df, movies, titles)
+            if not genres:
+                df = df.drop(columns=GENRE_COLS)
+            else:
+                df.attrs["genre_vocab"] = list(GENRE_VOCAB)
     return df
 
 def _ensure_genre_numeric(df: pd.DataFrame) -> pd.DataFrame:
@@ -22,39 +116,456 @@ def _ensure_genre_numeric(df: pd.DataFrame) -> pd.DataFrame:
         df[cols] = df[cols].apply(pd.to_numeric, errors="coerce").fillna(0).astype(np.int8)
     return df
 
-def build_logreg_features(df: pd.DataFrame, enc: OneHotEncoder = None, fit: bool = True):
+def _genre_cols(df: pd.DataFrame) -> list:
+    return [c for c in GENRE_COLS if c in df.columns] or [c for c in df.columns if c.startswith("g")]
+
+def _lookup(table: np.ndarray, ids) -> np.ndarray:
+    """dense id 테이블 조회 (범위 밖/음수 id는 -1)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    out = np.full(len(ids), -1, dtype=np.int32)
+    ok = (ids >= 0) & (ids < len(table))
+    out[ok] = table[ids[ok]]
+    return out
+
+def _grow_index(table: np.ndarray, ids: np.ndarray, start: int) -> np.ndarray:
+    """dense id 테이블에 새 id들을 start부터 이어지는 offset으로 추가 (기존 항목 유지)"""
+    size = max(len(table), int(ids.max()) + 1 if len(ids) else 0)
+    out = np.full(size, -1, dtype=np.int32)
+    out[:len(table)] = table
+    out[ids] = np.arange(start, start + len(ids), dtype=np.int32)
+    return out
+
+def _dense_index(ids: np.ndarray, start: int = 0) -> np.ndarray:
+    """정렬된 고유 id → 컬럼 offset dense 테이블 (미등록 id는 -1)"""
+    table = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int32)
+    table[ids] = np.arange(start, start + len(ids), dtype=np.int32)
+    return table
+
+
+class IndexEncoder:
     """
-    입력: df(columns: userId, movieId, label, g0..g18)
-    출력: X(희소 CSR), y(ndarray), enc(OneHotEncoder)
-      - userId, movieId -> OneHot (희소)
-      - genres g0..g18 -> float32 CSR로 변환 후 hstack
+    OneHotEncoder(handle_unknown="ignore") 대체: 배열 lookup 기반 희소 인코더
+      - user_index / movie_index: id → 컬럼 offset dense 테이블 (미등록 -1)
+      - 영화별 장르 CSR 행 (genre_row[movieId] → genre_indptr/indices/data)
+    컬럼 배치는 기존과 동일: [userId OHE | movieId OHE | 장르]
+      - extend()로 늘린 인코더는 새 user/movie 컬럼이 그 뒤에 추가됨 (기존 컬럼 번호 유지, genre_offset으로 장르 위치)
+      - genre_vocab: 장르 컬럼 j의 장르 이름 (movies.parquet 조인 데이터로 fit한 경우, 구버전 포맷이면 None)
     """
-    # 1) 장르 숫자형 보장
-    df = _ensure_genre_numeric(df)
 
-    # 2) ID 피처: 카테고리 캐스팅(안정적 OHE)
+    def __init__(self, user_index, movie_index, n_users, n_movies, genre_cols,
+                 genre_row=None, genre_indptr=None, genre_indices=None, genre_data=None, genre_offset=None,
+                 genre_vocab=None):
+        self.user_index = np.asarray(user_index, dtype=np.int32)
+        self.movie_index = np.asarray(movie_index, dtype=np.int32)
+        self.n_users, self.n_movies = int(n_users), int(n_movies)
+        self.genre_offset = self.n_users + self.n_movies if genre_offset is None else int(genre_offset)
+        self.genre_cols = [str(c) for c in genre_cols]
+        self.genre_row = np.zeros(0, np.int32) if genre_row is None else np.asarray(genre_row, np.int32)
+        self.genre_indptr = np.zeros(1, np.int64) if genre_indptr is None else np.asarray(genre_indptr, np.int64)
+        self.genre_indices = np.zeros(0, np.int32) if genre_indices is None else np.asarray(genre_indices, np.int32)
+        self.genre_data = np.zeros(0, np.float32) if genre_data is None else np.asarray(genre_data, np.float32)
+        self.genre_vocab = None if genre_vocab is None else [str(g) for g in genre_vocab]
+
+    @property
+    def n_features(self) -> int:
+        return self.n_users + self.n_movies + len(self.genre_cols)
+
+    @property
+    def grown(self) -> bool:
+        """extend()로 id 컬럼이 장르 블록 뒤에 추가된 레이아웃인지"""
+        return self.genre_offset != self.n_users + self.n_movies
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame) -> "IndexEncoder":
+        users = np.unique(df["userId"].to_numpy(dtype=np.int64))
+        movies = np.unique(df["movieId"].to_numpy(dtype=np.int64))
+        genre_cols = _genre_cols(df)
+        enc = cls(_dense_index(users), _dense_index(movies, len(users)),
+                  len(users), len(movies), genre_cols, genre_vocab=df.attrs.get("genre_vocab") if genre_cols else None)
+        if enc.genre_cols:
+            enc.set_genres(build_movie_genres([df]))
+        return enc
+
+    @classmethod
+    def from_onehot(cls, ohe: OneHotEncoder, genre_cols) -> "IndexEncoder":
+        """구버전 logreg_ohe.pkl(userId, movieId 순) → IndexEncoder (동일 컬럼)"""
+        users = np.asarray(ohe.categories_[0], dtype=np.int64)
+        movies = np.asarray(ohe.categories_[1], dtype=np.int64)
+        return cls(_dense_index(users), _dense_index(movies, len(users)),
+                   len(users), len(movies), genre_cols)
+
+    def extend(self, df: pd.DataFrame) -> "IndexEncoder":
+        """
+        df의 미등록 user/movie를 기존 컬럼 뒤(n_features부터)에 추가한 새 인코더 (증분 학습용)
+          - 기존 user/movie/장르 컬럼 번호는 그대로 → 이전 계수/트리를 그대로 이어서 학습 가능
+          - 새 영화의 장르 lookup 행도 추가
+        """
+        check_genre_vocab(self, df.attrs.get("genre_vocab"))
+        users = np.unique(df["userId"].to_numpy(dtype=np.int64))
+        movies = np.unique(df["movieId"].to_numpy(dtype=np.int64))
+        new_u = users[_lookup(self.user_index, users) < 0]
+        new_m = movies[_lookup(self.movie_index, movies) < 0]
+        col = self.n_features
+        enc = IndexEncoder(_grow_index(self.user_index, new_u, col), _grow_index(self.movie_index, new_m, col + len(new_u)),
+                           self.n_users + len(new_u), self.n_movies + len(new_m), self.genre_cols,
+                           self.genre_row, self.genre_indptr, self.genre_indices, self.genre_data, self.genre_offset,
+                           self.genre_vocab)
+        if len(new_m) and self.genre_cols and len(self.genre_row):
+            rows = build_movie_genres([df])
+            rows = rows[rows["movieId"].isin(new_m)]
+            G = sp.csr_matrix(rows[self.genre_cols].to_numpy(dtype=np.float32))
+            mids = rows["movieId"].to_numpy(dtype=np.int64)
+            n_rows = len(self.genre_indptr) - 1
+            enc.genre_row = _grow_index(self.genre_row, mids, n_rows)
+            enc.genre_indptr = np.r_[self.genre_indptr, self.genre_indptr[-1] + G.indptr[1:]].astype(np.int64)
+            enc.genre_indices = np.r_[self.genre_indices, G.indices].astype(np.int32)
+            enc.genre_data = np.r_[self.genre_data, G.data].astype(np.float32)
+        return enc
+
+    def set_genres(self, movie_genres: pd.DataFrame) -> "IndexEncoder":
+        """movieId + 장르 컬럼 테이블로 영화별 장르 CSR 행 구성 (서빙 시 장르 lookup용)"""
+        mids = movie_genres["movieId"].to_numpy(dtype=np.int64)
+        G = sp.csr_matrix(movie_genres[self.genre_cols].to_numpy(dtype=np.float32))
+        self.genre_row = np.full(int(mids.max()) + 1 if len(mids) else 0, -1, dtype=np.int32)
+        self.genre_row[mids] = np.arange(len(mids), dtype=np.int32)
+        self.genre_indptr, self.genre_indices, self.genre_data = G.indptr.astype(np.int64), G.indices, G.data
+        return self
+
+    def index(self, df: pd.DataFrame):
+        """행별 활성 ID 컬럼 (user, movie; 미등록 -1)"""
+        return _lookup(self.user_index, df["userId"].to_numpy()), _lookup(self.movie_index, df["movieId"].to_numpy())
+
+    def _genre_entries(self, df: pd.DataFrame):
+        """행별 장르 nnz (counts, 컬럼, 값) — df에 장르 컬럼이 있으면 그대로, 없으면 영화별 lookup"""
+        n = len(df)
+        if not self.genre_cols:
+            return np.zeros(n, np.int64), np.zeros(0, np.int32), np.zeros(0, np.float32)
+        if all(c in df.columns for c in self.genre_cols):
+            G = df[self.genre_cols]
+            if not all(pd.api.types.is_numeric_dtype(t) for t in G.dtypes):
+                G = _ensure_genre_numeric(G.copy())
+            G = np.nan_to_num(G.to_numpy(dtype=np.float32))
+            rows, cols = np.nonzero(G)
+            return np.bincount(rows, minlength=n), cols.astype(np.int32), G[rows, cols]
+        if len(self.genre_row) == 0:  # 장르 lookup 미설정 → 장르 기여 없음
+            return np.zeros(n, np.int64), np.zeros(0, np.int32), np.zeros(0, np.float32)
+        g = _lookup(self.genre_row, df["movieId"].to_numpy())
+        ok = g >= 0
+        starts = np.where(ok, self.genre_indptr[np.maximum(g, 0)], 0)
+        counts = np.where(ok, self.genre_indptr[np.maximum(g, 0) + 1] - starts, 0)
+        # ragged gather: 각 행의 [start, start+count) 구간을 이어붙임
+        pos = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        return counts, self.genre_indices[pos], self.genre_data[pos]
+
+    def genre_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """행별 장르 값 dense 행렬 (n, len(genre_cols)) — 트리 엔진의 인덱스 표현 입력"""
+        counts, cols, vals = self._genre_entries(df)
+        G = np.zeros((len(df), len(self.genre_cols)), dtype=np.float32)
+        G[np.repeat(np.arange(len(df)), counts), cols] = vals
+        return G
+
+    def transform(self, df: pd.DataFrame) -> sp.csr_matrix:
+        """요청/학습 배치 전체를 CSR(indptr/indices/data)로 한 번에 조립"""
+        u, m = self.index(df)
+        has_u, has_m = u >= 0, m >= 0
+        g_counts, g_cols, g_vals = self._genre_entries(df)
+
+        counts = has_u.astype(np.int64) + has_m + g_counts
+        indptr = np.zeros(len(df) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.ones(indptr[-1], dtype=np.float64)
+
+        # 행 내 순서: user < movie < 장르 (컬럼 오름차순 유지)
+        start = indptr[:-1]
+        indices[start[has_u]] = u[has_u]
+        indices[(start + has_u)[has_m]] = m[has_m]
+        g_rows = np.repeat(np.arange(len(df)), g_counts)
+        g_rank = np.arange(len(g_cols)) - np.repeat(np.cumsum(g_counts) - g_counts, g_counts)
+        g_pos = (start + has_u + has_m)[g_rows] + g_rank
+        indices[g_pos] = g_cols + self.genre_offset
+        data[g_pos] = g_vals
+        X = sp.csr_matrix((data, indices, indptr), shape=(len(df), self.n_features))
+        if self.grown:  # 추가된 id 컬럼은 장르 뒤 → 행 내 컬럼 순서 정렬
+            X.sort_indices()
+        return X
+
+    def state(self) -> dict:
+        """저장/해시용 배열 dict (np.savez 키)"""
+        return dict(
+            user_index=self.user_index, movie_index=self.movie_index,
+            n_users=np.int64(self.n_users), n_movies=np.int64(self.n_movies),
+            genre_cols=np.asarray(self.genre_cols, dtype=str),
+            genre_row=self.genre_row, genre_indptr=self.genre_indptr,
+            genre_indices=self.genre_indices, genre_data=self.genre_data,
+            # 기본 레이아웃이면 생략 → 기존 저장 파일/해시와 동일
+            **({"genre_offset": np.int64(self.genre_offset)} if self.grown else {}),
+            **({"genre_vocab": np.asarray(self.genre_vocab, dtype=str)} if self.genre_vocab is not None else {}),
+        )
+
+    @classmethod
+    def from_state(cls, z) -> "IndexEncoder":
+        return cls(z["user_index"], z["movie_index"], z["n_users"], z["n_movies"], z["genre_cols"].tolist(),
+                   z["genre_row"], z["genre_indptr"], z["genre_indices"], z["genre_data"],
+                   z["genre_offset"] if "genre_offset" in z else None,
+                   z["genre_vocab"].tolist() if "genre_vocab" in z else None)
+
+    def fingerprint(self) -> str:
+        """인코더 상태 해시 (컬럼 배치/장르 lookup이 같으면 같은 값)"""
+        h = hashlib.blake2b(digest_size=16)
+        for k, v in sorted(self.state().items()):
+            v = np.ascontiguousarray(v)
+            h.update(k.encode())
+            h.update(str((v.dtype.str, v.shape)).encode())
+            h.update(v.tobytes())
+        return h.hexdigest()
+
+    def save(self, path) -> None:
+        np.savez_compressed(path, **self.state())
+
+    @classmethod
+    def load(cls, path) -> "IndexEncoder":
+        with np.load(path, allow_pickle=False) as z:
+            return cls.from_state(z)
+
+
+def data_genre_vocab():
+    """현재 processed 데이터의 장르 어휘: 압축 포맷(movies.parquet 조인)이면 GENRE_VOCAB, 구버전 포맷이면 None"""
+    return list(GENRE_VOCAB) if load_movies() is not None else None
+
+def check_genre_vocab(enc, vocab) -> None:
+    """인코더 장르 컬럼과 데이터 장르의 어휘가 둘 다 알려져 있고 다르면 ValueError (장르 bit 해석이 바뀐 경우)"""
+    enc_vocab = getattr(enc, "genre_vocab", None)
+    if enc_vocab is not None and vocab is not None and list(enc_vocab) != list(vocab):
+        raise ValueError(f"encoder genre vocabulary {enc_vocab} does not match data vocabulary {vocab}; "
+                         "retrain with train_logreg.py / train_lgbm.py")
+
+def load_encoder(genre_cols=None) -> IndexEncoder:
+    """
+    logreg_enc.npz 로드. 없으면 구버전 logreg_ohe.pkl을 변환 (genre_cols: 학습 시 장르 컬럼)
+    인코더의 장르 어휘가 현재 데이터와 다르면 ValueError
+    """
+    if ENC_PATH.exists():
+        enc = IndexEncoder.load(ENC_PATH)
+        check_genre_vocab(enc, data_genre_vocab())
+        return enc
+    import joblib
+    if genre_cols is None:
+        import pyarrow.dataset as ds
+        schema = ds.dataset(split_path("train" if has_split("train") else "test"), format="parquet").schema
+        genre_cols = _genre_cols(pd.DataFrame(columns=schema.names))
+        if not genre_cols and load_movies() is not None:
+            genre_cols = list(GENRE_COLS)  # 압축 포맷: load_split이 조인하는 장르
+    return IndexEncoder.from_onehot(joblib.load(LEGACY_ENC_PATH), genre_cols)
+
+def load_train_state() -> dict:
+    """
+    정책 → {"watermark": 반영된 최대 timestamp, "rows": 누적 학습 행 수, "mode", "updated_at",
+            "encoder": 모델이 학습된 인코더 fingerprint}
+    """
+    return json.loads(TRAIN_STATE_PATH.read_text()) if TRAIN_STATE_PATH.exists() else {}
+
+def _write_train_state(state: dict) -> None:
+    tmp = TRAIN_STATE_PATH.with_name(f".{TRAIN_STATE_PATH.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, TRAIN_STATE_PATH)
+
+def save_train_state(policy: str, watermark: int, rows: int, mode: str, encoder: str = None) -> dict:
+    state = load_train_state()
+    state[policy] = {"watermark": int(watermark), "rows": int(rows), "mode": mode, "updated_at": time.time(),
+                     **({"encoder": encoder} if encoder else {})}
+    _write_train_state(state)
+    return state[policy]
+
+def set_train_encoder(encoder: str, policies=None) -> None:
+    """
+    정책들의 인코더 fingerprint만 갱신 (증분 학습으로 인코더가 extend된 경우: 기존 컬럼 번호가 유지되므로
+    이번에 학습하지 않은 정책의 모델도 새 인코더와 호환)
+    """
+    state = load_train_state()
+    for policy in (state if policies is None else policies):
+        if policy in state:
+            state[policy]["encoder"] = encoder
+    _write_train_state(state)
+
+def check_train_encoders(fingerprint: str = None, exclude=(), state: dict = None):
+    """
+    train_state.json의 정책별 인코더 fingerprint가 서로 같고 (fingerprint가 주어지면) 그것과도 같은지 확인
+    → 공통 fingerprint (기록이 없으면 fingerprint). 다르면 ValueError (기록이 없는 구버전 상태는 건너뜀)
+    exclude: 비교에서 뺄 정책 (전체 재학습 중인 정책 자신)
+    """
+    state = load_train_state() if state is None else state
+    fps = {p: s["encoder"] for p, s in state.items() if p not in exclude and s.get("encoder")}
+    if fingerprint is not None:
+        fps["current encoder"] = fingerprint
+    if len(set(fps.values())) > 1:
+        raise ValueError(f"policies were trained with different encoders {fps}; "
+                         "retrain them together (train_logreg.py / train_lgbm.py --reset-encoder)")
+    return next(iter(fps.values()), None)
+
+def split_watermark(split: str = "train") -> int:
+    """split의 최대 timestamp (전체 학습 시 워터마크)"""
+    return int(pd.read_parquet(split_path(split), columns=["timestamp"])["timestamp"].max())
+
+def build_logreg_matrix(df: pd.DataFrame, enc=None, fit: bool = False):
+    """
+    label 없이 X(희소 CSR)만 생성 (서빙용). 출력: X, enc
+      - userId, movieId -> OneHot (희소), genres g0..g18 -> 장르 컬럼
+      - enc: IndexEncoder (기본) 또는 구버전 OneHotEncoder
+    """
+    if enc is None or (fit and isinstance(enc, IndexEncoder)):
+        enc = IndexEncoder.fit(df)
+    if isinstance(enc, IndexEncoder):
+        check_genre_vocab(enc, df.attrs.get("genre_vocab"))
+        return enc.transform(df), enc
+
+    # --- 구버전 OneHotEncoder 경로 ---
+    df = _ensure_genre_numeric(df)
     X_id_base = df[["userId", "movieId"]].copy()
     X_id_base["userId"] = X_id_base["userId"].astype("int64").astype("category")
     X_id_base["movieId"] = X_id_base["movieId"].astype("int64").astype("category")
+    X_id = enc.fit_transform(X_id_base) if fit else enc.transform(X_id_base)
 
-    # 3) OneHotEncoder (sklearn 1.5: sparse_output 사용)
-    if enc is None:
-        enc = OneHotEncoder(handle_unknown="ignore", sparse_output=True)
-        fit = True
-    if fit:
-        X_id = enc.fit_transform(X_id_base)   # scipy.sparse CSR/CSC
-    else:
-        X_id = enc.transform(X_id_base)
-
-    # 4) 장르 -> float32 ndarray -> CSR
-    genre_cols = [c for c in GENRE_COLS if c in df.columns] or [c for c in df.columns if c.startswith("g")]
+    genre_cols = _genre_cols(df)
     if genre_cols:
-        X_genres_np = df[genre_cols].to_numpy(dtype=np.float32, copy=False)  # 👈 dtype 고정
-        X_genres = sp.csr_matrix(X_genres_np)
-        # 5) 희소 결합
+        X_genres = sp.csr_matrix(df[genre_cols].to_numpy(dtype=np.float32, copy=False))
         X = sp.hstack([X_id, X_genres], format="csr")
     else:
-        X = X_id
+        X = X_id.tocsr()
+    return X, enc
 
+def build_logreg_features(df: pd.DataFrame, enc=None, fit: bool = True):
+    """
+    입력: df(columns: userId, movieId, label, g0..g18)
+    출력: X(희소 CSR), y(ndarray), enc(IndexEncoder)
+    """
+    X, enc = build_logreg_matrix(df, enc=enc, fit=fit)
     y = df["label"].astype(np.int64).to_numpy(copy=False)
     return X, y, enc
+
+def model_proba(model, X) -> np.ndarray:
+    """
+    sklearn 호환 모델(predict_proba)의 양성 확률
+    증분 학습으로 인코더가 커진 뒤에도 재학습 안 된 모델은 학습 시 폭만 앎 → 앞쪽 컬럼만 사용 (새 id 컬럼은 뒤에 추가)
+    """
+    n = getattr(model, "n_features_in_", None)
+    if n is None and hasattr(model, "coef_"):
+        n = model.coef_.shape[1]
+    if n is not None and X.shape[1] > n:
+        X = X[:, :n]
+    return model.predict_proba(X)[:, 1]
+
+# ---------------------------------------------------------------
+# 피처 행렬 캐시: (split 데이터 해시, 인코더 해시) → X/y CSR 성분 .npz
+# ---------------------------------------------------------------
+FEATURE_CACHE_DIR = ART_DIR / "feature_cache"
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("FEATURE_CACHE_MAX_BYTES", 2 << 30))  # 초과 시 오래 안 쓴 항목부터 삭제
+# 피처 조립 로직(build_logreg_features/IndexEncoder.transform)이나 저장 포맷이 바뀌면 올릴 것 → 기존 캐시 무효화
+FEATURE_CACHE_VERSION = 1
+
+_file_hashes = {}  # (경로, 크기, mtime) → 내용 해시 (프로세스 내 재해시 방지)
+
+def file_hash(path: Path) -> str:
+    st = path.stat()
+    memo = (str(path), st.st_size, st.st_mtime_ns)
+    if memo not in _file_hashes:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_hashes[memo] = h.hexdigest()
+    return _file_hashes[memo]
+
+def data_fingerprint(split: str) -> str:
+    """split parquet(파티션 디렉터리면 하위 파일 전체) + 조인되는 movies 차원 테이블의 내용 해시"""
+    path = split_path(split)
+    if path.is_dir():
+        files = [(str(f.relative_to(path)), f) for f in sorted(path.rglob("*.parquet"))]
+    else:
+        files = [(path.name, path)]
+    if MOVIES_PATH.exists():
+        files.append((MOVIES_PATH.name, MOVIES_PATH))
+    h = hashlib.blake2b(digest_size=16)
+    for name, f in files:
+        h.update(name.encode())
+        h.update(file_hash(f).encode())
+    return h.hexdigest()
+
+def _encoder_fingerprint(enc) -> str:
+    if isinstance(enc, IndexEncoder):
+        return enc.fingerprint()
+    import joblib
+    return joblib.hash(enc)  # 구버전 OneHotEncoder
+
+def _save_features(path: Path, X: sp.csr_matrix, y: np.ndarray, enc=None) -> None:
+    arrays = dict(indptr=X.indptr, indices=X.indices, shape=np.asarray(X.shape, dtype=np.int64), y=y)
+    if not (X.data == 1).all():  # 원-핫/장르 플래그만이면 data(전부 1)는 생략
+        arrays["data"] = X.data
+    if enc is not None:
+        arrays.update({f"enc_{k}": v for k, v in enc.state().items()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:  # 파일 객체로 저장 → 이름에 .npz가 덧붙지 않음
+        np.savez(f, **arrays)
+    os.replace(tmp, path)  # 동시 실행 스크립트가 쓰다 만 파일을 읽지 않도록 원자적 교체
+
+def _load_features(path: Path):
+    with np.load(path, allow_pickle=False) as z:
+        indices = z["indices"]
+        data = z["data"] if "data" in z.files else np.ones(len(indices), dtype=np.float64)
+        X = sp.csr_matrix((data, indices, z["indptr"]), shape=tuple(z["shape"]))
+        enc = IndexEncoder.from_state({k[4:]: z[k] for k in z.files if k.startswith("enc_")}) \
+            if "enc_user_index" in z.files else None
+        return X, z["y"], enc
+
+def evict_feature_cache(max_bytes: int = None, keep=()) -> int:
+    """캐시 총 크기가 max_bytes 이하가 될 때까지 마지막 사용(mtime)이 오래된 항목부터 삭제. 삭제 수 반환"""
+    max_bytes = FEATURE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(FEATURE_CACHE_DIR.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in entries)
+    removed = 0
+    for p in entries:
+        if total <= max_bytes:
+            break
+        if p in keep:
+            continue
+        total -= p.stat().st_size
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+def split_features(split: str, enc=None, fit: bool = False, cache: bool = True):
+    """
+    load_split + build_logreg_features (캐시) → X, y, enc
+      - 키: FEATURE_CACHE_VERSION + split 데이터 해시 + 인코더 해시 (fit=True면 "fit" — 학습 split에서 새로 fit한 인코더도 함께 저장)
+      - 히트 시 parquet 읽기/장르 조인/CSR 조립 없이 .npz 성분만 로드
+    """
+    fit = fit or enc is None
+    if not fit:
+        check_genre_vocab(enc, data_genre_vocab())  # 캐시 히트여도 어휘가 다른 인코더와는 조합하지 않음
+    cacheable = cache and (not fit or enc is None or isinstance(enc, IndexEncoder))
+    if cacheable:
+        key = f"v{FEATURE_CACHE_VERSION}:{data_fingerprint(split)}:{'fit' if fit else _encoder_fingerprint(enc)}"
+        key = hashlib.blake2b(key.encode(), digest_size=10).hexdigest()
+        path = FEATURE_CACHE_DIR / f"{split}-{key}.npz"
+        if path.exists():
+            try:
+                X, y, cached_enc = _load_features(path)
+            except (OSError, ValueError, KeyError):
+                path.unlink(missing_ok=True)  # 손상된 항목은 재생성
+            else:
+                os.utime(path)  # LRU: 사용 시각 갱신
+                return X, y, (cached_enc if fit else enc)
+    X, y, enc = build_logreg_features(load_split(split), enc=enc, fit=fit)
+    if cacheable:
+        _save_features(path, X, y, enc if fit else None)
+        evict_feature_cache(keep=(path,))
+    return X, y, enc
+
+def build_movie_genres(dfs) -> pd.DataFrame:
+    """split들에서 movieId → 장르 컬럼 lookup 테이블 생성 (영화당 1행, 서빙 시 장르 조인용)"""
+    frames = []
+    for df in dfs:
+        frames.append(df[["movieId"] + _genre_cols(df)])
+    movies = pd.concat(frames, ignore_index=True).drop_duplicates("movieId")
+    return _ensure_genre_numeric(movies).sort_values("movieId").reset_index(drop=True)
@@ -0,0 +1,178 @@
+# src/lgbm_compiled.py
+"""
+Policy B(LightGBM) 경량 스코어링 엔진: 트리를 평탄화된 NumPy 배열로 컴파일해
+OHE 인덱스 표현(행별 활성 user/movie 컬럼 + 장르 값)에서 직접 평가
+
+핵심 아이디어 (one-hot 입력 전용 최적화)
+  - 모든 피처가 0인 입력의 경로(zero path)와 도달 leaf를 트리별로 미리 계산
+  - 한 행의 활성 피처는 user/movie 컬럼 2개 + 장르 몇 개뿐이므로,
+    활성 피처가 zero path 위에 없는 트리는 곧바로 zero leaf 값을 사용
+  - 활성 피처가 zero path에 걸린 (행, 트리) 쌍만 그 지점부터 일반 순회
+"""
+import numpy as np
+
+_K_ZERO = 1e-35  # LightGBM kZeroThreshold
+
+
+def _sigmoid_scale(objective: str) -> float:
+    # "binary sigmoid:1" → 1.0
+    for tok in objective.split():
+        if tok.startswith("sigmoid:"):
+            return float(tok.split(":", 1)[1])
+    return 1.0
+
+
+def export_booster(model, path, num_iteration=None) -> str:
+    """LGBMClassifier 또는 Booster → LightGBM 네이티브 텍스트 모델 파일"""
+    booster = getattr(model, "booster_", model)
+    booster.save_model(str(path), num_iteration=num_iteration)
+    return str(path)
+
+
+class CompiledForest:
+    """지원하지 않는 모델(다중 클래스/회귀, categorical split)은 ValueError → 호출자가 pkl 경로로 fallback"""
+
+    def __init__(self, dump: dict):
+        if dump.get("num_tree_per_iteration", 1) != 1 or not dump.get("objective", "").startswith("binary"):
+            raise ValueError("CompiledForest supports binary single-output models only")
+        self.sigmoid = _sigmoid_scale(dump["objective"])
+        self.average_output = bool(dump.get("average_output", False))
+        self.n_features = int(dump["max_feature_idx"]) + 1
+
+        feat, thr, left, right, dleft, zmiss, leaves, roots = [], [], [], [], [], [], [], []
+
+        def visit(node) -> int:
+            """노드 평탄화. 반환: 내부 노드 인덱스(>=0) 또는 leaf 인코딩 -(leaf+1)"""
+            if "split_index" not in node:
+                leaves.append(float(node["leaf_value"]))
+                return -len(leaves)
+            if node["decision_type"] != "<=":
+                raise ValueError("categorical splits are not supported")
+            i = len(feat)
+            feat.append(node["split_feature"]); thr.append(node["threshold"])
+            dleft.append(node["default_left"]); zmiss.append(node["missing_type"] == "Zero")
+            left.append(0); right.append(0)
+            left[i] = visit(node["left_child"])
+            right[i] = visit(node["right_child"])
+            return i
+
+        for tree in dump["tree_info"]:
+            roots.append(visit(tree["tree_structure"]))
+
+        self.feature = np.asarray(feat, dtype=np.int32)
+        self.threshold = np.asarray(thr, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(dleft, dtype=bool)
+        self.zero_missing = np.asarray(zmiss, dtype=bool)
+        self.leaf_value = np.asarray(leaves, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.n_trees = len(roots)
+        self._build_zero_paths()
+
+    @classmethod
+    def from_booster(cls, model, num_iteration=None) -> "CompiledForest":
+        booster = getattr(model, "booster_", model)
+        return cls(booster.dump_model(num_iteration=num_iteration))
+
+    @classmethod
+    def from_model_file(cls, path) -> "CompiledForest":
+        import lightgbm as lgb
+        return cls(lgb.Booster(model_file=str(path)).dump_model(num_iteration=-1))
+
+    def _go_left(self, nodes: np.ndarray, x: np.ndarray) -> np.ndarray:
+        is_zero = np.abs(x) <= _K_ZERO
+        return np.where(self.zero_missing[nodes] & is_zero, self.default_left[nodes], x <= self.threshold[nodes])
+
+    def _build_zero_paths(self):
+        """트리별 all-zero 입력 경로 → zero leaf, 그리고 피처별 (트리, 경로상 노드) 역색인(CSR)"""
+        zero_leaf = np.empty(self.n_trees, dtype=np.int32)
+        zp_feat, zp_tree, zp_node = [], [], []
+        for t, node in enumerate(self.roots.tolist()):
+            seen = set()
+            while node >= 0:
+                f = int(self.feature[node])
+                if f not in seen:  # 같은 피처가 경로에 여러 번 나오면 첫 위치만 필요
+                    seen.add(f)
+                    zp_feat.append(f); zp_tree.append(t); zp_node.append(node)
+                go_left = self.default_left[node] if self.zero_missing[node] else 0.0 <= self.threshold[node]
+                node = int(self.left[node] if go_left else self.right[node])
+            zero_leaf[t] = -node - 1
+        self.zero_leaf = zero_leaf
+        self.zero_raw = float(self.leaf_value[zero_leaf].sum())
+
+        zp_feat = np.asarray(zp_feat, dtype=np.int64)
+        order = np.argsort(zp_feat, kind="stable")  # 피처별로 묶되 트리 내 경로 순서 유지
+        self.zp_indptr = np.zeros(self.n_features + 1, dtype=np.int64)
+        np.cumsum(np.bincount(zp_feat, minlength=self.n_features), out=self.zp_indptr[1:])
+        self.zp_tree = np.asarray(zp_tree, dtype=np.int32)[order]
+        self.zp_node = np.asarray(zp_node, dtype=np.int32)[order]
+
+    def predict_raw_index(self, ucol, mcol, G=None, genre_offset: int = 0) -> np.ndarray:
+        """
+        ucol, mcol : 행별 활성 user/movie 컬럼 (미등록 -1)
+        G          : (n, n_genre) 장르 값 (없으면 None), 컬럼 genre_offset+j에 해당
+        """
+        ucol = np.asarray(ucol, dtype=np.int64)
+        mcol = np.asarray(mcol, dtype=np.int64)
+        n = len(ucol)
+        raw = np.full(n, self.zero_raw, dtype=np.float64)
+        if n == 0:
+            return raw
+
+        # 1) 행별 활성 피처 목록 (row, feature)
+        rows = [np.flatnonzero(ucol >= 0), np.flatnonzero(mcol >= 0)]
+        feats = [ucol[rows[0]], mcol[rows[1]]]
+        if G is not None and G.shape[1]:
+            gr, gc = np.nonzero(G)
+            rows.append(gr); feats.append(gc.astype(np.int64) + genre_offset)
+        a_row = np.concatenate(rows)
+        a_feat = np.concatenate(feats)
+        keep = (a_feat >= 0) & (a_feat < self.n_features)
+        a_row, a_feat = a_row[keep], a_feat[keep]
+
+        # 2) 활성 피처가 zero path에 걸린 (행, 트리, 노드) — ragged gather
+        starts = self.zp_indptr[a_feat]
+        counts = self.zp_indptr[a_feat + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return self._link(raw)
+        pos = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+        p_row = np.repeat(a_row, counts)
+        p_tree = self.zp_tree[pos].astype(np.int64)
+        p_node = self.zp_node[pos]
+
+        # 3) (행, 트리)별로 경로상 가장 먼저 만나는 활성 피처 노드에서 순회 시작 (노드 번호 = 전위 순서)
+        key = p_row * self.n_trees + p_tree
+        order = np.lexsort((p_node, key))
+        key, p_node = key[order], p_node[order]
+        first = np.ones(len(key), dtype=bool)
+        first[1:] = key[1:] != key[:-1]
+        key, node = key[first], p_node[first]
+        row, tree = key // self.n_trees, key % self.n_trees
+        raw -= np.bincount(row, weights=self.leaf_value[self.zero_leaf[tree]], minlength=n)
+
+        # 4) 일반 순회 (남은 쌍만 압축하며 진행)
+        u, m = ucol[row], mcol[row]
+        while len(node):
+            f = self.feature[node].astype(np.int64)
+            x = ((f == u) | (f == m)).astype(np.float64)
+            if G is not None and G.shape[1]:
+                g = f - genre_offset
+                is_g = (g >= 0) & (g < G.shape[1])
+                x[is_g] = G[row[is_g], g[is_g]]
+            node = np.where(self._go_left(node, x), self.left[node], self.right[node])
+            done = node < 0
+            if done.any():
+                raw += np.bincount(row[done], weights=self.leaf_value[-node[done] - 1], minlength=n)
+                live = ~done
+                node, row, u, m = node[live], row[live], u[live], m[live]
+        return self._link(raw)
+
+    def _link(self, raw: np.ndarray) -> np.ndarray:
+        return raw / self.n_trees if self.average_output else raw
+
+    def predict_proba_index(self, ucol, mcol, G=None, genre_offset: int = 0) -> np.ndarray:
+        """양성 확률 (LGBMClassifier.predict_proba(X)[:, 1]와 동일)"""
+        raw = self.predict_raw_index(ucol, mcol, G, genre_offset)
+        return 1.0 / (1.0 + np.exp(-self.sigmoid * raw))
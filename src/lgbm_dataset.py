@@ -0,0 +1,184 @@
+# src/lgbm_dataset.py
+"""
+LightGBM Dataset binary 재사용
+  - 데이터 버전(processed parquet 내용 해시) + Dataset 파라미터별로 lgb.Dataset을 1회 구성 → save_binary
+  - 이후 학습(train_lgbm)/sweep/CV fold는 binary를 로드 (one-hot 수천 컬럼 재binning 생략)
+  - <DATASET_DIR>/<key>/{train,valid}.bin + enc.npz + meta.json (구성 시간 기록 → 재로드 시간과 비교 출력)
+  - CV fold binary는 <DATASET_DIR>/cv/<key>/ 에 따로 두고 별도 보관 개수로 정리
+  - 정리(_prune)는 최근 PRUNE_GRACE_S 안에 사용된 디렉터리와 lease(사용 중 표시)가 살아 있는 디렉터리는 건너뜀
+  - BoosterClassifier: lgb.train 결과를 LGBMClassifier와 같은 predict_proba 인터페이스로 저장 (lgbm_model.pkl)
+"""
+import hashlib, json, os, shutil, time
+from contextlib import contextmanager
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+
+from features import (ART_DIR, FEATURE_CACHE_VERSION, IndexEncoder, check_genre_vocab, data_fingerprint,
+                      data_genre_vocab, split_features)
+
+DATASET_DIR = ART_DIR / "lgbm_dataset"
+# feature_pre_filter=False: min_data_in_leaf가 다른 학습(sweep trial 등)도 같은 binary 사용 가능
+DATASET_PARAMS = {"feature_pre_filter": False, "verbose": -1}
+KEEP_VERSIONS = 3  # 데이터 버전별 디렉터리는 최근 사용 순으로 이만큼만 유지
+CV_DATASET_DIR = DATASET_DIR / "cv"  # CV fold binary (train/valid 버전과 따로 정리)
+CV_KEEP_VERSIONS = 2
+PRUNE_GRACE_S = int(os.getenv("LGBM_DATASET_GRACE_S", 30 * 60))  # 이 시간 안에 사용된 디렉터리는 정리하지 않음
+
+
+class BoosterClassifier:
+    """lgb.Booster → LGBMClassifier 호환 (predict_proba/predict/booster_), 이진 분류 전용"""
+
+    def __init__(self, booster: lgb.Booster):
+        self.booster_ = booster
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = booster.num_feature()
+
+    @property
+    def best_iteration_(self) -> int:
+        return self.booster_.best_iteration
+
+    def predict_proba(self, X) -> np.ndarray:
+        if X.shape[1] > self.n_features_in_:  # 이후 증분 학습으로 뒤에 추가된 컬럼은 이 모델이 모름 → 제외
+            X = X[:, :self.n_features_in_]
+        p = self.booster_.predict(X)  # best_iteration이 있으면 그 반복까지 (LGBMClassifier와 동일)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+
+def dataset_key(*parts) -> str:
+    h = hashlib.blake2b(digest_size=10)
+    for part in (*parts, lgb.__version__):
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _leased(d: Path) -> bool:
+    """살아 있는 프로세스의 lease 파일(.lease.<pid>)이 있는지 (죽은 프로세스의 lease는 정리)"""
+    alive = False
+    for f in d.glob(".lease.*"):
+        try:
+            pid = int(f.name.rsplit(".", 1)[1])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            alive = True
+        else:
+            f.unlink(missing_ok=True)
+    return alive
+
+
+@contextmanager
+def lease(d: Path):
+    """with 블록 동안 d를 사용 중으로 표시 → 다른 프로세스의 _prune이 지우지 않음 (sweep/CV 실행 전체 동안)"""
+    d = Path(d)
+    d.mkdir(parents=True, exist_ok=True)
+    f = d / f".lease.{os.getpid()}"
+    f.touch()
+    try:
+        yield d
+    finally:
+        f.unlink(missing_ok=True)
+
+
+def _prune(root: Path = None, keep: int = KEEP_VERSIONS, grace_s: float = None) -> None:
+    """root의 버전 디렉터리를 최근 사용 순으로 keep개만 유지 (grace_s 안에 사용됐거나 lease 중이면 유지)"""
+    root = DATASET_DIR if root is None else root
+    grace_s = PRUNE_GRACE_S if grace_s is None else grace_s
+    dirs = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".") and p != CV_DATASET_DIR),
+                  key=lambda p: p.stat().st_mtime, reverse=True)
+    now = time.time()
+    for old in dirs[keep:]:
+        if now - old.stat().st_mtime < grace_s or _leased(old):
+            continue
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _publish(tmp: Path, out: Path) -> None:
+    """완성된 임시 디렉터리를 원자적으로 게시 (동시 생성 시 먼저 게시된 쪽 사용)"""
+    try:
+        os.replace(tmp, out)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def train_valid_datasets(params=None, rebuild: bool = False):
+    """
+    train/valid lgb.Dataset (binary 재사용) → dtrain, dvalid, enc, info
+    info: {"dir", "key", "source": "binary"|"constructed", "construct_s", "reload_s"(binary일 때)}
+    """
+    params = {**DATASET_PARAMS, **(params or {})}
+    key = dataset_key(data_fingerprint("train"), data_fingerprint("valid"), FEATURE_CACHE_VERSION, params)
+    out = DATASET_DIR / key
+    if not rebuild and (out / "meta.json").exists():
+        os.utime(out)  # 로드 전에 사용 시각 갱신 → 동시 실행 중인 _prune의 grace 대상
+        t0 = time.perf_counter()
+        dtrain = lgb.Dataset(str(out / "train.bin"), params=params).construct()
+        dvalid = lgb.Dataset(str(out / "valid.bin"), reference=dtrain, params=params).construct()
+        enc = IndexEncoder.load(out / "enc.npz")
+        check_genre_vocab(enc, data_genre_vocab())
+        meta = json.loads((out / "meta.json").read_text())
+        info = {"dir": out, "key": key, "source": "binary", "construct_s": meta["construct_s"],
+                "reload_s": time.perf_counter() - t0}
+        print(f"[lgbm_dataset] reloaded {key} in {info['reload_s']:.2f}s (construct was {meta['construct_s']:.2f}s)")
+        return dtrain, dvalid, enc, info
+
+    Xtr, ytr, enc = split_features("train", fit=True)
+    Xva, yva, _ = split_features("valid", enc=enc)
+    t0 = time.perf_counter()
+    dtrain = lgb.Dataset(Xtr, label=ytr, params=params).construct()
+    dvalid = lgb.Dataset(Xva, label=yva, reference=dtrain, params=params).construct()
+    construct_s = time.perf_counter() - t0
+
+    tmp = DATASET_DIR / f".{key}.{os.getpid()}.tmp"
+    tmp.mkdir(parents=True, exist_ok=True)
+    dtrain.save_binary(str(tmp / "train.bin"))
+    dvalid.save_binary(str(tmp / "valid.bin"))
+    enc.save(tmp / "enc.npz")
+    (tmp / "meta.json").write_text(json.dumps({"key": key, "params": params, "construct_s": construct_s,
+                                               "rows": {"train": int(Xtr.shape[0]), "valid": int(Xva.shape[0])},
+                                               "n_features": int(Xtr.shape[1]), "created_at": time.time()}, indent=2))
+    if rebuild and out.exists():
+        shutil.rmtree(out, ignore_errors=True)
+    _publish(tmp, out)
+    _prune()
+    print(f"[lgbm_dataset] constructed {key} in {construct_s:.2f}s → {out}")
+    return dtrain, dvalid, enc, {"dir": out, "key": key, "source": "constructed", "construct_s": construct_s}
+
+
+def cached_dataset(key: str, name: str, X, y, params=None, root: Path = None, keep: int = CV_KEEP_VERSIONS):
+    """
+    임의 (X, y)의 Dataset binary 재사용 (예: CV fold) → binary 경로, 구성 시간(재사용이면 None)
+    key는 X/y를 결정하는 데이터 버전·분할 정보로 호출자가 만든다 (dataset_key)
+    root(기본 CV_DATASET_DIR)의 key 디렉터리에 저장, 새로 구성할 때마다 root를 keep개로 정리
+    """
+    params = {**DATASET_PARAMS, **(params or {})}
+    root = CV_DATASET_DIR if root is None else root
+    out = root / key
+    path = out / f"{name}.bin"
+    if path.exists():
+        os.utime(out)
+        return path, None
+    t0 = time.perf_counter()
+    ds = lgb.Dataset(X, label=y, params=params).construct()
+    construct_s = time.perf_counter() - t0
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = out / f".{name}.{os.getpid()}.tmp"
+    ds.save_binary(str(tmp))
+    os.replace(tmp, path)
+    _prune(root, keep)
+    return path, construct_s
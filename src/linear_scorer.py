@@ -0,0 +1,63 @@
+# src/linear_scorer.py
+"""
+Policy A(로지스틱 회귀) 닫힌 형태 스코어러
+  score = sigmoid(intercept + w[u] + w[m] + G · w_genre)
+  - OHE 행렬을 만들지 않고 배열 gather 3번 + sigmoid로 계산
+  - w는 OHE 컬럼 번호로 바로 gather (증분 학습으로 장르 뒤에 추가된 id 컬럼도 같은 방식)
+  - 미등록 user/movie(-1)와 모델보다 나중에 추가된 컬럼은 OHE의 handle_unknown="ignore"와 같이 기여 0
+"""
+import numpy as np
+
+
+class LinearScorer:
+    def __init__(self, intercept, w_col, w_genre):
+        self.intercept = float(intercept)
+        self.w_col = np.asarray(w_col, dtype=np.float64)      # 컬럼 번호 → 계수 (장르 위치 값은 미사용)
+        self.w_genre = np.asarray(w_genre, dtype=np.float64)
+
+    @classmethod
+    def from_classifier(cls, clf, enc) -> "LinearScorer":
+        """학습된 LogisticRegression + 인코더 레이아웃(id 컬럼 | 장르 at genre_offset)으로 계수 분할"""
+        coef = np.asarray(clf.coef_, dtype=np.float64)
+        if coef.shape != (1, enc.n_features):
+            raise ValueError(f"expected binary model with {enc.n_features} features, got coef_ {coef.shape}")
+        w = coef[0]
+        return cls(clf.intercept_[0], w, w[enc.genre_offset:enc.genre_offset + len(enc.genre_cols)])
+
+    def save(self, path) -> None:
+        np.savez(path, intercept=self.intercept, w_col=self.w_col, w_genre=self.w_genre)
+
+    @classmethod
+    def load(cls, path) -> "LinearScorer":
+        with np.load(path, allow_pickle=False) as z:
+            if "w_col" in z.files:
+                return cls(z["intercept"], z["w_col"], z["w_genre"])
+            # 구버전 파일 (w_user | w_movie | w_genre 연속 블록)
+            return cls(z["intercept"], np.r_[z["w_user"], z["w_movie"], z["w_genre"]], z["w_genre"])
+
+    def _gather(self, cols) -> np.ndarray:
+        cols = np.asarray(cols, dtype=np.int64)
+        ok = (cols >= 0) & (cols < len(self.w_col))
+        return np.where(ok, self.w_col[np.where(ok, cols, 0)], 0.0)
+
+    def user_bias(self, ucol) -> np.ndarray:
+        """w[u] (미등록 0)"""
+        return self._gather(ucol)
+
+    def item_bias(self, mcol, G=None) -> np.ndarray:
+        """w[m] + G · w_genre (미등록 0) — 후보 영화 단위로 미리 계산해 두는 item-side 항"""
+        out = self._gather(mcol)
+        if G is not None and len(self.w_genre):
+            out += G @ self.w_genre
+        return out
+
+    def predict_raw_index(self, ucol, mcol, G=None, genre_offset: int = 0) -> np.ndarray:
+        """
+        ucol, mcol : IndexEncoder.index 결과 (OHE 전체 컬럼 번호, 미등록 -1)
+        G          : (n, n_genre) 장르 값 (genre_offset은 CompiledForest와 인터페이스 호환용)
+        """
+        return self.intercept + self.user_bias(ucol) + self.item_bias(mcol, G)
+
+    def predict_proba_index(self, ucol, mcol, G=None, genre_offset: int = 0) -> np.ndarray:
+        """양성 확률 (LogisticRegression.predict_proba(X)[:, 1]와 동일)"""
+        return 1.0 / (1.0 + np.exp(-self.predict_raw_index(ucol, mcol, G, genre_offset)))
@@ -0,0 +1,123 @@
+# src/micro_batcher.py
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import pandas as pd
+
+
+class MicroBatcher:
+    """
+    동시 /predict 요청을 모아 router 1회 호출로 처리하는 asyncio 마이크로배처
+      - max_batch_size 건이 모이거나 첫 요청 후 max_wait_ms가 지나면 배치 실행
+      - 배치는 워커 스레드에서 predict_fn(DataFrame) → DataFrame(행 순서 유지)
+      - 워커가 바쁜 동안 들어온 요청은 큐에 쌓였다가 다음 배치로 묶임
+    """
+
+    def __init__(self, predict_fn: Callable[[pd.DataFrame], pd.DataFrame],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0, workers: int = 1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.workers = max(1, int(workers))
+        self._queue: asyncio.Queue = None
+        self._slots: asyncio.Semaphore = None
+        self._task: asyncio.Task = None
+        self._inflight = set()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="router-batch")
+        # 메트릭
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.max_seen_batch_size = 0
+        self.busy_seconds = 0.0
+        self.size_hist = {"1": 0, "2-4": 0, "5-16": 0, "17-64": 0, "65+": 0}
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.workers)
+            self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, row: dict) -> dict:
+        """요청 1건을 큐에 넣고 해당 행의 결과(dict)를 기다림"""
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, fut))
+        return await fut
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()  # 워커가 빌 때까지 대기 (그동안 큐에 요청 누적)
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List[tuple]):
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        try:
+            df = pd.DataFrame([row for row, _ in batch])
+            out = await loop.run_in_executor(self._executor, self.predict_fn, df)
+            records = out.to_dict(orient="records")
+        except Exception as e:
+            self.errors += 1
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            for (_, fut), rec in zip(batch, records):
+                if not fut.done():  # 클라이언트가 끊긴 요청은 스킵
+                    fut.set_result(rec)
+        finally:
+            self._record(len(batch), time.perf_counter() - t0)
+            self._slots.release()
+
+    def _record(self, n: int, seconds: float):
+        self.batches += 1
+        self.rows += n
+        self.last_batch_size = n
+        self.max_seen_batch_size = max(self.max_seen_batch_size, n)
+        self.busy_seconds += seconds
+        key = "1" if n == 1 else "2-4" if n <= 4 else "5-16" if n <= 16 else "17-64" if n <= 64 else "65+"
+        self.size_hist[key] += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "rows": self.rows,
+            "errors": self.errors,
+            "mean_batch_size": (self.rows / self.batches) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "max_seen_batch_size": self.max_seen_batch_size,
+            "mean_batch_ms": (1000.0 * self.busy_seconds / self.batches) if self.batches else 0.0,
+            "batch_size_hist": dict(self.size_hist),
+        }
@@ -0,0 +1,179 @@
+# src/model_watcher.py
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import mlflow
+import mlflow.pyfunc
+import numpy as np
+import pandas as pd
+
+# 새 버전 워밍업용 샘플 배치 (미등록 id도 정상 처리되어야 함)
+WARMUP_INPUT = pd.DataFrame({"userId": [1, 2, 3, 4, 5, 6, 7, 8], "movieId": [1, 10, 50, 100, 260, 1196, 2571, 2858]})
+
+
+@dataclass(frozen=True)
+class LoadedRouter:
+    """서빙 중인 router 스냅샷: 요청은 시작 시 1회 참조해 끝까지 같은 버전 사용"""
+    version: str
+    model: object                 # mlflow.pyfunc.PyFuncModel
+    impl: object = None           # ABRouter 인스턴스 (assign 미지원이면 None)
+    loaded_at: float = field(default_factory=time.time)
+
+
+def resolve_version(uri: str) -> str:
+    """models:/<name>@<alias> → alias가 현재 가리키는 버전 (그 외 URI는 URI 자체가 버전)"""
+    if uri.startswith("models:/") and "@" in uri:
+        name, alias = uri[len("models:/"):].split("@", 1)
+        return str(mlflow.tracking.MlflowClient().get_model_version_by_alias(name, alias).version)
+    return uri
+
+
+def versioned_uri(uri: str, version: str) -> str:
+    if uri.startswith("models:/") and "@" in uri:
+        return f"models:/{uri[len('models:/'):].split('@', 1)[0]}/{version}"
+    return uri
+
+
+def _python_model(model):
+    try:
+        impl = model.unwrap_python_model()
+    except Exception:
+        return None
+    return impl if hasattr(impl, "assign") else None
+
+
+class ModelWatcher:
+    """
+    registry alias 폴링 → 새 버전을 백그라운드에서 로드·워밍업 → 원자적 교체
+      - 요청 경로는 current 참조만 하므로 로드 중에도 블로킹 없음
+      - 직전 버전을 previous로 보관 → rollback()으로 즉시 복귀 (진행 중인 로드를 기다리지 않음)
+      - on_swap(LoadedRouter): 교체 직후 콜백 (예: 점수 캐시 버전 바인딩). 교체 순서 보장을 위해 _swap_lock 안에서 호출 → 빨라야 함
+    """
+
+    def __init__(self, model_uri: str, poll_seconds: float = 30.0,
+                 warmup_input: pd.DataFrame = WARMUP_INPUT,
+                 on_swap: Optional[Callable[[LoadedRouter], None]] = None):
+        self.model_uri = model_uri
+        self.poll_seconds = float(poll_seconds)
+        self.warmup_input = warmup_input
+        self.on_swap = on_swap
+        self.current: Optional[LoadedRouter] = None
+        self.previous: Optional[LoadedRouter] = None
+        self.swaps = 0
+        self.rollbacks = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._rolled_back_from: Optional[str] = None
+        self._swap_lock = threading.Lock()
+        self._check_lock = threading.Lock()  # 폴링 스레드와 수동 reload 동시 로드 방지
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def watches_alias(self) -> bool:
+        return self.model_uri.startswith("models:/") and "@" in self.model_uri
+
+    def load(self, version: str) -> LoadedRouter:
+        """지정 버전 로드 + 워밍업 (요청 경로 밖에서 호출)"""
+        t0 = time.perf_counter()
+        model = mlflow.pyfunc.load_model(versioned_uri(self.model_uri, version))
+        loaded = LoadedRouter(version=version, model=model, impl=_python_model(model))
+        if self.warmup_input is not None:
+            model.predict(self.warmup_input)
+            if loaded.impl is not None:
+                uids = self.warmup_input["userId"].to_numpy()
+                arms = loaded.impl.assign(uids)
+                if hasattr(loaded.impl, "recommend") and getattr(loaded.impl, "_items_path", None):
+                    # /recommend 후보 item-side 캐시를 arm별로 미리 구성
+                    for arm in np.unique(arms):
+                        loaded.impl.recommend(int(uids[arms == arm][0]), k=1)
+        print(f"[model_watcher] loaded router version={version} in {time.perf_counter() - t0:.2f}s")
+        return loaded
+
+    def _swap_locked(self, loaded: LoadedRouter) -> None:
+        """교체 (호출자가 _swap_lock 보유)"""
+        self.previous, self.current = self.current, loaded
+        self.swaps += 1
+        if self.on_swap is not None:
+            self.on_swap(loaded)
+
+    def _swap(self, loaded: LoadedRouter) -> None:
+        with self._swap_lock:
+            self._swap_locked(loaded)
+
+    def start(self) -> "ModelWatcher":
+        """초기 버전 동기 로드 후 (alias URI인 경우) 폴링 스레드 시작"""
+        if self.current is None:
+            self._swap(self.load(resolve_version(self.model_uri)))
+        if self.watches_alias and self.poll_seconds > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="router-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def check_now(self) -> bool:
+        """alias 버전이 바뀌었으면 새 버전 로드 후 교체. 교체했으면 True"""
+        with self._check_lock:
+            version = resolve_version(self.model_uri)
+            with self._swap_lock:
+                current, previous, rollbacks = self.current, self.previous, self.rollbacks
+                rolled_back_from = self._rolled_back_from
+            if current is not None and version == current.version:
+                return False
+            if version == rolled_back_from:
+                return False             # 수동 롤백 유지: alias가 다른 버전으로 옮겨질 때까지
+            if previous is not None and version == previous.version:
+                loaded = previous        # alias가 직전 버전으로 돌아간 경우 재로드 없이 복귀
+            else:
+                loaded = self.load(version)
+            with self._swap_lock:
+                if self.rollbacks != rollbacks:
+                    # 로드 중 수동 롤백 → 롤백 결과를 덮어쓰지 않고 버림 (다음 확인에서 다시 판단)
+                    print(f"[model_watcher] rollback during load; dropping version={version}")
+                    return False
+                self._rolled_back_from = None
+                self._swap_locked(loaded)
+            return True
+
+    def rollback(self) -> LoadedRouter:
+        """
+        직전 버전으로 즉시 교체. alias가 새 버전으로 이동하기 전까지 롤백 상태 유지
+        _swap_lock만 사용: 진행 중인 check_now 로드/워밍업을 기다리지 않고, 대상은 호출 시점의 previous.
+        로드를 마친 check_now는 롤백이 있었으면 교체하지 않음
+        """
+        with self._swap_lock:
+            if self.previous is None:
+                raise RuntimeError("no previous router version to roll back to")
+            target = self.previous
+            self._rolled_back_from = self.current.version
+            self.rollbacks += 1
+            self._swap_locked(target)
+            return target
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check_now()
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"[model_watcher] reload failed (keeping version={self.current.version}): {e}")
+
+    def stats(self) -> dict:
+        return {
+            "model_uri": self.model_uri,
+            "current_version": self.current.version if self.current else None,
+            "previous_version": self.previous.version if self.previous else None,
+            "rolled_back_from": self._rolled_back_from,
+            "loaded_at": self.current.loaded_at if self.current else None,
+            "swaps": self.swaps,
+            "rollbacks": self.rollbacks,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "poll_seconds": self.poll_seconds,
+        }
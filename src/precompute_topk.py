@@ -0,0 +1,82 @@
+# src/precompute_topk.py
+"""
+오프라인 Top-K 사전 계산: 알려진 사용자 전체 × 후보 영화 전체를 Policy A/B 각각으로 스코어링
+  - 사용자를 chunk 단위로 나눠 프로세스 풀에서 병렬 처리 (chunk당 메모리: chunk_users × n_items)
+  - 결과는 memmap .npy (arm, userId, K)에 워커가 직접 기록 → 전체 격자를 메모리에 올리지 않음
+  - 완료 후 <out-dir>/CURRENT를 새 run으로 교체 (서빙 측은 다음 요청부터 새 테이블 사용)
+  - 서빙(/recommend)은 router 버전이 일치하면 O(1) 행 조회, 신규 사용자는 실시간 스코어링
+
+    python src/precompute_topk.py
+    python src/precompute_topk.py --model-uri runs:/<run_id>/ab_router --k 100 --workers 4
+"""
+import argparse, os, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import mlflow
+import mlflow.pyfunc
+import numpy as np
+import pandas as pd
+
+from features import DATA_DIR, ART_DIR
+from model_watcher import resolve_version, versioned_uri
+from recommend import TopKTable
+
+MODEL_URI = os.getenv("ROUTER_MODEL_URI", "models:/movielens_ctr_router@router")
+OUT_DIR = ART_DIR / "topk"
+
+_router = None
+_table = None
+
+
+def _init_worker(model_uri: str, out_dir: str):
+    """워커당 1회: router 로드 + 출력 memmap을 r+로 열기"""
+    global _router, _table
+    _router = mlflow.pyfunc.load_model(model_uri).unwrap_python_model()
+    _table = TopKTable.open(out_dir, mode="r+")
+
+
+def _score_chunk(args):
+    user_ids, exclude_rated = args
+    for arm in TopKTable.ARMS:
+        items, scores = _router.recommend_batch(user_ids, arm, _table.k, exclude_rated)
+        _table.write_rows(arm, user_ids, items, scores)
+    _table.flush()
+    return len(user_ids)
+
+
+def main(model_uri=MODEL_URI, k=100, chunk_users=64, workers=None, exclude_rated=True, out_dir=OUT_DIR):
+    version = resolve_version(model_uri)
+    users = np.unique(pd.read_parquet(DATA_DIR / "users.parquet")["userId"].to_numpy(dtype=np.int64))
+    table = TopKTable.create(out_dir, int(users.max()) + 1, k, meta={
+        "model_uri": model_uri, "version": version, "exclude_rated": bool(exclude_rated),
+        "n_users": int(len(users)),
+    })
+    chunks = [(c, exclude_rated) for c in np.array_split(users, max(1, -(-len(users) // chunk_users)))]
+    workers = workers or os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(versioned_uri(model_uri, version), str(table.path))) as ex:
+        for n in ex.map(_score_chunk, chunks):
+            done += n
+            print(f"\r[precompute_topk] {done}/{len(users)} users", end="", flush=True)
+    elapsed = time.perf_counter() - t0
+    n_items = len(pd.read_parquet(DATA_DIR / "movies.parquet", columns=["movieId"]))
+    table.publish(created_at=time.time(), elapsed_s=round(elapsed, 2))
+    print(f"\n[precompute_topk] version={version} K={k}: {len(users)} users × {n_items} items × "
+          f"{len(TopKTable.ARMS)} arms in {elapsed:.1f}s "
+          f"({len(users) * n_items * len(TopKTable.ARMS) / elapsed:,.0f} scores/s) → {table.path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model-uri", default=MODEL_URI)
+    ap.add_argument("--k", type=int, default=100)
+    ap.add_argument("--chunk-users", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--keep-rated", action="store_true", help="이미 평가한 영화도 후보에 포함")
+    ap.add_argument("--out-dir", type=Path, default=OUT_DIR)
+    args = ap.parse_args()
+    main(args.model_uri, args.k, args.chunk_users, args.workers, not args.keep_rated, args.out_dir)
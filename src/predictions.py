@@ -0,0 +1,93 @@
+# src/predictions.py
+"""
+예측 저장소: 정책(모델)별 split 예측을 1회 계산해 parquet로 보관 → 평가 스크립트는 읽기만
+  - <PRED_DIR>/<split>-<데이터·인코더 해시>/label.parquet            : y (int8)
+  - <PRED_DIR>/<split>-<데이터·인코더 해시>/<policy>-<version>.parquet : p (float64)
+  - version = 모델 pickle 내용 해시 → 재학습하면 해당 정책만 다시 스코어링
+  - 행 순서는 load_split(split)과 동일 (세그먼트 분석에서 df와 그대로 정렬)
+
+    python src/predictions.py                 # test split, 등록된 정책 전체
+    python src/predictions.py --split valid --force
+"""
+import argparse, json, time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from features import ART_DIR, data_fingerprint, file_hash, load_encoder, model_proba, split_features
+
+PRED_DIR = ART_DIR / "predictions"
+
+# 평가 대상 정책: 이름 → 모델 pickle (predict_proba). 새 정책은 여기 한 줄 추가
+POLICIES = {
+    "A": ART_DIR / "logreg_model.pkl",
+    "B": ART_DIR / "lgbm_model.pkl",
+}
+
+
+def model_version(path) -> str:
+    return file_hash(Path(path))[:16]
+
+
+def _store_dir(split: str, enc) -> Path:
+    return PRED_DIR / f"{split}-{data_fingerprint(split)[:12]}-{enc.fingerprint()[:8]}"
+
+
+def score_split(split: str = "test", policies=None, force: bool = False) -> dict:
+    """
+    저장소에 없는 (정책, 버전) 예측만 계산해 기록 → {"dir", "versions", "scored"}
+    피처 행렬은 features 캐시를 사용하므로 재계산 시에도 CSR 조립은 1회
+    """
+    policies = {p: POLICIES[p] for p in (policies or POLICIES)}
+    for name, path in policies.items():
+        if not Path(path).exists():
+            raise FileNotFoundError(f"policy {name} model not found: {path}. 먼저 해당 학습 스크립트를 실행했는지 확인하세요.")
+    enc = load_encoder()
+    out = _store_dir(split, enc)
+    versions = {name: model_version(path) for name, path in policies.items()}
+    todo = [n for n in policies if force or not (out / f"{n}-{versions[n]}.parquet").exists()]
+    if not todo and (out / "label.parquet").exists():
+        return {"dir": out, "versions": versions, "scored": []}
+
+    X, y, _ = split_features(split, enc=enc)
+    out.mkdir(parents=True, exist_ok=True)
+    if not (out / "label.parquet").exists():
+        pd.DataFrame({"label": y.astype(np.int8)}).to_parquet(out / "label.parquet", index=False)
+    meta_path = out / "meta.json"
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {"split": split, "rows": int(len(y)), "policies": {}}
+    for name in todo:
+        t0 = time.perf_counter()
+        p = model_proba(joblib.load(policies[name]), X)
+        tmp = out / f".{name}-{versions[name]}.parquet.tmp"
+        pd.DataFrame({"p": p.astype(np.float64)}).to_parquet(tmp, index=False)
+        tmp.replace(out / f"{name}-{versions[name]}.parquet")
+        meta["policies"][name] = {"version": versions[name], "model": str(policies[name]),
+                                  "scored_at": time.time(), "score_s": round(time.perf_counter() - t0, 3)}
+        print(f"[predictions] {split}/{name} version={versions[name]}: {len(p):,} rows in {time.perf_counter() - t0:.2f}s")
+    meta_path.write_text(json.dumps(meta, indent=2))
+    return {"dir": out, "versions": versions, "scored": todo}
+
+
+def load_predictions(split: str = "test", policies=None):
+    """
+    평가 입력 (label + 정책별 확률 컬럼) DataFrame과 정책 버전 dict.
+    현재 모델 버전의 예측이 없으면 그 정책만 먼저 스코어링
+    """
+    info = score_split(split, policies)
+    out = info["dir"]
+    frame = pd.read_parquet(out / "label.parquet")
+    for name, version in info["versions"].items():
+        frame[name] = pd.read_parquet(out / f"{name}-{version}.parquet")["p"].to_numpy()
+    return frame, info["versions"]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--split", default="test")
+    ap.add_argument("--policies", nargs="+", default=None, choices=list(POLICIES))
+    ap.add_argument("--force", action="store_true", help="저장된 예측이 있어도 다시 스코어링")
+    args = ap.parse_args()
+    info = score_split(args.split, args.policies, args.force)
+    print(f"[predictions] {args.split}: versions={info['versions']} scored={info['scored'] or 'none (cached)'} → {info['dir']}")
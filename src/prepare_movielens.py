@@ -1,5 +1,5 @@
-# src/prepare_movielens.py  (100K/1M 겸용 버전으로 교체)
-import zipfile, os, csv
+# src/prepare_movielens.py  (100K/1M/10M/25M 겸용)
+import argparse, zipfile, os, csv, io, json, shutil, time
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -15,65 +15,296 @@ GENRES_19 = [
     "War","Western","(no genres listed)"
 ]
 
-def parse_ml100k(zf):
-    # u.data: user\titem\trating\ttimestamp
-    with zf.open("ml-100k/u.data") as f:
-        df = pd.read_csv(f, sep="\t", names=["userId","movieId","rating","timestamp"])
+# 평점 테이블 컬럼/압축 dtype (ML-25M 규모까지 int32 id·timestamp로 충분)
+RATING_COLS = ["userId", "movieId", "rating", "timestamp"]
+RATING_DTYPES = {"userId": np.int32, "movieId": np.int32, "rating": np.int8, "timestamp": np.int32}
+
+# ml-100k u.item 장르 플래그 순서 (unknown → "(no genres listed)")
+GENRES_100K = ["(no genres listed)"] + GENRES_19[:-1]
+
+_DELIM = b"\x1f"  # ASCII unit separator: 제목/장르에 나오지 않는 1바이트 구분자
+
+
+class _ColonTranslator(io.RawIOBase):
+    """'::' 구분 바이트 스트림 → 1바이트 구분자로 청크 단위 치환 (pandas C 파서가 읽을 수 있게)"""
+
+    def __init__(self, raw, chunk_size: int = 1 << 20):
+        self._raw, self._chunk = raw, chunk_size
+        self._buf, self._pos, self._carry = b"", 0, b""
+
+    def readable(self):
+        return True
+
+    def _fill(self) -> bool:
+        chunk = self._raw.read(self._chunk)
+        if not chunk:
+            self._buf, self._pos, self._carry = self._carry.replace(b"::", _DELIM), 0, b""
+            return bool(self._buf)
+        data = self._carry + chunk
+        # 끝의 ':' 연속 구간은 통째로 다음 청크로 보류 → 치환은 항상 완결된 ':' 구간에만 (':::'도 전체 스트림과 같은 짝)
+        body = data.rstrip(b":")
+        self._carry = data[len(body):]
+        self._buf, self._pos = body.replace(b"::", _DELIM), 0
+        return True
+
+    def readinto(self, b):
+        while self._pos >= len(self._buf):
+            if not self._fill():
+                return 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def read_dat(f, names, dtype=None, encoding=None, chunksize=None):
+    """MovieLens '::' 구분 .dat → DataFrame (python 엔진 대신 구분자 치환 스트림 + C 엔진). chunksize면 iterator"""
+    stream = io.BufferedReader(_ColonTranslator(f), buffer_size=1 << 20)
+    return pd.read_csv(stream, sep=_DELIM.decode(), engine="c", header=None, names=names,
+                       dtype=dtype, encoding=encoding, quoting=csv.QUOTE_NONE, chunksize=chunksize)
+
+
+# ---------------------------------------------------------------
+# zip 레이아웃별 파서 (ml-100k / ml-1m / ml-10m / ml-25m)
+# ---------------------------------------------------------------
+# ml-10m/25m은 반 별점(0.5 단위) → rating float32
+HALF_STAR_DTYPES = {**RATING_DTYPES, "rating": np.float32}
+
+LAYOUTS = {
+    # zip 내 최상위 폴더: (평점 파일, 평점 dtype)
+    "ml-25m": ("ml-25m/ratings.csv", HALF_STAR_DTYPES),
+    "ml-10M100K": ("ml-10M100K/ratings.dat", HALF_STAR_DTYPES),
+    "ml-1m": ("ml-1m/ratings.dat", RATING_DTYPES),
+    "ml-100k": ("ml-100k/u.data", RATING_DTYPES),
+}
+
+
+def detect_layout(names) -> str:
+    for layout in LAYOUTS:
+        if any(n.startswith(layout + "/") for n in names):
+            return layout
+    raise ValueError("Unsupported dataset. Put ml-1m.zip, ml-100k.zip, ml-10m.zip or ml-25m.zip in data/")
+
+
+def iter_ratings(zf, layout: str, chunksize: int = 1_000_000):
+    """평점 테이블을 chunk 단위로 스트리밍 (압축 dtype, 전체를 메모리에 올리지 않음)"""
+    member, dtypes = LAYOUTS[layout]
+    with zf.open(member) as f:
+        if layout == "ml-100k":
+            reader = pd.read_csv(f, sep="\t", header=None, names=RATING_COLS, dtype=dtypes, engine="c",
+                                 chunksize=chunksize)
+        elif layout == "ml-25m":
+            reader = pd.read_csv(f, header=0, names=RATING_COLS, dtype=dtypes, engine="c", chunksize=chunksize)
+        else:
+            reader = read_dat(f, RATING_COLS, dtype=dtypes, chunksize=chunksize)
+        yield from reader
+
+
+def _read_ratings(zf, layout: str) -> pd.DataFrame:
+    return pd.concat(iter_ratings(zf, layout), ignore_index=True)
+
+
+def _movies_ml100k(zf) -> pd.DataFrame:
     # u.item: movieId|title|release|video|imdb|19 flags
+    cols = ["movieId","title","release_date","video_release_date","imdb_url"] + [f"g{i}" for i in range(19)]
     with zf.open("ml-100k/u.item") as f:
-        raw = f.read().decode("latin-1").strip().split("\n")
-        rows = [r.split("|") for r in raw]
-        cols = ["movieId","title","release_date","video_release_date","imdb_url"] + [f"g{i}" for i in range(19)]
-        movies = pd.DataFrame(rows, columns=cols)
-        movies["movieId"] = movies["movieId"].astype(int)
-        for g in [f"g{i}" for i in range(19)]:
-            movies[g] = pd.to_numeric(movies[g], errors="coerce").fillna(0).astype(int)
-    return df, movies[[ "movieId","title" ] + [f"g{i}" for i in range(19)]]
+        movies = pd.read_csv(f, sep="|", header=None, names=cols, encoding="latin-1", engine="c",
+                             quoting=csv.QUOTE_NONE, dtype={"movieId": np.int32, "title": str})
+    for g in [f"g{i}" for i in range(19)]:
+        movies[g] = pd.to_numeric(movies[g], errors="coerce").fillna(0).astype(np.int8)
+    return movies[[ "movieId","title" ] + [f"g{i}" for i in range(19)]]
+
+
+def _movies_dat(zf, member: str) -> pd.DataFrame:
+    # movies.dat: MovieID::Title::Genres
+    with zf.open(member) as f:
+        return read_dat(f, ["movieId", "title", "genres"], dtype={"movieId": np.int32}, encoding="latin-1")
+
+
+def _movies_ml25m(zf) -> pd.DataFrame:
+    # movies.csv: movieId,title,genres (헤더, 쉼표 포함 제목은 따옴표)
+    with zf.open("ml-25m/movies.csv") as f:
+        return pd.read_csv(f, header=0, names=["movieId", "title", "genres"], dtype={"movieId": np.int32},
+                           engine="c")
+
+
+MOVIE_READERS = {
+    "ml-25m": _movies_ml25m,
+    "ml-10M100K": lambda zf: _movies_dat(zf, "ml-10M100K/movies.dat"),
+    "ml-1m": lambda zf: _movies_dat(zf, "ml-1m/movies.dat"),
+    "ml-100k": _movies_ml100k,
+}
+
+
+def parse_ml100k(zf):
+    # u.data: user\titem\trating\ttimestamp
+    return _read_ratings(zf, "ml-100k"), _movies_ml100k(zf)
 
 def parse_ml1m(zf):
     # ratings.dat: UserID::MovieID::Rating::Timestamp
-    with zf.open("ml-1m/ratings.dat") as f:
-        df = pd.read_csv(
-            f, sep="::", engine="python", header=None,
-            names=["userId", "movieId", "rating", "timestamp"]
-        )
+    # ... (장르는 "A|B" 문자열 그대로 유지)
+    return _read_ratings(zf, "ml-1m"), MOVIE_READERS["ml-1m"](zf)
 
-    # movies.dat: MovieID::Title::Genres
-    with zf.open("ml-1m/movies.dat") as f:
-        movies = pd.read_csv(
-            f, sep="::", engine="python", header=None,
-            names=["movieId", "title", "genres"],
-            encoding="latin-1"   # 👈 여기 추가
-        )
-
-    movies["movieId"] = movies["movieId"].astype(int)
-    # ... (나머지 장르 원핫 처리 부분은 그대로 유지)
-    return df, movies
-
-def main(zip_path:str=None):
-    # zip: ml-100k.zip 또는 ml-1m.zip
+def parse_ml10m(zf):
+    # ml-10M100K/ratings.dat: UserID::MovieID::Rating(0.5 단위)::Timestamp
+    return _read_ratings(zf, "ml-10M100K"), MOVIE_READERS["ml-10M100K"](zf)
+
+def parse_ml25m(zf):
+    # ml-25m/ratings.csv: userId,movieId,rating,timestamp
+    return _read_ratings(zf, "ml-25m"), _movies_ml25m(zf)
+
+
+def genre_mask(movies: pd.DataFrame) -> np.ndarray:
+    """영화 테이블 → uint32 장르 bitmask (bit j = GENRES_19[j], 목록 밖 장르(IMAX 등)는 무시)"""
+    mask = np.zeros(len(movies), dtype=np.uint32)
+    if "genres" in movies.columns:
+        flags = movies["genres"].fillna("").str.get_dummies("|")
+        names = list(flags.columns)
+    else:
+        flags = movies[[f"g{i}" for i in range(len(GENRES_100K))]]
+        names = GENRES_100K
+    for name, col in zip(names, flags.columns):
+        if name in GENRES_19:
+            mask |= (flags[col].to_numpy() != 0).astype(np.uint32) << np.uint32(GENRES_19.index(name))
+    return mask
+
+
+def movie_dimension(movies: pd.DataFrame, movie_ids=None) -> pd.DataFrame:
+    """영화 차원 테이블 (movieId int32, title, genre_mask uint32). movie_ids: 평점이 있는 영화만 남길 때"""
+    dim = pd.DataFrame({"movieId": movies["movieId"].to_numpy(dtype=np.int32), "title": movies["title"].to_numpy(),
+                        "genre_mask": genre_mask(movies)})
+    if movie_ids is not None:
+        dim = dim[dim["movieId"].isin(movie_ids)]
+    return dim.drop_duplicates("movieId").sort_values("movieId").reset_index(drop=True)
+
+
+def save_movies(dim: pd.DataFrame, path: Path) -> None:
+    """영화 차원 테이블 저장 + 스키마 메타데이터에 genre_mask bit 순서(장르 어휘) 기록 (features.load_movies가 검증)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(dim, preserve_index=False)
+    meta = {**(table.schema.metadata or {}), b"genre_vocab": json.dumps(GENRES_19).encode()}
+    pq.write_table(table.replace_schema_metadata(meta), path)
+
+
+PARSERS = {"ml-25m": parse_ml25m, "ml-10M100K": parse_ml10m, "ml-1m": parse_ml1m, "ml-100k": parse_ml100k}
+
+
+# ---------------------------------------------------------------
+# 스트리밍 전처리: 2-pass (timestamp 히스토그램 → chunk별 split/버킷 파티션 기록)
+# ---------------------------------------------------------------
+class HourHistogram:
+    """timestamp를 시간(3600s) 단위로 누적 → 분위수 경계 계산 (메모리: 관측 기간의 시간 수)"""
+
+    def __init__(self):
+        self.base, self.counts, self.n = None, np.zeros(0, dtype=np.int64), 0
+
+    def add(self, ts) -> None:
+        h = np.asarray(ts, dtype=np.int64) // 3600
+        if len(h) == 0:
+            return
+        lo = int(h.min())
+        if self.base is None:
+            self.base = lo
+        if lo < self.base:
+            self.counts = np.concatenate([np.zeros(self.base - lo, dtype=np.int64), self.counts])
+            self.base = lo
+        c = np.bincount(h - self.base)
+        if len(c) > len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros(len(c) - len(self.counts), dtype=np.int64)])
+        self.counts[:len(c)] += c
+        self.n += len(h)
+
+    def quantile(self, q: float) -> int:
+        """누적 비율이 q에 도달하는 시간 구간의 끝 (배타 경계 timestamp: ts < 경계 → 앞 split)"""
+        h = int(np.searchsorted(np.cumsum(self.counts), q * self.n, side="left"))
+        return (self.base + h + 1) * 3600
+
+
+def _month_bucket(ts: np.ndarray) -> np.ndarray:
+    """timestamp → YYYYMM (int32) 시간 버킷"""
+    months = np.asarray(ts, dtype="datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    return ((months // 12 + 1970) * 100 + months % 12 + 1).astype(np.int32)
+
+
+def prepare_streaming(zf, layout: str, chunksize: int = 1_000_000, fractions=(0.8, 0.1)):
+    """
+    대용량(ml-10m/25m) 전처리: 평점을 chunk로 두 번 스트리밍
+      1) timestamp 시간 히스토그램 → train/valid/test 경계 (80/10/10 분위수, 시간 단위 해상도)
+      2) chunk마다 라벨/split·월 버킷 부여 → processed/ratings/split=*/time_bucket=*/ 에 바로 기록
+         (평점 fact 컬럼만, 장르/제목은 movies.parquet 차원 테이블에서 load_split이 조인)
+    peak 메모리 ≈ chunk 1개 + 영화 테이블 + 히스토그램
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    movies = MOVIE_READERS[layout](zf)
+
+    t0 = time.perf_counter()
+    hist = HourHistogram()
+    for chunk in iter_ratings(zf, layout, chunksize):
+        hist.add(chunk["timestamp"].to_numpy())
+    b_valid = hist.quantile(fractions[0])
+    b_test = hist.quantile(fractions[0] + fractions[1])
+    print(f"[pass 1] {hist.n:,} ratings in {time.perf_counter() - t0:.1f}s → valid from ts={b_valid}, test from ts={b_test}")
+
+    out = OUT_DIR / "ratings"
+    if out.exists():
+        shutil.rmtree(out)
+    users, movie_ids = np.zeros(0, np.int32), np.zeros(0, np.int32)
+    counts = {"train": 0, "valid": 0, "test": 0}
+    t0 = time.perf_counter()
+    for i, chunk in enumerate(iter_ratings(zf, layout, chunksize)):
+        chunk["label"] = (chunk["rating"] >= 4).astype(np.int8)
+        ts = chunk["timestamp"].to_numpy()
+        chunk["split"] = np.where(ts < b_valid, "train", np.where(ts < b_test, "valid", "test"))
+        chunk["time_bucket"] = _month_bucket(ts)
+        pq.write_to_dataset(pa.Table.from_pandas(chunk, preserve_index=False), out,
+                            partition_cols=["split", "time_bucket"], basename_template=f"part-{i:05d}-{{i}}.parquet")
+        for k, v in chunk["split"].value_counts().items():
+            counts[k] += int(v)
+        users = np.union1d(users, chunk["userId"].unique())
+        movie_ids = np.union1d(movie_ids, chunk["movieId"].unique())
+        n = sum(counts.values())
+        print(f"\r[pass 2] {n:,} rows ({n / (time.perf_counter() - t0):,.0f} rows/s)", end="", flush=True)
+    print()
+
+    # 같은 디렉터리의 구버전 단일 파일 split은 제거 (load_split이 파티션 데이터를 읽도록)
+    for split in counts:
+        (OUT_DIR / f"{split}.parquet").unlink(missing_ok=True)
+    pd.DataFrame({"userId": users}).to_parquet(OUT_DIR / "users.parquet", index=False)
+    save_movies(movie_dimension(movies, movie_ids), OUT_DIR / "movies.parquet")
+    meta = {"layout": layout, "boundaries": {"valid": b_valid, "test": b_test}, "rows": counts}
+    (OUT_DIR / "split_meta.json").write_text(json.dumps(meta, indent=2))
+    print(f"Prepared {sum(counts.values()):,} rows {counts}. Saved to {out}")
+
+
+def main(zip_path: str = None, streaming: bool = None, chunksize: int = 1_000_000):
+    # zip: ml-100k.zip / ml-1m.zip / ml-10m.zip / ml-25m.zip
     if zip_path is None:
-        # 기본 우선순위: ml-1m.zip 있으면 사용, 없으면 ml-100k.zip
-        if (DATA_DIR / "ml-1m.zip").exists():
-            zip_path = str(DATA_DIR / "ml-1m.zip")
+        # 기본 우선순위: ml-1m.zip → ml-100k.zip → ml-10m.zip → ml-25m.zip
+        for name in ("ml-1m.zip", "ml-100k.zip", "ml-10m.zip", "ml-25m.zip"):
+            if (DATA_DIR / name).exists():
+                zip_path = str(DATA_DIR / name)
+                break
         else:
             zip_path = str(DATA_DIR / "ml-100k.zip")
     assert os.path.exists(zip_path), f"Zip not found: {zip_path}"
 
     with zipfile.ZipFile(zip_path, "r") as zf:
-        names = zf.namelist()
-        if any(n.startswith("ml-1m/") for n in names):
-            df, movies = parse_ml1m(zf)
-        elif any(n.startswith("ml-100k/") for n in names):
-            df, movies = parse_ml100k(zf)
-        else:
-            raise ValueError("Unsupported dataset. Put ml-1m.zip or ml-100k.zip in data/")
-
-    # implicit label
-    df["label"] = (df["rating"] >= 4).astype(int)
+        layout = detect_layout(zf.namelist())
+        # 10M/25M은 기본 스트리밍 (전체 정렬이 메모리에 안 맞음)
+        if streaming is None:
+            streaming = layout in ("ml-10M100K", "ml-25m")
+        if streaming:
+            return prepare_streaming(zf, layout, chunksize)
+        t0 = time.perf_counter()
+        df, movies = PARSERS[layout](zf)
+    dt = time.perf_counter() - t0
+    print(f"Parsed {len(df):,} ratings + {len(movies):,} movies in {dt:.2f}s ({len(df) / dt:,.0f} rows/s)")
 
-    # join 19-genre one-hot
-    df = df.merge(movies, on="movieId", how="left")
+    # implicit label (장르/제목은 조인하지 않고 movies.parquet 차원 테이블로 분리 저장)
+    df["label"] = (df["rating"] >= 4).astype(np.int8)
 
     # 시간순 정렬 후 split
     df = df.sort_values("timestamp").reset_index(drop=True)
@@ -83,17 +314,26 @@ def main(zip_path:str=None):
     df_valid = df.iloc[train_end:valid_end].copy()
     df_test  = df.iloc[valid_end:].copy()
 
-    # 저장
+    # 저장 (스트리밍 모드의 파티션 출력이 남아 있으면 제거)
+    if (OUT_DIR / "ratings").exists():
+        shutil.rmtree(OUT_DIR / "ratings")
     df_train.to_parquet(OUT_DIR / "train.parquet", index=False)
     df_valid.to_parquet(OUT_DIR / "valid.parquet", index=False)
     df_test.to_parquet(OUT_DIR / "test.parquet", index=False)
 
     users  = pd.DataFrame({"userId": np.sort(df["userId"].unique())})
-    movies_ids = pd.DataFrame({"movieId": np.sort(df["movieId"].unique())})
     users.to_parquet(OUT_DIR / "users.parquet", index=False)
-    movies_ids.to_parquet(OUT_DIR / "movies.parquet", index=False)
+    save_movies(movie_dimension(movies, df["movieId"].unique()), OUT_DIR / "movies.parquet")
 
     print(f"Prepared {len(df)} rows. Saved to {OUT_DIR}")
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("zip_path", nargs="?", default=None)
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--streaming", dest="streaming", action="store_true", default=None,
+                      help="chunk 스트리밍 + split/월 버킷 파티션 parquet (ml-10m/25m 기본)")
+    mode.add_argument("--in-memory", dest="streaming", action="store_false", help="전체 로드 후 정렬·분할")
+    ap.add_argument("--chunksize", type=int, default=1_000_000)
+    args = ap.parse_args()
+    main(args.zip_path, args.streaming, args.chunksize)
@@ -0,0 +1,232 @@
+# src/recommend.py
+"""
+사용자별 Top-K 추천 보조 구조
+  - top_k        : np.argpartition 기반 상위 K 인덱스 (점수 내림차순)
+  - RatedIndex   : userId → 이미 평가한 movieId (CSR, 정렬) — 추천에서 제외
+  - ItemCandidates: 후보 영화의 item-side 표현(movie 컬럼, 장르 행렬, 선형 item 항)을 1회 계산해 재사용
+  - TopKTable    : 오프라인 사전 계산 (arm, userId) → Top-K (memmap .npy, 서빙 시 O(1) 조회)
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features import model_proba
+from linear_scorer import LinearScorer
+from lgbm_compiled import CompiledForest
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """상위 k개 인덱스 (내림차순). 전체 정렬 대신 argpartition O(n) + k개만 정렬"""
+    n = len(scores)
+    k = min(int(k), n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k] if k < n else np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """2차원 점수 (n, m) → 행별 상위 k개 열 인덱스 (n, k), 내림차순"""
+    n, m = scores.shape
+    k = min(int(k), m)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < m else np.tile(np.arange(m), (n, 1))
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class RatedIndex:
+    """userId → 평가한 movieId 목록 (indptr는 userId dense 인덱스, 미등록 userId는 빈 목록)"""
+
+    def __init__(self, indptr, items):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.items = np.asarray(items, dtype=np.int64)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "RatedIndex":
+        pairs = df[["userId", "movieId"]].drop_duplicates().sort_values(["userId", "movieId"])
+        uids = pairs["userId"].to_numpy(dtype=np.int64)
+        indptr = np.zeros(int(uids.max()) + 2 if len(uids) else 1, dtype=np.int64)
+        np.cumsum(np.bincount(uids, minlength=len(indptr) - 1), out=indptr[1:])
+        return cls(indptr, pairs["movieId"].to_numpy(dtype=np.int64))
+
+    def save(self, path) -> None:
+        np.savez(path, indptr=self.indptr, items=self.items)
+
+    @classmethod
+    def load(cls, path) -> "RatedIndex":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z["indptr"], z["items"])
+
+    def get(self, user_id: int) -> np.ndarray:
+        if not 0 <= user_id < len(self.indptr) - 1:
+            return self.items[:0]
+        return self.items[self.indptr[user_id]:self.indptr[user_id + 1]]
+
+
+class ItemCandidates:
+    """
+    후보 영화 집합 + arm 모델별 item-side 사전 계산
+      - LinearScorer   : item_bias (w[m] + 장르·w_genre) → 요청당 벡터 덧셈 1회
+      - CompiledForest : movie 컬럼/장르 행렬 → 요청당 user 컬럼만 바꿔 일괄 평가
+      - 그 외 (sklearn) : 후보 DataFrame → 요청당 CSR 조립 + predict_proba
+    """
+
+    def __init__(self, movie_ids, enc):
+        self.movie_ids = np.unique(np.asarray(movie_ids, dtype=np.int64))
+        self.enc = enc
+        frame = pd.DataFrame({"movieId": self.movie_ids})
+        self.mcol = enc.index(frame.assign(userId=-1))[1]
+        self.G = enc.genre_matrix(frame) if enc.genre_cols else None
+        self._item_bias = {}  # id(LinearScorer) → item_bias
+
+    def __len__(self) -> int:
+        return len(self.movie_ids)
+
+    def grid(self, model, user_ids, raw: bool = False) -> np.ndarray:
+        """사용자 배치 × 전체 후보 점수 (n_users, n_items). raw=True면 선형 모델은 sigmoid 전 logit (순위 동일)"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        n_u, n_i = len(user_ids), len(self)
+        ucol = self.enc.index(pd.DataFrame({"userId": user_ids, "movieId": np.full(n_u, -1)}))[0]
+        if isinstance(model, LinearScorer):
+            bias = self._item_bias.get(id(model))
+            if bias is None:
+                bias = self._item_bias[id(model)] = model.item_bias(self.mcol, self.G)
+            logit = (model.intercept + model.user_bias(ucol))[:, None] + bias[None, :]
+            return logit if raw else 1.0 / (1.0 + np.exp(-logit))
+        if isinstance(model, CompiledForest):
+            G = None if self.G is None else np.tile(self.G, (n_u, 1))
+            p = model.predict_proba_index(np.repeat(ucol, n_i), np.tile(self.mcol, n_u), G,
+                                          self.enc.genre_offset)
+            return p.reshape(n_u, n_i)
+        frame = pd.DataFrame({"userId": np.repeat(user_ids, n_i), "movieId": np.tile(self.movie_ids, n_u)})
+        return model_proba(model, self.enc.transform(frame)).reshape(n_u, n_i)
+
+    def scores(self, model, user_id: int, raw: bool = False) -> np.ndarray:
+        """한 사용자 × 전체 후보 점수"""
+        return self.grid(model, [user_id], raw)[0]
+
+    def top_k_grid(self, model, user_ids, k: int, exclude=None):
+        """
+        사용자 배치별 Top-K → (items (n, k) movieId, -1 패딩), (scores (n, k) 확률, nan 패딩)
+        exclude: 사용자별 제외 movieId 배열 목록 (len(user_ids)개)
+        """
+        S = self.grid(model, user_ids, raw=True)
+        if exclude is not None:
+            counts = np.fromiter((len(e) for e in exclude), dtype=np.int64, count=len(S))
+            if counts.sum():
+                ex = np.concatenate([np.asarray(e, dtype=np.int64) for e in exclude])
+                rows = np.repeat(np.arange(len(S)), counts)
+                pos = np.searchsorted(self.movie_ids, ex)  # movie_ids는 정렬·고유
+                ok = pos < len(self)
+                ok[ok] = self.movie_ids[pos[ok]] == ex[ok]
+                S[rows[ok], pos[ok]] = -np.inf
+        idx = top_k_rows(S, k)
+        top = np.take_along_axis(S, idx, axis=1)
+        valid = np.isfinite(top)
+        if isinstance(model, LinearScorer):
+            top = 1.0 / (1.0 + np.exp(-top))
+        return np.where(valid, self.movie_ids[idx], -1), np.where(valid, top, np.nan)
+
+    def recommend(self, model, user_id: int, k: int = 10, exclude=None) -> pd.DataFrame:
+        """Top-K (movieId, score). exclude: 제외할 movieId 배열"""
+        items, scores = self.top_k_grid(model, [user_id], k, None if exclude is None else [exclude])
+        keep = items[0] >= 0
+        return pd.DataFrame({"movieId": items[0][keep], "score": scores[0][keep]})
+
+
+class TopKTable:
+    """
+    오프라인 사전 계산 Top-K (precompute_topk.py가 생성)
+      - <root>/<run>/items.npy  : (n_arms, max_userId+1, K) int32, 빈 칸 -1
+      - <root>/<run>/scores.npy : (n_arms, max_userId+1, K) float64, 빈 칸 nan (실시간 경로와 같은 정밀도)
+      - <root>/<run>/meta.json  : model_uri/version, K, exclude_rated
+      - <root>/CURRENT          : 서빙할 run 디렉터리 이름 (완료 후 원자적으로 교체)
+    np.load(mmap_mode)로 열어 전체를 메모리에 올리지 않고 행 단위로 조회.
+    매 실행은 새 run 디렉터리(시각 + pid + 난수 접미사 → 동시 실행도 충돌 없음)에 쓰므로 서빙 중인 memmap 파일을 덮어쓰지 않음
+    """
+    ARMS = ("A", "B")
+
+    def __init__(self, path, items, scores, meta: dict):
+        self.path = Path(path)
+        self.items, self.scores, self.meta = items, scores, meta
+
+    @property
+    def k(self) -> int:
+        return int(self.meta["k"])
+
+    @classmethod
+    def create(cls, root, n_rows: int, k: int, meta: dict) -> "TopKTable":
+        path = Path(root) / f"{time.strftime('run-%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        path.mkdir(parents=True, exist_ok=False)
+        shape = (len(cls.ARMS), int(n_rows), int(k))
+        items = np.lib.format.open_memmap(path / "items.npy", mode="w+", dtype=np.int32, shape=shape)
+        scores = np.lib.format.open_memmap(path / "scores.npy", mode="w+", dtype=np.float64, shape=shape)
+        items[:] = -1
+        scores[:] = np.nan
+        table = cls(path, items, scores, {**meta, "k": int(k), "n_rows": int(n_rows)})
+        table.flush()
+        (path / "meta.json").write_text(json.dumps(table.meta, indent=2))
+        return table
+
+    @classmethod
+    def open(cls, path, mode: str = "r") -> "TopKTable":
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text())
+        return cls(path, np.load(path / "items.npy", mmap_mode=mode), np.load(path / "scores.npy", mmap_mode=mode), meta)
+
+    @classmethod
+    def open_current(cls, root):
+        """CURRENT가 가리키는 run 열기 (아직 발행된 run이 없으면 None)"""
+        current = Path(root) / "CURRENT"
+        if not current.exists():
+            return None
+        return cls.open(Path(root) / current.read_text().strip())
+
+    def publish(self, keep: int = 2, **meta) -> None:
+        """meta 갱신 후 CURRENT를 이 run으로 원자적 교체, 오래된 run은 keep개만 남기고 삭제"""
+        self.flush()
+        self.meta.update(meta)
+        (self.path / "meta.json").write_text(json.dumps(self.meta, indent=2))
+        root = self.path.parent
+        tmp = root / "CURRENT.tmp"
+        tmp.write_text(self.path.name)
+        tmp.replace(root / "CURRENT")
+        for old in sorted(p for p in root.glob("run-*") if p.is_dir())[:-keep]:
+            shutil.rmtree(old, ignore_errors=True)  # 서빙 중 mmap은 파일 삭제 후에도 유효 (inode 유지)
+
+    def write_rows(self, arm: str, user_ids, items: np.ndarray, scores: np.ndarray) -> None:
+        a = self.ARMS.index(arm)
+        self.items[a, user_ids] = items
+        self.scores[a, user_ids] = scores
+
+    def flush(self) -> None:
+        self.items.flush()
+        self.scores.flush()
+
+    def serves(self, version, exclude_rated: bool) -> bool:
+        """테이블이 현재 router 버전/제외 규칙과 일치하는지"""
+        return self.meta.get("version") == str(version) and bool(self.meta.get("exclude_rated")) == bool(exclude_rated)
+
+    def recommend(self, arm: str, user_id: int, k: int, exclude=None):
+        """사전 계산 Top-K 조회 (O(1) 행 접근). 미계산 사용자이거나 K가 모자라면 None → 실시간 스코어링"""
+        if k > self.k or not 0 <= user_id < self.items.shape[1]:
+            return None
+        a = self.ARMS.index(arm)
+        items = np.asarray(self.items[a, user_id])
+        if items[0] < 0:
+            return None
+        scores = np.asarray(self.scores[a, user_id])
+        keep = items >= 0
+        if exclude is not None and len(exclude):
+            keep &= ~np.isin(items, exclude)
+        if keep.sum() < k and (items >= 0).all():  # 제외 후 부족 → K 밖의 후보가 필요
+            return None
+        return pd.DataFrame({"movieId": items[keep][:k].astype(np.int64), "score": scores[keep][:k].astype(np.float64)})
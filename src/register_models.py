@@ -1,5 +1,14 @@
 import mlflow
 
+MODEL_NAME = "movielens_ctr_ab"
+
+def register_run_model(run_id: str, alias: str, client=None):
+    """runs:/<run_id>/model → 새 모델 버전 등록 + 정책 alias 이동. ModelVersion 반환"""
+    client = client or mlflow.tracking.MlflowClient()
+    mv = mlflow.register_model(f"runs:/{run_id}/model", MODEL_NAME)
+    client.set_registered_model_alias(MODEL_NAME, alias, mv.version)
+    return mv
+
 def register_models():
     client = mlflow.tracking.MlflowClient()
     exp = mlflow.get_experiment_by_name("abtest_movielens")
@@ -9,15 +18,11 @@ def register_models():
 
     # LogReg (Policy A)
     runA = runs[runs["tags.mlflow.runName"] == "PolicyA_LogReg"].iloc[0]
-    modelA_uri = f"runs:/{runA.run_id}/model"
-    mvA = mlflow.register_model(modelA_uri, "movielens_ctr_ab")
-    client.set_registered_model_alias("movielens_ctr_ab", "PolicyA", mvA.version)
+    register_run_model(runA.run_id, "PolicyA", client)
 
     # LightGBM (Policy B)
     runB = runs[runs["tags.mlflow.runName"] == "PolicyB_LightGBM"].iloc[0]
-    modelB_uri = f"runs:/{runB.run_id}/model"
-    mvB = mlflow.register_model(modelB_uri, "movielens_ctr_ab")
-    client.set_registered_model_alias("movielens_ctr_ab", "PolicyB", mvB.version)
+    register_run_model(runB.run_id, "PolicyB", client)
 
 if __name__ == "__main__":
     register_models()
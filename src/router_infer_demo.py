@@ -1,16 +1,17 @@
 import pandas as pd
 import mlflow
 import os
-from pathlib import Path
 import numpy as np
+from features import load_split
 
 MODEL_URI = "models:/movielens_ctr_router@router"
-router_model = mlflow.pyfunc.load_model(MODEL_URI)
 
 def main(n=20, seed=42):
-    # 샘플 데이터 (label 있는 test.parquet에서 가져오기)
-    test_path = Path("data/processed/test.parquet")
-    df = pd.read_parquet(test_path).sample(n=n, random_state=seed).reset_index(drop=True)
+    # 모델은 import 시점이 아니라 실행 시 로드
+    router_model = mlflow.pyfunc.load_model(MODEL_URI)
+
+    # 샘플 데이터 (label 있는 test split에서 가져오기, 스트리밍 전처리의 파티션 출력도 지원)
+    df = load_split("test").sample(n=n, random_state=seed).reset_index(drop=True)
 
     # Router 예측 실행
     preds = router_model.predict(df)
@@ -46,3 +47,6 @@ def main(n=20, seed=42):
             "PolicyB_ratio": (df_out["assigned"] == "PolicyB").mean()
         })
         print(f"\n[MLflow] Demo run logged under run_id={run.info.run_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# src/score_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ScoreCache:
+    """
+    (policy, userId, movieId) → score 인프로세스 LRU + TTL 캐시
+      - max_size 초과 시 가장 오래 안 쓰인 항목부터 제거 (eviction)
+      - ttl_seconds 경과 항목은 조회 시 만료 처리 (miss로 집계)
+      - bind_version(v): 서빙 중인 router 모델 버전이 바뀌면 전체 무효화
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl_seconds: float = 600.0):
+        self.max_size = int(max_size)
+        self.ttl = float(ttl_seconds)
+        self.version = None
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def bind_version(self, version) -> None:
+        with self._lock:
+            if version != self.version:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self.version = version
+
+    def get_many(self, keys):
+        """keys 목록 조회 → (scores: float64, miss 자리는 nan), miss 마스크 (저장된 nan 점수도 hit으로 구분)"""
+        scores = np.full(len(keys), np.nan, dtype=np.float64)
+        miss = np.ones(len(keys), dtype=bool)
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                hit = self._data.get(key)
+                if hit is None:
+                    continue
+                score, expires = hit
+                if expires < now:
+                    del self._data[key]
+                    self.expirations += 1
+                    continue
+                self._data.move_to_end(key)
+                scores[i] = score
+                miss[i] = False
+            n_miss = int(miss.sum())
+            self.misses += n_miss
+            self.hits += len(keys) - n_miss
+        return scores, miss
+
+    def put_many(self, keys, scores, version=None) -> None:
+        """version이 주어졌는데 현재 바인딩과 다르면 (교체 직전 모델의 점수) 저장하지 않음"""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            for key, score in zip(keys, scores):
+                self._data[key] = (float(score), expires)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "version": self.version,
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
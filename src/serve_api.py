@@ -1,25 +1,59 @@
 # src/serve_api.py
 from typing import List, Optional, Union
+from pathlib import Path
 import os
 
 import mlflow
 import mlflow.pyfunc
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+import columnar_io
+from ab_stats import ABStats
+from micro_batcher import MicroBatcher
+from model_watcher import ModelWatcher
+from recommend import TopKTable
+from score_cache import ScoreCache
+
 # -----------------------
 # 설정
 # -----------------------
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "sqlite:///mlflow.db")
 # 기본은 Registry alias. 필요 시 runs:/<run_id>/ab_router 로 교체 가능
 MODEL_URI = os.getenv("ROUTER_MODEL_URI", "models:/movielens_ctr_router@router")
+# /predict 마이크로배칭: 최대 배치 크기 / 첫 요청 후 최대 대기 시간(ms)
+MAX_BATCH_SIZE = int(os.getenv("ROUTER_MAX_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("ROUTER_MAX_WAIT_MS", "2"))
+# (policy, userId, movieId) 점수 캐시: 크기(0이면 비활성) / TTL(초)
+CACHE_SIZE = int(os.getenv("ROUTER_CACHE_SIZE", "100000"))
+CACHE_TTL_S = float(os.getenv("ROUTER_CACHE_TTL_S", "600"))
+# registry alias 폴링 주기(초): 새 버전을 백그라운드 로드 후 무중단 교체 (0이면 비활성)
+VERSION_POLL_S = float(os.getenv("ROUTER_VERSION_POLL_S", "30"))
+# precompute_topk.py 출력 루트: router 버전이 일치하면 /recommend를 사전 계산 테이블로 응답
+TOPK_DIR = Path(os.getenv("ROUTER_TOPK_DIR", str(Path(__file__).resolve().parent.parent / "data" / "artifacts" / "topk")))
+# 온라인 A/B 집계: MLflow 스냅샷 주기(초, 0이면 기록 안 함) / 유의수준 / mSPRT 혼합 prior 표준편차 (B-A 차이 척도)
+AB_STATS_FLUSH_S = float(os.getenv("AB_STATS_FLUSH_S", "60"))
+AB_STATS_ALPHA = float(os.getenv("AB_STATS_ALPHA", "0.05"))
+AB_STATS_TAU = float(os.getenv("AB_STATS_TAU", "0.05"))
 
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
 
-# 모델 로드 (서버 기동 시 1회)
+score_cache = ScoreCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL_S)
+ab_stats = ABStats(alpha=AB_STATS_ALPHA, tau=AB_STATS_TAU, flush_seconds=AB_STATS_FLUSH_S)
+
+
+def _on_swap(loaded) -> None:
+    score_cache.bind_version(loaded.version)
+    ab_stats.bind_version(loaded.version)  # 버전이 바뀌면 온라인 실험 집계도 새로 시작 (MLflow 기록은 flush 스레드)
+
+
+# 모델 로드: 기동 시 1회 동기 로드, 이후 alias 변경은 watcher가 백그라운드에서 교체
+watcher = ModelWatcher(MODEL_URI, poll_seconds=VERSION_POLL_S, on_swap=_on_swap)
 try:
-    router_model = mlflow.pyfunc.load_model(MODEL_URI)
+    watcher.start()
 except Exception as e:
     raise RuntimeError(
         f"[serve_api] Failed to load router model from '{MODEL_URI}'.\n"
@@ -48,12 +82,43 @@ class PredictOut(BaseModel):
     label: Optional[int] = None
 
 
+class RecommendIn(BaseModel):
+    userId: int
+    k: int = 10
+    exclude_rated: bool = True           # 이미 평가한 영화 제외 (router의 rated 아티팩트 기준)
+    exclude: Optional[List[int]] = None  # 추가로 제외할 movieId
+
+
+class RecommendItem(BaseModel):
+    movieId: int
+    score: float
+
+
+class RecommendOut(BaseModel):
+    userId: int
+    assigned: str
+    model_version: str
+    source: str                          # "precomputed" | "live"
+    items: List[RecommendItem]
+
+
+# router 출력의 짧은 배정 라벨 → summary/데모에서 쓰는 정책 이름
+_ARM_NAMES = {"A": "PolicyA", "B": "PolicyB"}
+
+
 def _normalize_predictions(df: pd.DataFrame, preds: Union[List, pd.Series]) -> pd.DataFrame:
     """
     router pyfunc 출력 정규화:
       - [{'model': 'PolicyA', 'score': 0.7}, ...]
       - [0.12, 0.87, ...]
+      - DataFrame(assigned, score)  (ABRouter pyfunc)
     """
+    if isinstance(preds, pd.DataFrame) and {"assigned", "score"}.issubset(preds.columns):
+        out = df.copy().reset_index(drop=True)
+        out["assigned"] = preds["assigned"].replace(_ARM_NAMES).to_numpy()
+        out["score"] = preds["score"].to_numpy()
+        return out
+
     if isinstance(preds, list) and len(preds) > 0 and isinstance(preds[0], dict):
         pred_df = pd.DataFrame(preds)
         if "model" in pred_df.columns:
@@ -69,48 +134,225 @@ def _normalize_predictions(df: pd.DataFrame, preds: Union[List, pd.Series]) -> p
     return out
 
 
+def _summary(out_df: pd.DataFrame) -> dict:
+    is_a = (out_df["assigned"] == "PolicyA").to_numpy()
+    is_b = (out_df["assigned"] == "PolicyB").to_numpy()
+    score = out_df["score"].to_numpy(dtype=float)
+    return {
+        "PolicyA_ratio": float(is_a.mean()) if len(out_df) else 0.0,
+        "PolicyB_ratio": float(is_b.mean()) if len(out_df) else 0.0,
+        "PolicyA_mean_score": float(score[is_a].mean()) if is_a.any() else None,
+        "PolicyB_mean_score": float(score[is_b].mean()) if is_b.any() else None,
+    }
+
+
+def _route(df: pd.DataFrame) -> pd.DataFrame:
+    """라우팅 + 온라인 A/B 집계 (arm별 노출/점수/라벨, 스코어링한 router 버전 기준)"""
+    router = watcher.current  # 요청 단위 스냅샷 (도중에 교체돼도 같은 버전 사용)
+    out = _route_scores(df, router)
+    ab_stats.observe(out["assigned"].to_numpy(), out["score"].to_numpy(),
+                     out["label"].to_numpy(dtype=np.float64, na_value=np.nan) if "label" in out.columns else None,
+                     version=router.version)
+    return out
+
+
+def _route_scores(df: pd.DataFrame, router) -> pd.DataFrame:
+    """점수 캐시 조회 → miss 행만 router 1회 호출 → 원래 행 순서로 병합"""
+    if router.impl is None or not score_cache.enabled:
+        return _normalize_predictions(df, router.model.predict(df[["userId", "movieId"]]))
+
+    uids = df["userId"].to_numpy(dtype=np.int64)
+    mids = df["movieId"].to_numpy(dtype=np.int64)
+    arms = router.impl.assign(uids)
+    keys = list(zip(arms.tolist(), uids.tolist(), mids.tolist()))
+    scores, miss = score_cache.get_many(keys)
+    if miss.any():
+        idx = np.flatnonzero(miss)
+        preds = router.model.predict(df.iloc[idx][["userId", "movieId"]].reset_index(drop=True))
+        fresh = _normalize_predictions(df.iloc[idx], preds)["score"].to_numpy(dtype=np.float64)
+        scores[idx] = fresh
+        score_cache.put_many([keys[i] for i in idx], fresh, version=router.version)
+
+    out = df.copy().reset_index(drop=True)
+    out["assigned"] = pd.Series(arms).replace(_ARM_NAMES).to_numpy()
+    out["score"] = scores
+    return out
+
+
+_topk = {"mtime": None, "table": None, "precomputed": 0, "live": 0}
+
+
+def _topk_table() -> Optional[TopKTable]:
+    """사전 계산 Top-K 테이블 (CURRENT가 바뀌면 다시 열기). 없으면 None"""
+    try:
+        mtime = (TOPK_DIR / "CURRENT").stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if mtime != _topk["mtime"]:
+        try:
+            _topk["table"] = TopKTable.open_current(TOPK_DIR)
+        except Exception as e:
+            print(f"[serve_api] failed to open top-K table in {TOPK_DIR}: {e}")
+            _topk["table"] = None
+        _topk["mtime"] = mtime
+    return _topk["table"]
+
+
+def _predict_batch(df: pd.DataFrame) -> pd.DataFrame:
+    """마이크로배처 워커 스레드에서 실행: 배치 1회 router 호출"""
+    return _route(df)
+
+
+batcher = MicroBatcher(_predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
+
+
+@app.on_event("startup")
+async def _start_batcher():
+    await batcher.start()
+    ab_stats.start()
+
+
+@app.on_event("shutdown")
+async def _stop_batcher():
+    await batcher.stop()
+    watcher.stop()
+    ab_stats.stop()  # 마지막 스냅샷 기록
+
+
 @app.get("/health")
 def health():
     return {
         "status": "ok",
         "model_uri": MODEL_URI,
+        "model_version": watcher.current.version,
         "tracking_uri": MLFLOW_TRACKING_URI,
     }
 
 
+@app.get("/stats")
+def stats():
+    table = _topk_table()
+    return {
+        "batcher": batcher.stats(), "score_cache": score_cache.stats(), "model": watcher.stats(),
+        "ab_stats": ab_stats.stats(),
+        "recommend": {"precomputed": _topk["precomputed"], "live": _topk["live"],
+                      "table_version": table.meta.get("version") if table is not None else None},
+    }
+
+
+@app.get("/ab_stats")
+def get_ab_stats(flush: bool = False):
+    """
+    현재 router 버전의 온라인 A/B 집계 + B vs A 순차 검정 (mSPRT always-valid p-value / CI)
+      - label: 요청에 라벨(결과)이 함께 온 노출만, score: 전체 노출
+      - flush=true면 이 스냅샷을 즉시 MLflow에 기록
+    """
+    if flush:
+        ab_stats.flush()
+    return ab_stats.report()
+
+
+@app.post("/admin/reload")
+def admin_reload():
+    """alias 즉시 확인 (폴링 주기 대기 없이). 로드는 이 요청 스레드에서만 수행"""
+    try:
+        swapped = watcher.check_now()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"[admin_reload] {e}")
+    return {"swapped": swapped, **watcher.stats()}
+
+
+@app.post("/admin/rollback")
+def admin_rollback():
+    """직전 router 버전으로 즉시 복귀 (재로드 없음)"""
+    try:
+        watcher.rollback()
+    except Exception as e:
+        raise HTTPException(status_code=409, detail=f"[admin_rollback] {e}")
+    return watcher.stats()
+
+
 @app.post("/predict", response_model=PredictOut)
-def predict_one(item: PredictIn):
+async def predict_one(item: PredictIn):
     try:
-        df = pd.DataFrame([item.dict()])
-        preds = router_model.predict(df)
-        out = _normalize_predictions(df, preds).iloc[0]
+        out = await batcher.submit(item.dict())
         return PredictOut(
             userId=int(out["userId"]),
             movieId=int(out["movieId"]),
             assigned=str(out["assigned"]),
             score=float(out["score"]),
-            label=(int(out["label"]) if "label" in out and pd.notnull(out["label"]) else None),
+            label=(int(out["label"]) if out.get("label") is not None and pd.notnull(out["label"]) else None),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"[predict_one] {e}")
 
 
+@app.post("/recommend", response_model=RecommendOut)
+def recommend(item: RecommendIn):
+    """
+    배정된 정책의 Top-K
+      - 사전 계산 테이블(같은 router 버전)에 있는 사용자: O(1) 행 조회
+      - 그 외 (신규 사용자, K 초과 등): 전체 후보 일괄 스코어링 (item-side 사전 계산 사용)
+    """
+    if item.k <= 0:
+        raise HTTPException(status_code=422, detail="[recommend] k must be positive")
+    router = watcher.current
+    if router.impl is None or not hasattr(router.impl, "recommend"):
+        raise HTTPException(status_code=501, detail=f"[recommend] router version {router.version} has no recommend()")
+    arm = str(router.impl.assign(np.array([item.userId]))[0])
+    top, source = None, "precomputed"
+    table = _topk_table()
+    if table is not None and table.serves(router.version, item.exclude_rated):
+        top = table.recommend(arm, item.userId, item.k, item.exclude)
+    if top is None:
+        source = "live"
+        try:
+            top = router.impl.recommend(item.userId, k=item.k, exclude_rated=item.exclude_rated, exclude=item.exclude)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"[recommend] {e}")
+    _topk[source] += 1
+    return RecommendOut(
+        userId=item.userId,
+        assigned=_ARM_NAMES.get(arm, arm),
+        model_version=str(router.version),
+        source=source,
+        items=[RecommendItem(movieId=int(m), score=float(v)) for m, v in zip(top["movieId"], top["score"])],
+    )
+
+
 @app.post("/bulk_predict")
 def bulk_predict(items: List[PredictIn] = Body(...)):
     try:
         df = pd.DataFrame([x.dict() for x in items])
-        preds = router_model.predict(df)
-        out_df = _normalize_predictions(df, preds)
-
-        summary = {
-            "PolicyA_ratio": float((out_df["assigned"] == "PolicyA").mean()),
-            "PolicyB_ratio": float((out_df["assigned"] == "PolicyB").mean()),
-            "PolicyA_mean_score": float(out_df.loc[out_df["assigned"] == "PolicyA", "score"].mean())
-                                  if (out_df["assigned"] == "PolicyA").any() else None,
-            "PolicyB_mean_score": float(out_df.loc[out_df["assigned"] == "PolicyB", "score"].mean())
-                                  if (out_df["assigned"] == "PolicyB").any() else None,
-        }
-
-        return {"summary": summary, "rows": out_df.to_dict(orient="records")}
+        out_df = _route(df)
+        return {"summary": _summary(out_df), "rows": out_df.to_dict(orient="records")}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"[bulk_predict] {e}")
+
+
+def _bulk_columnar(df: pd.DataFrame, mt: str):
+    """라우팅 + 응답 인코딩 (스레드풀에서 실행: 대량 요청이 이벤트 루프/마이크로배처를 막지 않도록)"""
+    out_df = _route(df)
+    return columnar_io.encode_response(out_df, _summary(out_df), mt)
+
+
+@app.post("/bulk_predict_columnar")
+async def bulk_predict_columnar(request: Request, format: Optional[str] = None):
+    """
+    컬럼형 bulk 예측 (행 단위 검증/records 직렬화 생략)
+      - 요청 Content-Type: application/json | application/vnd.apache.arrow.stream | application/x-npy
+      - 응답 형식: ?format=json|arrow|npy (기본: 요청과 동일)
+      - 바디 수신만 이벤트 루프에서, 디코딩/라우팅/인코딩은 스레드풀에서 실행
+    """
+    req_mt = columnar_io.media_type(request.headers.get("content-type"))
+    resp_mt = columnar_io.FORMATS.get(format, req_mt) if format else req_mt
+    payload = await request.body()
+    try:
+        df = await run_in_threadpool(columnar_io.decode_request, payload, req_mt)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"[bulk_predict_columnar] bad payload: {e}")
+    try:
+        body, media_type, headers = await run_in_threadpool(_bulk_columnar, df, resp_mt)
+        return Response(content=body, media_type=media_type, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"[bulk_predict_columnar] {e}")
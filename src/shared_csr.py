@@ -0,0 +1,91 @@
+# src/shared_csr.py
+"""
+프로세스 간 CSR 공유 (multiprocessing.shared_memory)
+  - SharedCSR(X, y)   : indptr/indices/data(+y)를 공유 메모리 블록에 1회 복사, spec(이름/shape/dtype)만 워커에 전달
+  - SharedCSR.attach  : 워커에서 블록에 연결 → 복사 없이 csr_matrix 구성 (행렬 피클/파이프 전송 없음)
+  - 생성한 쪽이 close() 시 unlink (with 문 권장), 워커는 close()만
+  - peak RSS 측정 보조 (Linux /proc: 작업 단위로 VmHWM 초기화)
+"""
+import resource
+from multiprocessing import shared_memory
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class SharedCSR:
+    FIELDS = ("indptr", "indices", "data", "y")
+
+    def __init__(self, X=None, y=None, spec=None):
+        self._owner = spec is None
+        self._blocks = []
+        arrays = {}
+        if self._owner:
+            X = sp.csr_matrix(X)
+            spec = {"shape": tuple(int(s) for s in X.shape), "arrays": {}}
+            src = {"indptr": X.indptr, "indices": X.indices, "data": X.data, "y": y}
+            for name, arr in src.items():
+                if arr is None:
+                    continue
+                arr = np.ascontiguousarray(arr)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+                view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+                view[...] = arr
+                self._blocks.append(shm)
+                arrays[name] = view
+                spec["arrays"][name] = (shm.name, arr.shape, arr.dtype.str)
+        else:
+            for name, (shm_name, shape, dtype) in spec["arrays"].items():
+                shm = shared_memory.SharedMemory(name=shm_name)
+                self._blocks.append(shm)
+                arrays[name] = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf)
+        self.spec = spec
+        # csr_matrix((data, indices, indptr))는 dtype이 맞으면 복사하지 않음
+        self.X = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=spec["shape"], copy=False)
+        self.y = arrays.get("y")
+
+    @classmethod
+    def attach(cls, spec) -> "SharedCSR":
+        return cls(spec=spec)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.size for b in self._blocks)
+
+    def close(self) -> None:
+        self.X = self.y = None
+        for shm in self._blocks:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # 호출자가 아직 배열을 참조 중 → 매핑은 프로세스 종료 시 해제
+            if self._owner:
+                shm.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def reset_peak_rss() -> None:
+    """현재 프로세스의 peak RSS(VmHWM) 초기화 → 이후 peak_rss_mb()가 작업 단위 최대치 (Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """peak RSS (MB). /proc이 없으면 프로세스 전체 기간의 ru_maxrss"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,201 @@
+# src/sweep_lgbm.py
+"""
+Policy B (LightGBM) 하이퍼파라미터 sweep
+  - 탐색 공간에서 랜덤 샘플링한 trial을 CPU 예산 안에서 동시 실행 (동시 trial 수 × trial당 num_threads ≤ cpus)
+  - LightGBM Dataset binary는 데이터 버전별로 1회 구성 (lgbm_dataset) → 모든 trial과 이후 sweep/학습이 재사용
+  - early_stopping과 같은 valid logloss를 checkpoint마다 공유 → 같은 반복 시점 다른 trial 중앙값보다 나쁘면 pruning
+  - MLflow: sweep 부모 run + trial별 nested run (MlflowClient, mlflow.parentRunId 태그)
+
+    python src/sweep_lgbm.py --trials 20
+    python src/sweep_lgbm.py --trials 40 --cpus 8 --threads 2 --space space.json
+    python src/train_lgbm.py --params data/artifacts/lgbm_sweep_best.json
+"""
+import argparse, json, os, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+from pathlib import Path
+
+import lightgbm as lgb
+import mlflow
+import numpy as np
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+from features import ART_DIR, split_features
+from lgbm_dataset import lease, train_valid_datasets
+from shared_csr import SharedCSR
+from train_lgbm import EXPERIMENT, PARAMS
+from utils import binary_metrics
+
+BEST_PATH = ART_DIR / "lgbm_sweep_best.json"
+
+# 탐색 공간: list → 범주형, {"uniform"|"loguniform": [lo, hi]}, {"int": [lo, hi]} (양끝 포함)
+SPACE = {
+    "num_leaves": [31, 63, 127, 255],
+    "learning_rate": {"loguniform": [0.01, 0.2]},
+    "min_data_in_leaf": [20, 50, 100, 200],
+    "feature_fraction": {"uniform": [0.5, 1.0]},
+    "bagging_fraction": {"uniform": [0.5, 1.0]},
+    "lambda_l2": {"loguniform": [1e-3, 10.0]},
+}
+
+
+def sample(space: dict, rng: np.random.Generator) -> dict:
+    params = {}
+    for name, dist in space.items():
+        if isinstance(dist, list):
+            v = dist[rng.integers(len(dist))]
+            params[name] = v.item() if isinstance(v, np.generic) else v
+        elif "uniform" in dist:
+            params[name] = float(rng.uniform(*dist["uniform"]))
+        elif "loguniform" in dist:
+            lo, hi = dist["loguniform"]
+            params[name] = float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+        elif "int" in dist:
+            lo, hi = dist["int"]
+            params[name] = int(rng.integers(lo, hi + 1))
+        else:
+            raise ValueError(f"unknown distribution for {name}: {dist}")
+    return params
+
+
+class MedianPruner:
+    """
+    lgb.train 콜백: checkpoint마다 이 trial의 best valid loss를 공유 저장소에 기록하고,
+    같은 반복 시점에 먼저 도달한 trial들의 중앙값보다 나쁘면 EarlyStopException으로 중단 (median stopping rule)
+    """
+    order = 40  # early_stopping(order=30) 다음
+
+    def __init__(self, trial_id: int, reports, lock, every: int = 25, warmup: int = 50, min_trials: int = 3):
+        self.trial_id, self.reports, self.lock = trial_id, reports, lock
+        self.every, self.warmup, self.min_trials = every, warmup, min_trials
+        self.best, self.best_iter, self.best_score = float("inf"), 0, None
+        self.curve = []          # (반복, 그 시점 best valid loss)
+        self.pruned_at = None
+
+    def __call__(self, env):
+        _, _, loss, _ = next(r for r in env.evaluation_result_list if r[0] == "valid")
+        if loss < self.best:
+            self.best, self.best_iter, self.best_score = loss, env.iteration, env.evaluation_result_list
+        it = env.iteration + 1
+        if it % self.every:
+            return
+        self.curve.append((it, self.best))
+        with self.lock:
+            others = self.reports.get(it, [])
+            self.reports[it] = others + [self.best]
+        if it >= self.warmup and len(others) >= self.min_trials and self.best > float(np.median(others)):
+            self.pruned_at = it
+            raise lgb.callback.EarlyStopException(self.best_iter, self.best_score)
+
+
+def _run_trial(trial_id: int, params: dict, data_dir: str, valid_spec: dict, threads: int,
+               experiment_id: str, parent_run_id: str, reports, lock, prune: dict):
+    """워커: Dataset binary 로드 → 학습(early stopping + pruning) → nested run 기록"""
+    t0 = time.perf_counter()
+    client = MlflowClient()
+    run = client.create_run(experiment_id, run_name=f"trial-{trial_id:03d}",
+                            tags={"mlflow.parentRunId": parent_run_id, "trial": str(trial_id)})
+    run_id = run.info.run_id
+    try:
+        train_params = {**PARAMS, **params}
+        rounds = int(train_params.pop("n_estimators"))
+        train_params.update(num_threads=threads, verbose=-1)
+        dtrain = lgb.Dataset(os.path.join(data_dir, "train.bin"))
+        dvalid = lgb.Dataset(os.path.join(data_dir, "valid.bin"), reference=dtrain)
+        pruner = MedianPruner(trial_id, reports, lock, **prune)
+        booster = lgb.train(train_params, dtrain, num_boost_round=rounds, valid_sets=[dvalid], valid_names=["valid"],
+                            callbacks=[lgb.early_stopping(stopping_rounds=50, verbose=False), pruner])
+
+        result = {"trial": trial_id, "params": params, "run_id": run_id, "valid_logloss": pruner.best,
+                  "best_iteration": pruner.best_iter + 1,
+                  "pruned_at": pruner.pruned_at, "wall_s": time.perf_counter() - t0}
+        if pruner.pruned_at is None:  # 끝까지 학습한 trial만 AUC 등 전체 지표 (공유 메모리 valid 행렬)
+            valid = SharedCSR.attach(valid_spec)
+            p = booster.predict(valid.X, num_iteration=result["best_iteration"])
+            result.update({f"valid_{k}": v for k, v in binary_metrics(valid.y, p).items()})
+            del p
+            valid.close()
+
+        now = int(time.time() * 1000)
+        metrics = [Metric("valid_curve_logloss", loss, now, it) for it, loss in pruner.curve]
+        metrics += [Metric(k, float(result[k]), now, 0) for k in ("valid_logloss", "best_iteration", "wall_s")]
+        metrics += [Metric(k, float(v), now, 0) for k, v in result.items() if k.startswith("valid_") and k != "valid_logloss"]
+        client.log_batch(run_id, metrics=metrics,
+                         params=[Param(k, str(v)) for k, v in {**params, "num_threads": threads}.items()],
+                         tags=[RunTag("pruned", str(pruner.pruned_at is not None).lower())])
+        client.set_terminated(run_id, "FINISHED")
+        return result
+    except Exception:
+        client.set_terminated(run_id, "FAILED")
+        raise
+
+
+def main(n_trials=20, space=None, cpus=None, threads=None, seed=42, prune=None):
+    space = space or SPACE
+    cpus = cpus or os.cpu_count() or 1
+    if threads is not None:
+        threads = max(1, min(int(threads), cpus))  # trial당 스레드가 CPU 수를 넘으면 과다 구독
+    parallel = min(n_trials, max(1, cpus // 2)) if threads is None else max(1, cpus // threads)
+    threads = threads or max(1, cpus // parallel)
+    prune = {"every": 25, "warmup": 50, "min_trials": 3, **(prune or {})}
+    rng = np.random.default_rng(seed)
+    trials = [sample(space, rng) for _ in range(n_trials)]
+
+    mlflow.set_experiment(EXPERIMENT)
+    with mlflow.start_run(run_name="PolicyB_Sweep") as parent:
+        mlflow.log_params({"n_trials": n_trials, "cpus": cpus, "parallel_trials": parallel,
+                           "threads_per_trial": threads, "seed": seed, **{f"prune_{k}": v for k, v in prune.items()}})
+        mlflow.log_dict(space, "search_space.json")
+        results = []
+        t0 = time.perf_counter()
+        dtrain, dvalid, enc, ds = train_valid_datasets()
+        del dtrain, dvalid  # trial은 binary를 직접 로드
+        Xva, yva, _ = split_features("valid", enc=enc)
+        data_dir = ds["dir"]
+        mlflow.log_param("dataset_key", ds["key"])
+        mlflow.log_metrics({"dataset_construct_s": ds["construct_s"],
+                            **({"dataset_reload_s": ds["reload_s"]} if "reload_s" in ds else {})})
+        print(f"[sweep] datasets ready in {time.perf_counter() - t0:.1f}s ({ds['source']}) → {data_dir}")
+        # lease: trial들이 binary를 로드하는 동안 다른 학습의 Dataset 정리에서 제외
+        with lease(data_dir), SharedCSR(Xva, yva) as valid, Manager() as mgr, \
+                ProcessPoolExecutor(max_workers=parallel) as ex:
+            del Xva, yva
+            reports, lock = mgr.dict(), mgr.Lock()
+            futures = [ex.submit(_run_trial, i, params, str(data_dir), valid.spec, threads,
+                                 parent.info.experiment_id, parent.info.run_id, reports, lock, prune)
+                       for i, params in enumerate(trials)]
+            for fut in as_completed(futures):
+                r = fut.result()
+                results.append(r)
+                state = f"pruned@{r['pruned_at']}" if r["pruned_at"] else f"auc={r['valid_auc']:.4f}"
+                print(f"[sweep] trial {r['trial']:>3}: logloss={r['valid_logloss']:.5f} {state} "
+                      f"iters={r['best_iteration']} {r['wall_s']:.1f}s")
+        elapsed = time.perf_counter() - t0
+
+        best = min(results, key=lambda r: r["valid_logloss"])
+        n_pruned = sum(r["pruned_at"] is not None for r in results)
+        mlflow.log_metrics({"best_valid_logloss": best["valid_logloss"], "best_iteration": best["best_iteration"],
+                            "n_pruned": n_pruned, "sweep_wall_s": elapsed,
+                            **{f"best_{k}": v for k, v in best.items() if k.startswith("valid_") and k != "valid_logloss"}})
+        mlflow.log_params({f"best_{k}": v for k, v in best["params"].items()})
+        mlflow.set_tag("best_trial_run_id", best["run_id"])
+        BEST_PATH.write_text(json.dumps(best["params"], indent=2))
+        mlflow.log_artifact(str(BEST_PATH))
+        print(f"[sweep] {n_trials} trials ({n_pruned} pruned) on {parallel}×{threads} threads in {elapsed:.1f}s; "
+              f"best trial {best['trial']} logloss={best['valid_logloss']:.5f} → {BEST_PATH}")
+        return best
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=20)
+    ap.add_argument("--space", type=Path, default=None, help="탐색 공간 JSON (기본: SPACE)")
+    ap.add_argument("--cpus", type=int, default=None, help="CPU 예산 (기본: 전체 코어)")
+    ap.add_argument("--threads", type=int, default=None, help="trial당 LightGBM num_threads (동시 trial = cpus // threads)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--prune-every", type=int, default=25)
+    ap.add_argument("--prune-warmup", type=int, default=50)
+    args = ap.parse_args()
+    main(args.trials, json.loads(args.space.read_text()) if args.space else None, args.cpus, args.threads,
+         args.seed, {"every": args.prune_every, "warmup": args.prune_warmup})
@@ -0,0 +1,153 @@
+# src/train_incremental.py
+"""
+증분 학습: 마지막 학습 이후 들어온 평점(train split의 워터마크 이후 구간)만으로 A/B를 이어서 학습
+  - 인코더: 새 user/movie 컬럼을 기존 컬럼 뒤에 추가 (IndexEncoder.extend — 기존 컬럼 번호 유지)
+  - A: 이전 계수(새 컬럼은 0)에서 warm start — 같은 elasticnet 로지스틱 목적식을 SGD로 몇 epoch만
+       (saga를 새 구간에서 수렴시키면 새 구간에 없는 user/movie 계수가 규제로 0이 되어 이전 학습이 사라짐)
+  - B: 이전 booster(best iteration까지)에서 이어서 boosting (init_model) — 새 구간으로 트리만 추가
+  - 정책별 MLflow run 1개 + 새 모델 버전 등록 (alias PolicyA/PolicyB 이동), 워터마크 갱신 (train_state.json)
+  - train_state.json의 정책별 인코더 fingerprint가 서로/logreg_enc.npz와 다르면 시작하지 않음
+    (extend한 인코더는 기존 컬럼을 유지하므로 이번에 학습하지 않은 정책의 기록도 새 fingerprint로 갱신)
+  - 학습 후 라우터의 서빙용 인코더/rated 아티팩트(router_enc.npz, router_rated.npz) 갱신
+  - 전체 재학습(train_logreg/train_lgbm)은 인코더를 처음부터 다시 fit하므로 두 정책을 함께 재학습할 것
+
+    python src/train_incremental.py
+    python src/train_incremental.py --policies B --rounds 100 --no-register
+"""
+import argparse, time
+from pathlib import Path
+
+import joblib
+import lightgbm as lgb
+import mlflow
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+import train_lgbm, train_logreg
+from ab_router_pyfunc import refresh_router_data
+from features import (ENC_PATH, build_logreg_features, check_train_encoders, load_encoder, load_split,
+                      load_train_state, model_proba, save_train_state, set_train_encoder, split_features)
+from lgbm_compiled import export_booster
+from lgbm_dataset import BoosterClassifier
+from linear_scorer import LinearScorer
+from register_models import register_run_model
+from utils import binary_metrics
+
+ART_DIR = Path(__file__).resolve().parent.parent / "data" / "artifacts"
+EXPERIMENT = "abtest_movielens"
+POLICIES = ("A", "B")
+ROUNDS = 100  # B: 증분 1회당 최대 추가 boosting 반복 (early stopping)
+# A: 이전 해 근처에 머무르도록 작은 고정 step, 적은 epoch (valid에서 step을 키울수록 새 구간 과적합)
+SGD_PARAMS = dict(loss="log_loss", learning_rate="constant", eta0=0.005, max_iter=5, tol=None)
+
+
+def _train_A(X, y, enc, prev_rows: int):
+    prev = joblib.load(ART_DIR / "logreg_model.pkl")
+    coef = np.zeros((1, enc.n_features))
+    coef[:, :prev.coef_.shape[1]] = prev.coef_  # 새 컬럼은 뒤에 추가되므로 오른쪽 0 패딩
+    # LogisticRegression 목적식 C·Σloss + penalty ↔ SGD (1/n)Σloss + alpha·penalty: 누적 행 수 기준 alpha
+    base = train_logreg.PARAMS
+    alpha = 1.0 / (base["C"] * (prev_rows + len(y)))
+    clf = SGDClassifier(**SGD_PARAMS, penalty=base["penalty"], l1_ratio=base["l1_ratio"], alpha=alpha, random_state=42)
+    clf.fit(X, y, coef_init=coef, intercept_init=prev.intercept_)
+
+    joblib.dump(clf, ART_DIR / "logreg_model.pkl")
+    mlflow.log_artifact(str(ART_DIR / "logreg_model.pkl"))
+    LinearScorer.from_classifier(clf, enc).save(ART_DIR / "logreg_weights.npz")
+    mlflow.log_artifact(str(ART_DIR / "logreg_weights.npz"))
+    mlflow.sklearn.log_model(clf, artifact_path="model")
+    return prev, clf, {"alpha": alpha, **{f"sgd_{k}": v for k, v in SGD_PARAMS.items()}}
+
+
+def _train_B(X, y, enc, Xva, yva, rounds: int):
+    prev = joblib.load(ART_DIR / "lgbm_model.pkl")
+    # early stopping 이후 남은 반복은 버리고 best iteration까지의 트리에서 이어서 학습
+    init = lgb.Booster(model_str=prev.booster_.model_to_string())
+    params = {k: v for k, v in train_lgbm.PARAMS.items() if k != "n_estimators"}
+    params["predict_disable_shape_check"] = True  # init 점수 계산: 이전 모델은 추가된 컬럼을 모름
+    dtrain = lgb.Dataset(X, label=y, params={"verbose": -1})
+    dvalid = lgb.Dataset(Xva, label=yva, reference=dtrain)
+    booster = lgb.train(params, dtrain, num_boost_round=rounds, init_model=init,
+                        valid_sets=[dvalid], valid_names=["valid"],
+                        callbacks=[lgb.early_stopping(stopping_rounds=50), lgb.log_evaluation(period=0)])
+    clf = BoosterClassifier(booster)
+
+    joblib.dump(clf, ART_DIR / "lgbm_model.pkl")
+    mlflow.log_artifact(str(ART_DIR / "lgbm_model.pkl"))
+    export_booster(clf, ART_DIR / "lgbm_model.txt")
+    mlflow.log_artifact(str(ART_DIR / "lgbm_model.txt"))
+    mlflow.lightgbm.log_model(booster, artifact_path="model")
+    return prev, clf, {"init_iterations": init.current_iteration(), "best_iteration": booster.best_iteration}
+
+
+def main(policies=POLICIES, rounds=ROUNDS, register=True):
+    state = load_train_state()
+    missing = [p for p in policies if p not in state]
+    if missing:
+        raise SystemExit(f"no training state for policy {missing}: run train_logreg.py / train_lgbm.py first")
+
+    enc_prev = load_encoder()
+    try:
+        check_train_encoders(enc_prev.fingerprint(), state=state)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    since = min(state[p]["watermark"] for p in policies)
+    delta = load_split("train", since=since)
+    if delta.empty:
+        print(f"[incremental] no new ratings after {since}")
+        return {}
+
+    enc = enc_prev.extend(delta)
+    Xva, yva, _ = split_features("valid", enc=enc)
+    info = {"since": since, "delta_rows": len(delta), "new_users": enc.n_users - enc_prev.n_users,
+            "new_movies": enc.n_movies - enc_prev.n_movies}
+    print(f"[incremental] {len(delta):,} new ratings after {since}: "
+          f"+{info['new_users']} users, +{info['new_movies']} movies → {enc.n_features:,} features")
+
+    mlflow.set_experiment(EXPERIMENT)
+    versions, trained = {}, False
+    for policy in policies:
+        prev_state = state[policy]
+        rows = delta[delta["timestamp"] > prev_state["watermark"]]
+        if rows.empty:
+            continue
+        name = "PolicyA_LogReg_Incremental" if policy == "A" else "PolicyB_LightGBM_Incremental"
+        with mlflow.start_run(run_name=name) as run:
+            t0 = time.perf_counter()
+            X, y, _ = build_logreg_features(rows, enc=enc, fit=False)
+            if policy == "A":
+                prev, clf, extra = _train_A(X, y, enc, prev_state["rows"])
+            else:
+                prev, clf, extra = _train_B(X, y, enc, Xva, yva, rounds)
+            train_s = time.perf_counter() - t0
+            enc.save(ENC_PATH)  # 새 모델의 컬럼 배치 (이전 모델들도 앞쪽 컬럼만 쓰므로 그대로 호환)
+            set_train_encoder(enc.fingerprint())
+            trained = True
+
+            m_prev = binary_metrics(yva, model_proba(prev, Xva))
+            m_va = binary_metrics(yva, clf.predict_proba(Xva)[:, 1])
+            mlflow.log_params({"mode": "incremental", "since": prev_state["watermark"],
+                               "new_users": info["new_users"], "new_movies": info["new_movies"], **extra})
+            mlflow.log_metrics({"delta_rows": len(rows), "total_rows": prev_state["rows"] + len(rows),
+                                "train_s": train_s, **{f"valid_{k}": v for k, v in m_va.items()},
+                                **{f"valid_prev_{k}": v for k, v in m_prev.items()}})
+            save_train_state(policy, int(rows["timestamp"].max()), prev_state["rows"] + len(rows), "incremental",
+                             enc.fingerprint())
+            if register:
+                versions[policy] = register_run_model(run.info.run_id, f"Policy{policy}").version
+            print(f"[incremental] {policy}: {len(rows):,} rows in {train_s:.1f}s, valid auc "
+                  f"{m_prev['auc']:.4f} → {m_va['auc']:.4f}" + (f", version {versions[policy]}" if register else ""))
+    if trained:
+        refresh_router_data(enc)
+        print("[incremental] refreshed router_enc.npz / router_rated.npz")
+    return versions
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--policies", nargs="+", default=list(POLICIES), choices=POLICIES)
+    ap.add_argument("--rounds", type=int, default=ROUNDS, help="B: 최대 추가 boosting 반복")
+    ap.add_argument("--no-register", action="store_true", help="모델 레지스트리에 새 버전 등록하지 않음")
+    args = ap.parse_args()
+    main(tuple(args.policies), args.rounds, not args.no_register)
@@ -1,51 +1,62 @@
 # src/train_lgbm.py
+import argparse, json
 import mlflow, joblib
 from pathlib import Path
 import lightgbm as lgb
-from features import load_split, build_logreg_features
+from features import split_features, ENC_PATH, check_train_encoders, save_train_state, split_watermark
+from lgbm_compiled import export_booster
+from lgbm_dataset import BoosterClassifier, train_valid_datasets
 from utils import binary_metrics
 
 ART_DIR = Path(__file__).resolve().parent.parent / "data" / "artifacts"
 ART_DIR.mkdir(parents=True, exist_ok=True)
 EXPERIMENT = "abtest_movielens"
 
-def main():
+# LightGBM 파라미터 (sweep_lgbm.py 탐색의 기준값)
+PARAMS = dict(
+    objective="binary",
+    metric="binary_logloss",
+    num_leaves=64,
+    learning_rate=0.05,
+    feature_fraction=0.8,
+    bagging_fraction=0.8,
+    bagging_freq=1,
+    min_data_in_leaf=50,
+    n_estimators=500,
+    verbose=-1,
+)
+
+def main(params=None, rebuild_dataset=False, reset_encoder=False):
     mlflow.set_experiment(EXPERIMENT)
     with mlflow.start_run(run_name="PolicyB_LightGBM"):
-        # 데이터 로드
-        df_tr = load_split("train")
-        df_va = load_split("valid")
-
-        # 동일한 OHE 피처 사용 (A 모델과 동일 전처리)
-        Xtr, ytr, enc = build_logreg_features(df_tr, enc=None, fit=True)
-        Xva, yva, _   = build_logreg_features(df_va, enc=enc, fit=False)
+        # 데이터 로드: 동일한 OHE 피처 사용 (A 모델과 동일 전처리)
+        # LightGBM Dataset은 데이터 버전별 binary 재사용 (최초 1회만 구성/binning)
+        dtrain, dvalid, enc, ds = train_valid_datasets(rebuild=rebuild_dataset)
+        Xva, yva, _ = split_features("valid", enc=enc)   # 검증 지표용 CSR (피처 캐시)
+        # A가 다른 인코더(다른 데이터 버전/증분 확장)로 학습돼 있으면 중단 — 두 정책을 함께 재학습할 때만 reset_encoder
+        if not reset_encoder:
+            check_train_encoders(enc.fingerprint(), exclude=("B",))
+        mlflow.log_param("dataset_key", ds["key"])
+        mlflow.log_metric("dataset_construct_s", ds["construct_s"])
+        if "reload_s" in ds:
+            mlflow.log_metric("dataset_reload_s", ds["reload_s"])
 
-        # LightGBM 파라미터
-        params = dict(
-            objective="binary",
-            metric="binary_logloss",
-            num_leaves=64,
-            learning_rate=0.05,
-            feature_fraction=0.8,
-            bagging_fraction=0.8,
-            bagging_freq=1,
-            min_data_in_leaf=50,
-            n_estimators=500,
-            verbose=-1,
-        )
+        # LightGBM 파라미터 (params: sweep 결과 등으로 기준값 덮어쓰기)
+        params = {**PARAMS, **(params or {})}
         mlflow.log_params(params)
+        train_params = dict(params)
+        rounds = int(train_params.pop("n_estimators"))
 
         # 모델 학습
-        clf = lgb.LGBMClassifier(**params)
-        clf.fit(
-            Xtr, ytr,
-            eval_set=[(Xva, yva)],
-            eval_metric="binary_logloss",
+        booster = lgb.train(
+            train_params, dtrain, num_boost_round=rounds,
+            valid_sets=[dvalid], valid_names=["valid"],
             callbacks=[
                 lgb.early_stopping(stopping_rounds=50),  # 얼리스탑
                 lgb.log_evaluation(period=0),            # 학습 로그 숨김
             ],
         )
+        clf = BoosterClassifier(booster)  # 기존 LGBMClassifier 피클과 같은 predict_proba 인터페이스
 
         # 검증 성능 평가
         p_va = clf.predict_proba(Xva)[:, 1]
@@ -54,11 +65,21 @@ def main():
             mlflow.log_metric(f"valid_{k}", float(v))
 
         # 아티팩트 저장
-        joblib.dump(enc, ART_DIR / "logreg_ohe.pkl")
+        enc.save(ENC_PATH)
         joblib.dump(clf, ART_DIR / "lgbm_model.pkl")
         mlflow.log_artifact(str(ART_DIR / "lgbm_model.pkl"))
+        # 네이티브 텍스트 모델 (서빙 시 CompiledForest로 로드, best iteration까지만)
+        export_booster(clf, ART_DIR / "lgbm_model.txt")
+        mlflow.log_artifact(str(ART_DIR / "lgbm_model.txt"))
+        save_train_state("B", split_watermark("train"), dtrain.num_data(), "full", enc.fingerprint())  # 증분 학습 시작점
 
         print("Policy B (LightGBM) valid:", m_va)
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--params", type=Path, default=None, help="파라미터 JSON (예: sweep_lgbm.py의 lgbm_sweep_best.json)")
+    ap.add_argument("--rebuild-dataset", action="store_true", help="Dataset binary를 재사용하지 않고 다시 구성")
+    ap.add_argument("--reset-encoder", action="store_true",
+                    help="Policy A가 다른 인코더로 학습돼 있어도 진행 (이어서 train_logreg.py도 재학습할 것)")
+    args = ap.parse_args()
+    main(json.loads(args.params.read_text()) if args.params else None, args.rebuild_dataset, args.reset_encoder)
@@ -1,31 +1,32 @@
 # src/train_logreg.py
-import os, mlflow, joblib
+import argparse, os, mlflow, joblib
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from sklearn.linear_model import LogisticRegression
 from sklearn.utils import shuffle
-from features import load_split, build_logreg_features
+from features import ENC_PATH, check_train_encoders, save_train_state, split_features, split_watermark
+from linear_scorer import LinearScorer
 from utils import binary_metrics
 
 ART_DIR = Path(__file__).resolve().parent.parent / "data" / "artifacts"
 ART_DIR.mkdir(parents=True, exist_ok=True)
 
 EXPERIMENT = "abtest_movielens"
+PARAMS = dict(penalty="elasticnet", l1_ratio=0.1, C=1.0, solver="saga", max_iter=200)
 
-def main():
+def main(reset_encoder=False):
     mlflow.set_experiment(EXPERIMENT)
     with mlflow.start_run(run_name="PolicyA_LogReg"):
-        df_tr = load_split("train")
-        df_va = load_split("valid")
+        Xtr, ytr, enc = split_features("train", fit=True)   # 피처 캐시 (데이터/인코더 해시 키)
+        Xva, yva, _   = split_features("valid", enc=enc)
+        # B가 다른 인코더(다른 데이터 버전/증분 확장)로 학습돼 있으면 중단 — 두 정책을 함께 재학습할 때만 reset_encoder
+        if not reset_encoder:
+            check_train_encoders(enc.fingerprint(), exclude=("A",))
 
-        Xtr, ytr, enc = build_logreg_features(df_tr, enc=None, fit=True)
-        Xva, yva, _   = build_logreg_features(df_va, enc=enc, fit=False)
+        mlflow.log_params(PARAMS)
 
-        params = dict(penalty="elasticnet", l1_ratio=0.1, C=1.0, solver="saga", max_iter=200)
-        mlflow.log_params(params)
-
-        clf = LogisticRegression(**params, n_jobs=-1, random_state=42)
+        clf = LogisticRegression(**PARAMS, n_jobs=-1, random_state=42)
         clf.fit(Xtr, ytr)
 
         # valid metrics
@@ -36,9 +37,17 @@ def main():
         # save artifacts
         joblib.dump(clf, ART_DIR / "logreg_model.pkl")
         mlflow.log_artifact(str(ART_DIR / "logreg_model.pkl"))
+        # 서빙용 계수 분할 (intercept, 컬럼별 w, w_genre) → 라우터가 행렬 없이 gather로 스코어링
+        LinearScorer.from_classifier(clf, enc).save(ART_DIR / "logreg_weights.npz")
+        mlflow.log_artifact(str(ART_DIR / "logreg_weights.npz"))
         mlflow.sklearn.log_model(clf, artifact_path="model")
+        enc.save(ENC_PATH)
+        save_train_state("A", split_watermark("train"), Xtr.shape[0], "full", enc.fingerprint())  # 증분 학습 시작점
 
         print("Policy A(LogReg) valid:", m_va)
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reset-encoder", action="store_true",
+                    help="Policy B가 다른 인코더로 학습돼 있어도 진행 (이어서 train_lgbm.py도 재학습할 것)")
+    main(ap.parse_args().reset_encoder)
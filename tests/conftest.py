@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# src/ 스크립트들은 평면 import (from features import ...) 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,49 @@
+# tests/test_ab_router.py
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from ab_router_pyfunc import ABRouter
+from features import IndexEncoder, build_movie_genres
+from recommend import RatedIndex
+
+GENRES = ["g0", "g1", "g2"]
+
+
+def _ratings(n, seed):
+    rng = np.random.default_rng(seed)
+    m = rng.integers(1, 30, n)
+    df = pd.DataFrame({"userId": rng.integers(1, 20, n), "movieId": m})
+    for j, g in enumerate(GENRES):
+        df[g] = ((m + j) % 3 == 0).astype(np.int8)
+    df["label"] = rng.integers(0, 2, n)
+    return df
+
+
+def _router(tmp_path, rated=None):
+    train = _ratings(600, seed=0)
+    enc = IndexEncoder.fit(train).set_genres(build_movie_genres([train]))
+    enc.save(tmp_path / "enc.npz")
+    pd.DataFrame({"movieId": np.arange(1, 30)}).to_parquet(tmp_path / "movies.parquet", index=False)
+    clf = LogisticRegression(max_iter=500).fit(enc.transform(train), train["label"])
+    router = ABRouter(modelA=clf, modelB=clf)
+    router.load_context(SimpleNamespace(artifacts={
+        "encoder": str(tmp_path / "enc.npz"), "items": str(tmp_path / "movies.parquet"),
+        "rated": str(rated if rated is not None else tmp_path / "router_rated.npz")}))
+    return router
+
+
+def test_missing_rated_index_means_no_exclusion(tmp_path):
+    router = _router(tmp_path)  # router_rated.npz 미생성
+    assert router.rated is None
+    top = router.recommend(3, k=100, exclude_rated=True)
+    assert sorted(top["movieId"]) == list(range(1, 30))
+
+
+def test_rated_index_excludes_seen_movies(tmp_path):
+    RatedIndex.build(pd.DataFrame({"userId": [3, 3], "movieId": [5, 7]})).save(tmp_path / "rated.npz")
+    router = _router(tmp_path, rated=tmp_path / "rated.npz")
+    top = router.recommend(3, k=100, exclude_rated=True)
+    assert {5, 7}.isdisjoint(top["movieId"]) and len(top) == 27
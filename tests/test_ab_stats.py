@@ -0,0 +1,107 @@
+# tests/test_ab_stats.py
+import math
+
+import mlflow
+import numpy as np
+import pytest
+from mlflow.tracking import MlflowClient
+
+from ab_stats import FIELDS, ABStats, _moments, msprt
+
+
+def _acc(**kw):
+    acc = np.zeros(len(FIELDS))
+    for k, v in kw.items():
+        acc[FIELDS.index(k)] = v
+    return acc
+
+
+def test_moments_known_values():
+    # 점수 1, 2, 3, 4 → 평균 2.5, 표본분산 5/3
+    n, mean, var = _moments(_acc(exposures=4, score_sum=10, score_sumsq=30), "exposures", "score_sum", "score_sumsq")
+    assert n == 4 and mean == pytest.approx(2.5) and var == pytest.approx(5 / 3)
+    n, mean, var = _moments(_acc(exposures=1, score_sum=0.7, score_sumsq=0.49), "exposures", "score_sum", "score_sumsq")
+    assert n == 1 and mean == pytest.approx(0.7) and math.isnan(var)
+    n, mean, var = _moments(_acc(), "labeled", "label_sum", "label_sumsq")
+    assert n == 0 and math.isnan(mean) and math.isnan(var)
+
+
+def test_msprt_known_values():
+    # v = 0.02, τ² = 0.25 → log Λ = ½·ln(0.02/0.27) + 0.0625/0.0108
+    diff, p, half = msprt(0.0, 1.0, 100, 0.5, 1.0, 100, tau=0.5, alpha=0.05)
+    assert diff == pytest.approx(0.5)
+    assert p == pytest.approx(math.exp(-(0.5 * math.log(0.02 / 0.27) + 0.0625 / 0.0108)))
+    assert p == pytest.approx(0.0112691, rel=1e-5)
+    assert half == pytest.approx(math.sqrt(0.02 * 0.27 / 0.25 * (2 * math.log(20) + math.log(0.27 / 0.02))))
+    assert half == pytest.approx(0.4308523, rel=1e-6)
+
+
+def test_msprt_degenerate_inputs():
+    assert msprt(0.1, 0.1, 1, 0.2, 0.1, 50, tau=0.05, alpha=0.05) is None      # 표본 부족
+    assert msprt(0.1, 0.0, 10, 0.2, 0.0, 10, tau=0.05, alpha=0.05) is None     # 분산 0
+    assert msprt(0.2, 0.16, 50, 0.2, 0.16, 50, tau=0.05, alpha=0.05)[1] == 1.0  # 차이 0 → Λ ≤ 1
+
+
+def _batch(rng, n, mean_a, mean_b):
+    arms = np.where(rng.random(n) < 0.5, "PolicyA", "PolicyB")
+    scores = np.where(arms == "PolicyA", mean_a, mean_b) + rng.normal(0, 0.1, n)
+    return arms, scores
+
+
+def test_running_min_p_and_ci_intersection():
+    rng = np.random.default_rng(0)
+    stats = ABStats(tau=0.05, flush_seconds=0)
+    stats.bind_version("1")
+    history = []
+    for mean_b in (0.56, 0.44, 0.50):  # 초기 효과 → 반대 효과로 누적 차이 ≈ 0
+        stats.observe(*_batch(rng, 400, 0.50, mean_b))
+        acc = stats._snapshot()[0]
+        fields = ("exposures", "score_sum", "score_sumsq")
+        n_a, m_a, v_a = _moments(acc["PolicyA"], *fields)
+        n_b, m_b, v_b = _moments(acc["PolicyB"], *fields)
+        history.append(msprt(m_a, v_a, n_a, m_b, v_b, n_b, stats.tau, stats.alpha))
+        test = stats.report()["tests"]["score"]
+        assert test["diff"] == pytest.approx(history[-1][0])
+        assert test["p_value"] == pytest.approx(min(p for _, p, _ in history))
+        assert test["ci_low"] == pytest.approx(max(d - h for d, _, h in history))
+        assert test["ci_high"] == pytest.approx(min(d + h for d, _, h in history))
+    assert history[0][1] < history[-1][1]  # 원시 p는 올라가도 보고 p는 최소 유지
+    assert test["p_value"] == pytest.approx(history[0][1]) and test["significant"]
+
+
+def test_stale_version_batches_are_ignored():
+    stats = ABStats(flush_seconds=0)
+    stats.bind_version("1")
+    stats.observe(["PolicyA", "PolicyB"], [0.2, 0.4], version="1")
+    stats.bind_version("2")
+    stats.observe(["PolicyA"], [0.9], version="1")  # 교체 중 이전 router로 스코어링된 배치
+    stats.observe(["PolicyB"], [0.3], version="2")
+    rep = stats.report()
+    assert rep["version"] == "2" and set(rep["arms"]) == {"PolicyB"}
+    assert stats.stats()["stale_rows"] == 1
+
+
+def test_bind_version_defers_final_flush(tmp_path):
+    prev_uri = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri(f"file:{tmp_path / 'mlruns'}")
+    try:
+        stats = ABStats(flush_seconds=3600, experiment="ab_stats_test")  # 스레드 미시작: 기록 시점 직접 제어
+        stats.bind_version("1")
+        stats.observe(["PolicyA", "PolicyB", "PolicyB"], [0.2, 0.4, 0.6], version="1")
+        stats.bind_version("2")  # MLflow 호출 없이 스냅샷만 넘김
+        assert stats.flushes == 0 and stats.stats()["pending_final"] == 1
+        assert stats.report()["arms"] == {}
+
+        stats.observe(["PolicyA"], [0.1], version="2")
+        assert stats.flush() is True
+        assert stats.flushes == 2 and stats.stats()["pending_final"] == 0
+
+        client = MlflowClient()
+        exp = client.get_experiment_by_name("ab_stats_test")
+        runs = {r.data.tags["router_version"]: r for r in client.search_runs([exp.experiment_id])}
+        assert set(runs) == {"1", "2"}
+        assert runs["1"].info.status == "FINISHED" and runs["2"].info.status == "RUNNING"
+        assert runs["1"].data.metrics["online_PolicyB_exposures"] == 2
+        assert runs["2"].data.metrics["online_PolicyA_exposures"] == 1
+    finally:
+        mlflow.set_tracking_uri(prev_uri)
@@ -0,0 +1,49 @@
+# tests/test_genre_vocab.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import features as F
+from prepare_movielens import GENRES_19, movie_dimension, save_movies
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    """압축 포맷 processed 디렉터리 (train.parquet 평점 fact + 메타데이터 있는 movies.parquet)"""
+    monkeypatch.setattr(F, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(F, "RATINGS_DIR", tmp_path / "ratings")
+    monkeypatch.setattr(F, "MOVIES_PATH", tmp_path / "movies.parquet")
+    monkeypatch.setattr(F, "ENC_PATH", tmp_path / "enc.npz")
+    movies = pd.DataFrame({"movieId": [1, 2, 3], "title": ["a", "b", "c"],
+                           "genres": ["Action|Comedy", "Drama", "IMAX|Western"]})
+    save_movies(movie_dimension(movies), F.MOVIES_PATH)
+    rng = np.random.default_rng(0)
+    pd.DataFrame({"userId": rng.integers(1, 10, 50), "movieId": rng.integers(1, 4, 50), "rating": 4,
+                  "timestamp": np.arange(50), "label": 1}).to_parquet(tmp_path / "train.parquet", index=False)
+    return tmp_path
+
+
+def test_vocab_recorded_in_movies_and_encoder(data):
+    assert GENRES_19 == F.GENRE_VOCAB
+    assert F.movies_genre_vocab() == F.GENRE_VOCAB
+    df = F.load_split("train")
+    assert df.attrs["genre_vocab"] == F.GENRE_VOCAB
+    enc = F.IndexEncoder.fit(df)
+    enc.save(F.ENC_PATH)
+    assert F.load_encoder().genre_vocab == F.GENRE_VOCAB
+
+
+def test_mismatched_movies_vocab_refused(data, monkeypatch):
+    monkeypatch.setattr(F, "GENRE_VOCAB", F.GENRE_VOCAB[::-1])  # 코드의 bit 해석이 바뀐 경우
+    with pytest.raises(ValueError, match="genre vocabulary"):
+        F.load_split("train")
+
+
+def test_mismatched_encoder_vocab_refused(data):
+    enc = F.IndexEncoder.fit(F.load_split("train"))
+    enc.genre_vocab = enc.genre_vocab[::-1]
+    enc.save(F.ENC_PATH)
+    with pytest.raises(ValueError, match="genre vocabulary"):
+        F.load_encoder()
+    with pytest.raises(ValueError, match="genre vocabulary"):
+        enc.extend(F.load_split("train"))
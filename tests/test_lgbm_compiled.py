@@ -0,0 +1,83 @@
+# tests/test_lgbm_compiled.py
+import threading
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from ab_router_pyfunc import ABRouter
+from features import IndexEncoder
+from lgbm_compiled import CompiledForest, export_booster
+
+GENRES = ["g0", "g1", "g2"]
+PARAMS = dict(objective="binary", num_leaves=15, learning_rate=0.2, min_data_in_leaf=5, verbose=-1)
+
+
+def _ratings(users, movies, n, seed):
+    rng = np.random.default_rng(seed)
+    u, m = rng.choice(users, n), rng.choice(movies, n)
+    df = pd.DataFrame({"userId": u, "movieId": m})
+    for j, g in enumerate(GENRES):
+        df[g] = ((m + j) % 3 == 0).astype(np.int8)
+    # user/movie/장르 모두에 의존하는 라벨 → 세 종류 피처 모두 split에 등장
+    logit = 0.8 * (u % 4 == 0) - 0.6 * (m % 5 == 0) + 0.7 * df["g1"] + rng.normal(0, 0.5, n)
+    df["label"] = (logit > 0.3).astype(np.int64)
+    return df
+
+
+def _fit(enc, train, rounds=30):
+    return lgb.train(PARAMS, lgb.Dataset(enc.transform(train), label=train["label"]), num_boost_round=rounds)
+
+
+def _assert_parity(forest, booster, enc, rows):
+    u, m = enc.index(rows)
+    G = enc.genre_matrix(rows)
+    expected = booster.predict(enc.transform(rows))
+    assert np.allclose(forest.predict_proba_index(u, m, G, enc.genre_offset), expected)
+
+
+def test_parity_with_booster(tmp_path):
+    train = _ratings(np.arange(1, 40), np.arange(1, 60), 3000, seed=0)
+    enc = IndexEncoder.fit(train)
+    booster = _fit(enc, train)
+    forest = CompiledForest.from_model_file(export_booster(booster, tmp_path / "m.txt"))
+    assert forest.n_trees == 30
+
+    rows = _ratings(np.arange(1, 50), np.arange(1, 80), 1000, seed=1)  # 미등록 user/movie 포함
+    assert (enc.index(rows)[0] < 0).any() and (enc.index(rows)[1] < 0).any()
+    _assert_parity(forest, booster, enc, rows)
+
+
+def test_parity_grown_layout():
+    base = _ratings(np.arange(1, 30), np.arange(1, 40), 2000, seed=2)
+    delta = _ratings(np.arange(20, 45), np.arange(30, 55), 1500, seed=3)
+    enc = IndexEncoder.fit(base).extend(delta)
+    assert enc.grown
+    booster = _fit(enc, pd.concat([base, delta], ignore_index=True))
+    _assert_parity(CompiledForest.from_booster(booster), booster, enc,
+                   _ratings(np.arange(1, 60), np.arange(1, 70), 1000, seed=4))
+
+
+def test_unsupported_model_raises_value_error():
+    train = _ratings(np.arange(1, 20), np.arange(1, 30), 600, seed=5)
+    X = IndexEncoder.fit(train).transform(train)
+    booster = lgb.train({"objective": "multiclass", "num_class": 3, "verbose": -1},
+                        lgb.Dataset(X, label=train["userId"] % 3), num_boost_round=2)
+    with pytest.raises(ValueError):
+        CompiledForest.from_booster(booster)
+
+
+def test_router_falls_back_to_pickle(tmp_path):
+    train = _ratings(np.arange(1, 20), np.arange(1, 30), 600, seed=6)
+    X = IndexEncoder.fit(train).transform(train)
+    booster = lgb.train({"objective": "regression", "verbose": -1}, lgb.Dataset(X, label=train["label"]),
+                        num_boost_round=2)
+    joblib.dump(booster, tmp_path / "m.pkl")
+
+    router = ABRouter()
+    router._model_paths = {"A": None, "B": str(tmp_path / "m.pkl")}
+    router._compiled_paths = {"B": export_booster(booster, tmp_path / "m.txt")}
+    router._loaded, router._lock = {}, threading.Lock()
+    assert isinstance(router._model("B"), lgb.Booster)
@@ -0,0 +1,56 @@
+# tests/test_lgbm_dataset.py
+import os
+import time
+
+import numpy as np
+
+import lgbm_dataset as D
+
+
+def _age(d, age_s):
+    t = time.time() - age_s
+    os.utime(d, (t, t))
+
+
+def _version(root, name, age_s):
+    d = root / name
+    d.mkdir(parents=True)
+    _age(d, age_s)
+    return d
+
+
+def test_prune_keeps_recent_and_leased(tmp_path, monkeypatch):
+    monkeypatch.setattr(D, "DATASET_DIR", tmp_path)
+    monkeypatch.setattr(D, "CV_DATASET_DIR", tmp_path / "cv")
+    cv = _version(tmp_path, "cv", 10_000)
+    dirs = [_version(tmp_path, f"v{i}", 3600 * (i + 1)) for i in range(5)]  # v0이 가장 최근
+    recent = _version(tmp_path, "recent", 60)
+    with D.lease(dirs[3]):
+        _age(dirs[3], 4 * 3600)  # lease 파일 생성으로 갱신된 mtime을 되돌림 → lease만으로 보호
+        D._prune(keep=1, grace_s=600)
+        assert recent.exists() and dirs[3].exists() and cv.exists()
+        assert not any(d.exists() for d in (dirs[0], dirs[1], dirs[2], dirs[4]))
+    assert not list(dirs[3].glob(".lease.*"))
+
+
+def test_stale_lease_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(D, "DATASET_DIR", tmp_path)
+    old = [_version(tmp_path, f"v{i}", 3600 * (i + 1)) for i in range(2)]
+    (old[1] / ".lease.999999999").touch()  # 이미 종료된 프로세스
+    _age(old[1], 7200)
+    D._prune(keep=1, grace_s=600)
+    assert old[0].exists() and not old[1].exists()
+
+
+def test_cv_cache_has_own_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(D, "DATASET_DIR", tmp_path)
+    monkeypatch.setattr(D, "CV_DATASET_DIR", tmp_path / "cv")
+    main = [_version(tmp_path, f"v{i}", 3600) for i in range(3)]
+    X, y = np.random.default_rng(0).random((50, 3)), np.arange(50) % 2
+    for i in range(3):
+        path, built = D.cached_dataset(f"k{i}", "fold0", X, y, keep=1)
+        assert built is not None and path.parent.parent == tmp_path / "cv"
+        _age(path.parent, 7200)
+    assert D.cached_dataset("k2", "fold0", X, y)[1] is None  # 재사용
+    assert sorted(p.name for p in (tmp_path / "cv").iterdir()) == ["k2"]
+    assert all(d.exists() for d in main)
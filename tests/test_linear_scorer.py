@@ -0,0 +1,88 @@
+# tests/test_linear_scorer.py
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from ab_router_pyfunc import ABRouter
+from features import IndexEncoder, build_movie_genres, model_proba
+from linear_scorer import LinearScorer
+from recommend import ItemCandidates
+
+GENRES = ["g0", "g1", "g2"]
+
+
+def _ratings(users, movies, n, seed):
+    rng = np.random.default_rng(seed)
+    m = rng.choice(movies, n)
+    df = pd.DataFrame({"userId": rng.choice(users, n), "movieId": m})
+    for j, g in enumerate(GENRES):
+        df[g] = ((m + j) % 3 == 0).astype(np.int8)  # 영화별로 고정된 장르
+    df["label"] = rng.integers(0, 2, n)
+    return df
+
+
+def _assert_parity(scorer, clf, enc, rows):
+    u, m = enc.index(rows)
+    G = enc.genre_matrix(rows)
+    expected = clf.predict_proba(enc.transform(rows))[:, 1]
+    assert np.allclose(scorer.predict_proba_index(u, m, G, enc.genre_offset), expected)
+
+
+def test_parity_with_logistic_regression():
+    train = _ratings(np.arange(1, 40), np.arange(1, 60), 2000, seed=0)
+    enc = IndexEncoder.fit(train)
+    clf = LogisticRegression(C=1.0, max_iter=500).fit(enc.transform(train), train["label"])
+    scorer = LinearScorer.from_classifier(clf, enc)
+
+    # 학습에 없던 user/movie 포함 (OHE handle_unknown="ignore"와 같이 기여 0)
+    rows = _ratings(np.arange(1, 50), np.arange(1, 80), 500, seed=1)
+    assert (enc.index(rows)[0] < 0).any() and (enc.index(rows)[1] < 0).any()
+    _assert_parity(scorer, clf, enc, rows)
+
+
+def test_parity_grown_layout():
+    base = _ratings(np.arange(1, 30), np.arange(1, 40), 1500, seed=2)
+    delta = _ratings(np.arange(20, 45), np.arange(30, 55), 800, seed=3)
+    enc = IndexEncoder.fit(base).extend(delta)
+    assert enc.grown and enc.genre_offset < enc.n_features - len(GENRES)
+
+    train = pd.concat([base, delta], ignore_index=True)
+    clf = LogisticRegression(C=1.0, max_iter=500).fit(enc.transform(train), train["label"])
+    scorer = LinearScorer.from_classifier(clf, enc)
+    assert np.allclose(scorer.w_genre, clf.coef_[0, enc.genre_offset:enc.genre_offset + len(GENRES)])
+
+    rows = _ratings(np.arange(1, 60), np.arange(1, 70), 500, seed=4)
+    _assert_parity(scorer, clf, enc, rows)
+
+
+def test_save_load_roundtrip(tmp_path):
+    train = _ratings(np.arange(1, 20), np.arange(1, 30), 600, seed=5)
+    enc = IndexEncoder.fit(train)
+    clf = LogisticRegression(max_iter=500).fit(enc.transform(train), train["label"])
+    LinearScorer.from_classifier(clf, enc).save(tmp_path / "w.npz")
+    _assert_parity(LinearScorer.load(tmp_path / "w.npz"), clf, enc, train)
+
+
+def test_unretrained_model_scores_grown_encoder():
+    # B만 증분 학습 → 인코더는 커졌지만 A 피클은 이전 폭 그대로
+    base = _ratings(np.arange(1, 30), np.arange(1, 40), 1500, seed=6)
+    delta = _ratings(np.arange(20, 45), np.arange(30, 55), 800, seed=7)
+    enc = IndexEncoder.fit(base)
+    clf = LogisticRegression(max_iter=500).fit(enc.transform(base), base["label"])
+    grown = IndexEncoder.fit(base).extend(delta).set_genres(build_movie_genres([base, delta]))
+    assert grown.n_features > clf.n_features_in_
+
+    rows = _ratings(np.arange(1, 50), np.arange(1, 55), 400, seed=8)  # 장르 lookup에 있는 영화만
+    expected = clf.predict_proba(enc.transform(rows))[:, 1]  # 새 id는 이전 인코더에서도 미등록 → 기여 0
+    assert np.allclose(model_proba(clf, grown.transform(rows)), expected)
+
+    router = ABRouter(modelA=clf, modelB=clf)
+    router.enc = grown
+    assert np.allclose(router._score("A", rows[["userId", "movieId"]]), expected)
+
+    users = np.array([1, 25, 44])
+    items = ItemCandidates(np.arange(1, 55), grown)
+    frame = pd.DataFrame({"userId": np.repeat(users, len(items)), "movieId": np.tile(items.movie_ids, len(users))})
+    frame = frame.merge(build_movie_genres([base, delta]), on="movieId", how="left")
+    want = clf.predict_proba(enc.transform(frame))[:, 1].reshape(len(users), len(items))
+    assert np.allclose(items.grid(clf, users), want)
@@ -0,0 +1,63 @@
+# tests/test_model_watcher.py
+import threading
+
+import model_watcher
+from model_watcher import LoadedRouter, ModelWatcher
+
+
+class _SlowWatcher(ModelWatcher):
+    """load()가 release될 때까지 블록 (느린 다운로드/워밍업 모사)"""
+
+    def __init__(self, **kw):
+        super().__init__("models:/router@prod", poll_seconds=0, **kw)
+        self.loading, self.release = threading.Event(), threading.Event()
+
+    def load(self, version):
+        self.loading.set()
+        assert self.release.wait(5)
+        return LoadedRouter(version=version, model=None)
+
+
+def _watcher(monkeypatch, alias):
+    swapped = []
+    w = _SlowWatcher(on_swap=lambda r: swapped.append(r.version))
+    w._swap(LoadedRouter(version="1", model=None))
+    w._swap(LoadedRouter(version="2", model=None))
+    swapped.clear()
+    monkeypatch.setattr(model_watcher, "resolve_version", lambda uri: alias["version"])
+    return w, swapped
+
+
+def test_rollback_does_not_wait_for_inflight_load(monkeypatch):
+    alias = {"version": "3"}
+    w, swapped = _watcher(monkeypatch, alias)
+    result = {}
+    checker = threading.Thread(target=lambda: result.setdefault("swapped", w.check_now()))
+    checker.start()
+    assert w.loading.wait(5)
+
+    roller = threading.Thread(target=lambda: result.setdefault("target", w.rollback()))
+    roller.start()
+    roller.join(1.0)  # V3 로드가 끝나지 않은 상태에서 완료돼야 함
+    rolled_back_while_loading = not roller.is_alive()
+    w.release.set()
+    roller.join(5)
+    assert rolled_back_while_loading
+    assert result["target"].version == "1" and w.stats()["rolled_back_from"] == "2"
+
+    checker.join(5)
+    assert result["swapped"] is False            # 로드된 V3는 롤백을 덮어쓰지 않음
+    assert w.current.version == "1" and w.previous.version == "2"
+    assert swapped == ["1"]
+
+
+def test_check_now_swaps_and_rollback_holds(monkeypatch):
+    alias = {"version": "3"}
+    w, swapped = _watcher(monkeypatch, alias)
+    w.release.set()
+    assert w.check_now() is True and w.current.version == "3"
+    assert w.rollback().version == "2"
+    assert w.check_now() is False and w.current.version == "2"   # alias가 아직 V3 → 롤백 유지
+    alias["version"] = "4"
+    assert w.check_now() is True and w.current.version == "4"
+    assert swapped == ["3", "2", "4"] and w.stats()["rolled_back_from"] is None
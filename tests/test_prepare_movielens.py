@@ -0,0 +1,36 @@
+# tests/test_prepare_movielens.py
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prepare_movielens import _DELIM, _ColonTranslator
+
+
+def _translate(data: bytes, chunk_size: int) -> bytes:
+    return io.BufferedReader(_ColonTranslator(io.BytesIO(data), chunk_size)).read()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 7])
+@pytest.mark.parametrize("data", [b"1::2::3", b"a:::b", b"a::::b", b"x:\n::", b":::", b"::", b":", b"t: x::y\n"])
+def test_chunk_boundaries_match_whole_stream(data, chunk_size):
+    assert _translate(data, chunk_size) == data.replace(b"::", _DELIM)
+
+
+def test_random_streams():
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        data = bytes(rng.choice(list(b"a::\n"), rng.integers(0, 30)))
+        assert _translate(data, int(rng.integers(1, 8))) == data.replace(b"::", _DELIM)
+
+
+def test_parse_delimiter_split_across_chunks():
+    # 제목이 ':'로 끝나는 ':::' 구간 + 청크 경계가 구분자 한가운데에 오도록 작은 청크 (read_dat과 같은 파서 설정)
+    raw = b"1::Toy Story (1995)::Animation|Comedy\n2::Alien: Resurrection:::Sci-Fi\n"
+    stream = io.BufferedReader(_ColonTranslator(io.BytesIO(raw), chunk_size=3), buffer_size=4)
+    df = pd.read_csv(stream, sep=_DELIM.decode(), engine="c", header=None, names=["movieId", "title", "genres"],
+                     quoting=csv.QUOTE_NONE)
+    expected = [line.decode().split("::") for line in raw.splitlines()]  # sep="::"와 같은 왼쪽부터 짝
+    assert df.astype(str).values.tolist() == expected
@@ -0,0 +1,145 @@
+# tests/test_serve_columnar.py
+import importlib
+import io
+import json
+import sys
+
+import mlflow
+import mlflow.pyfunc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+import columnar_io
+
+
+class _StubRouter(mlflow.pyfunc.PythonModel):
+    """userId 짝/홀로 배정, (userId, movieId)에서 결정적 점수 — 모델 없이 엔드포인트만 검증"""
+
+    def predict(self, context, model_input, params=None):
+        u = model_input["userId"].to_numpy(dtype=np.int64)
+        m = model_input["movieId"].to_numpy(dtype=np.int64)
+        return pd.DataFrame({"assigned": np.where(u % 2 == 0, "A", "B"), "score": ((7 * u + m) % 100) / 100.0})
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    root = tmp_path_factory.mktemp("serve")
+    mlflow.pyfunc.save_model(path=str(root / "router"), python_model=_StubRouter())
+    prev_uri = mlflow.get_tracking_uri()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MLFLOW_TRACKING_URI", f"file:{root / 'mlruns'}")
+        mp.setenv("ROUTER_MODEL_URI", str(root / "router"))
+        mp.setenv("ROUTER_VERSION_POLL_S", "0")
+        mp.setenv("AB_STATS_FLUSH_S", "0")
+        mp.setenv("ROUTER_TOPK_DIR", str(root / "topk"))
+        sys.modules.pop("serve_api", None)
+        serve_api = importlib.import_module("serve_api")
+        with TestClient(serve_api.app) as c:
+            yield c
+    sys.modules.pop("serve_api", None)
+    mlflow.set_tracking_uri(prev_uri)
+
+
+USERS = np.array([1, 2, 3, 4, 10, 11, 12, 7], dtype=np.int64)
+MOVIES = np.array([5, 50, 500, 1, 2, 3, 260, 1196], dtype=np.int64)
+LABELS = [1, 0, 0, 1, 0, 0, 1, 1]
+
+
+def _reference(client):
+    rows = [{"userId": int(u), "movieId": int(m), "label": lab} for u, m, lab in zip(USERS, MOVIES, LABELS)]
+    resp = client.post("/bulk_predict", json=rows)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _arrow_bytes(file_format: bool) -> bytes:
+    table = pa.table({"userId": USERS, "movieId": MOVIES, "label": pa.array(LABELS, pa.int64())})
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_file(sink, table.schema) if file_format else pa.ipc.new_stream(sink, table.schema)
+    with writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_json_columns_roundtrip(client):
+    ref = _reference(client)
+    body = json.dumps({"userId": USERS.tolist(), "movieId": MOVIES.tolist(), "label": LABELS})
+    resp = client.post("/bulk_predict_columnar", content=body, headers={"content-type": columnar_io.JSON})
+    assert resp.status_code == 200
+    out = resp.json()
+    assert out["summary"] == ref["summary"]
+    assert out["columns"]["userId"] == USERS.tolist() and out["columns"]["movieId"] == MOVIES.tolist()
+    assert out["columns"]["assigned"] == [r["assigned"] for r in ref["rows"]]
+    assert np.allclose(out["columns"]["score"], [r["score"] for r in ref["rows"]])
+
+
+@pytest.mark.parametrize("content_type,file_format", [
+    (columnar_io.ARROW, False), (columnar_io.ARROW_FILE, True)])
+def test_arrow_roundtrip(client, content_type, file_format):
+    ref = _reference(client)
+    resp = client.post("/bulk_predict_columnar", content=_arrow_bytes(file_format),
+                       headers={"content-type": content_type})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith(columnar_io.ARROW)
+    table = pa.ipc.open_stream(resp.content).read_all()
+    assert json.loads(table.schema.metadata[b"summary"]) == ref["summary"]
+    assert json.loads(resp.headers["X-AB-Summary"]) == ref["summary"]
+    assert table.column("userId").to_pylist() == USERS.tolist()
+    assert table.column("assigned").to_pylist() == [r["assigned"] for r in ref["rows"]]
+    assert np.allclose(table.column("score").to_numpy(), [r["score"] for r in ref["rows"]])
+
+
+def test_npy_roundtrip(client):
+    ref = _reference(client)
+    buf = io.BytesIO()
+    np.save(buf, np.column_stack([USERS, MOVIES]).astype(np.int32))
+    resp = client.post("/bulk_predict_columnar", content=buf.getvalue(), headers={"content-type": columnar_io.NPY})
+    assert resp.status_code == 200
+    out = np.load(io.BytesIO(resp.content), allow_pickle=False)
+    arms = resp.headers["X-AB-Arms"].split(",")
+    assert json.loads(resp.headers["X-AB-Summary"]) == ref["summary"]
+    assert [arms[a] for a in out["arm"]] == [r["assigned"] for r in ref["rows"]]
+    assert np.allclose(out["score"], [r["score"] for r in ref["rows"]])
+
+
+def test_response_format_override(client):
+    ref = _reference(client)
+    body = json.dumps({"userId": USERS.tolist(), "movieId": MOVIES.tolist()})
+    resp = client.post("/bulk_predict_columnar?format=arrow", content=body, headers={"content-type": columnar_io.JSON})
+    assert resp.status_code == 200
+    table = pa.ipc.open_stream(resp.content).read_all()
+    assert table.column("assigned").to_pylist() == [r["assigned"] for r in ref["rows"]]
+
+
+@pytest.mark.parametrize("content_type,body", [
+    (columnar_io.JSON, b""),
+    (columnar_io.JSON, json.dumps({"userId": [], "movieId": []}).encode()),
+    (columnar_io.NPY, None),
+    (columnar_io.ARROW, None),
+])
+def test_empty_payload_rejected(client, content_type, body):
+    if body is None and content_type == columnar_io.NPY:
+        buf = io.BytesIO()
+        np.save(buf, np.zeros((0, 2), dtype=np.int32))
+        body = buf.getvalue()
+    elif body is None:
+        table = pa.table({"userId": pa.array([], pa.int64()), "movieId": pa.array([], pa.int64())})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+    resp = client.post("/bulk_predict_columnar", content=body, headers={"content-type": content_type})
+    assert resp.status_code == 400
+    assert "bad payload" in resp.json()["detail"]
+
+
+def test_decode_rejects_bad_shapes():
+    buf = io.BytesIO()
+    np.save(buf, np.zeros((3, 3), dtype=np.int32))
+    with pytest.raises(ValueError, match=r"\(n, 2\)"):
+        columnar_io.decode_request(buf.getvalue(), columnar_io.NPY)
+    with pytest.raises(ValueError, match="integer"):
+        columnar_io.decode_request(json.dumps({"userId": [1.5], "movieId": [2]}).encode(), columnar_io.JSON)
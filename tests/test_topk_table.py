@@ -0,0 +1,19 @@
+# tests/test_topk_table.py
+import numpy as np
+
+from recommend import TopKTable
+
+
+def test_runs_created_in_same_second_do_not_collide(tmp_path):
+    a = TopKTable.create(tmp_path, 5, 3, meta={})
+    b = TopKTable.create(tmp_path, 5, 3, meta={})
+    assert a.path != b.path and a.path.exists() and b.path.exists()
+
+
+def test_scores_keep_live_path_precision(tmp_path):
+    table = TopKTable.create(tmp_path, 4, 2, meta={"version": "1", "exclude_rated": False})
+    scores = np.array([[0.123456789012345, 0.1234567890123]])
+    table.write_rows("A", [2], np.array([[10, 11]], dtype=np.int32), scores)
+    table.publish()
+    top = TopKTable.open_current(tmp_path).recommend("A", 2, 2)
+    assert top["score"].to_numpy().tolist() == scores[0].tolist()
@@ -0,0 +1,40 @@
+# tests/test_train_state.py
+import pytest
+
+import features as F
+
+
+@pytest.fixture(autouse=True)
+def state_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(F, "TRAIN_STATE_PATH", tmp_path / "train_state.json")
+
+
+def test_encoder_recorded_per_policy():
+    F.save_train_state("A", 100, 10, "full", "fp1")
+    F.save_train_state("B", 100, 10, "full", "fp1")
+    assert F.check_train_encoders("fp1") == "fp1"
+    assert F.load_train_state()["A"]["encoder"] == "fp1"
+
+
+def test_mismatch_fails():
+    F.save_train_state("A", 100, 10, "full", "fp1")
+    F.save_train_state("B", 100, 10, "full", "fp2")
+    with pytest.raises(ValueError, match="different encoders"):
+        F.check_train_encoders()
+    with pytest.raises(ValueError, match="different encoders"):
+        F.check_train_encoders("fp1")
+    assert F.check_train_encoders("fp1", exclude=("B",)) == "fp1"  # B 자신을 전체 재학습하는 경우
+
+
+def test_extended_encoder_carried_to_all_policies():
+    F.save_train_state("A", 100, 10, "full", "fp1")
+    F.save_train_state("B", 100, 10, "full", "fp1")
+    F.set_train_encoder("fp2")  # 증분 학습에서 인코더 extend
+    F.save_train_state("A", 200, 20, "incremental", "fp2")
+    assert F.check_train_encoders("fp2") == "fp2"
+    assert F.load_train_state()["B"]["watermark"] == 100
+
+
+def test_legacy_state_without_encoder_is_skipped():
+    F.save_train_state("A", 100, 10, "full")
+    assert F.check_train_encoders("fp1") == "fp1"